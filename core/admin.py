@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.utils.translation import gettext_lazy as _
-from .models import User, NetworkDevice, DeviceGroup, CommandTemplate, DevicePermission, AuditLog
+from .models import User, NetworkDevice, DeviceGroup, CommandTemplate, DevicePermission, AuditLog, Job, JobResult, OutputBlob, ConfigVersion, HistoryRollup, DeviceCircuit, DeviceStatus
 
 @admin.register(User)
 class CustomUserAdmin(UserAdmin):
@@ -31,9 +31,10 @@ class NetworkDeviceAdmin(admin.ModelAdmin):
         "name",
         "ip_address",
         "device_type",
+        "site",
         "is_active",
     ]
-    list_filter = ["device_type", "is_active"]
+    list_filter = ["device_type", "site", "is_active"]
     search_fields = ["name", "ip_address", "description"]
     readonly_fields = ["created_at", "updated_at"]
     fieldsets = [
@@ -44,6 +45,7 @@ class NetworkDeviceAdmin(admin.ModelAdmin):
                     "name",
                     "ip_address",
                     "device_type",
+                    "site",
                     "description",
                     "is_active",
                 ]
@@ -53,6 +55,13 @@ class NetworkDeviceAdmin(admin.ModelAdmin):
             "Authentication",
             {"fields": ["username", "password", "enable_password", "port"]},
         ),
+        (
+            "Timeouts",
+            {
+                "fields": ["connect_timeout", "read_timeout"],
+                "description": "Leave blank to derive timeouts from past runs.",
+            },
+        ),
         ("Metadata", {"fields": ["created_at", "updated_at"]}),
     ]
 
@@ -104,3 +113,89 @@ class AuditLogAdmin(admin.ModelAdmin):
 
     def has_delete_permission(self, request, obj=None):
         return False
+
+
+class JobResultInline(admin.TabularInline):
+    model = JobResult
+    extra = 0
+    readonly_fields = ['device', 'command', 'status', 'output', 'cached', 'completed_at']
+    can_delete = False
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'engine', 'kind', 'status', 'parent', 'created_by', 'created_at', 'finished_at']
+    list_filter = ['engine', 'kind', 'status']
+    readonly_fields = ['created_at', 'started_at', 'heartbeat_at', 'finished_at', 'worker']
+    raw_id_fields = ['parent']
+    filter_horizontal = ['devices']
+    inlines = [JobResultInline]
+
+
+@admin.register(OutputBlob)
+class OutputBlobAdmin(admin.ModelAdmin):
+    list_display = ['digest', 'size', 'refcount', 'created_at', 'last_used_at']
+    search_fields = ['digest']
+    readonly_fields = ['digest', 'data', 'size', 'refcount', 'created_at', 'last_used_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ConfigVersion)
+class ConfigVersionAdmin(admin.ModelAdmin):
+    list_display = ['device', 'version', 'kind', 'line_count', 'lines_added', 'lines_removed', 'captured_at', 'last_seen_at']
+    list_filter = ['kind', 'device']
+    search_fields = ['device__name', 'digest']
+    exclude = ['data']
+    readonly_fields = ['device', 'version', 'kind', 'digest', 'size', 'line_count', 'lines_added', 'lines_removed', 'captured_at', 'last_seen_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(HistoryRollup)
+class HistoryRollupAdmin(admin.ModelAdmin):
+    list_display = ['day', 'device', 'engine', 'command_type', 'status', 'operations', 'command_time', 'bytes_received']
+    list_filter = ['engine', 'command_type', 'status', 'day']
+    search_fields = ['device__name']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(DeviceCircuit)
+class DeviceCircuitAdmin(admin.ModelAdmin):
+    """Deleting a device's circuit closes it."""
+    list_display = ['device', 'state', 'consecutive_failures', 'retry_at', 'last_failure_at']
+    list_filter = ['state']
+    search_fields = ['device__name']
+    readonly_fields = ['device', 'state', 'consecutive_failures', 'opened_at', 'retry_at', 'probe_started_at', 'last_failure_at', 'last_error']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(DeviceStatus)
+class DeviceStatusAdmin(admin.ModelAdmin):
+    list_display = ['device', 'status', 'rtt_ms', 'checked_at', 'changed_at']
+    list_filter = ['status']
+    search_fields = ['device__name']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
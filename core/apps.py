@@ -1,6 +1,16 @@
-from django.apps import AppConfig
+from django.apps import AppConfig, apps
+from django.db.models.signals import post_delete
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # Release the output blob of history rows deleted one at a time.
+        from .blobs import release_deleted_row
+        from .models import BlobOutput
+
+        for model in apps.get_models():
+            if issubclass(model, BlobOutput):
+                post_delete.connect(release_deleted_row, sender=model)
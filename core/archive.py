@@ -0,0 +1,245 @@
+"""
+Versioned configuration archive.
+
+Each backup of a device's running config becomes a ``ConfigVersion`` unless
+it is identical to the latest version, in which case only ``last_seen_at``
+moves. Versions are stored as a chain: a full ``snapshot`` every
+``SNAPSHOT_INTERVAL`` versions, and in between a ``delta`` holding the
+line-level changes against the previous version. A delta that would be
+larger than ``MAX_DELTA_RATIO`` of the full text is stored as a snapshot
+instead, so rebuilding a version never replays an expensive chain.
+
+Rebuilt texts are kept in a small in-process LRU cache (versions never
+change once written), and diffs between any two versions are cached in the
+``ConfigDiff`` table so every process can reuse them.
+"""
+
+import difflib
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ConfigDiff, ConfigVersion
+
+DEFAULT_OPTIONS = {
+    "SNAPSHOT_INTERVAL": 20,
+    "MAX_DELTA_RATIO": 0.5,
+    "TEXT_CACHE_SIZE": 64,
+}
+
+
+def archive_options():
+    """
+    Returns the default options updated with ``settings.CONFIG_ARCHIVE``.
+    """
+    options = dict(DEFAULT_OPTIONS)
+    options.update(getattr(settings, "CONFIG_ARCHIVE", {}))
+    return options
+
+
+class TextCache:
+    """
+    Thread-safe LRU cache of rebuilt configuration texts keyed by version id.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._texts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, version_id):
+        with self._lock:
+            text = self._texts.get(version_id)
+            if text is not None:
+                self._texts.move_to_end(version_id)
+            return text
+
+    def put(self, version_id, text):
+        with self._lock:
+            self._texts[version_id] = text
+            self._texts.move_to_end(version_id)
+            while len(self._texts) > self.size:
+                self._texts.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._texts.clear()
+
+
+text_cache = TextCache(archive_options()["TEXT_CACHE_SIZE"])
+
+
+def make_delta(old_lines, new_lines):
+    """
+    Returns the edits turning ``old_lines`` into ``new_lines`` as a list of
+    ``[start, end, replacement lines]`` against the old line numbers.
+    """
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    return [
+        [i1, i2, new_lines[j1:j2]]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+
+
+def apply_delta(old_lines, delta):
+    """
+    Applies a delta produced by ``make_delta``.
+    """
+    lines = []
+    position = 0
+    for start, end, replacement in delta:
+        lines.extend(old_lines[position:start])
+        lines.extend(replacement)
+        position = end
+    lines.extend(old_lines[position:])
+    return lines
+
+
+def _delta_counts(delta):
+    added = sum(len(replacement) for _, _, replacement in delta)
+    removed = sum(end - start for start, end, _ in delta)
+    return added, removed
+
+
+def version_text(version):
+    """
+    Returns the full configuration text of a version.
+
+    Starts from the closest cached or snapshot version at or below it and
+    replays the deltas after that in one query.
+    """
+    text = text_cache.get(version.pk)
+    if text is not None:
+        return text
+    if version.kind == "snapshot":
+        text_cache.put(version.pk, version.data)
+        return version.data
+
+    base = (
+        ConfigVersion.objects.filter(
+            device_id=version.device_id, kind="snapshot", version__lt=version.version
+        )
+        .order_by("-version")
+        .first()
+    )
+    if base is None:
+        raise ValueError(f"{version} has no snapshot to rebuild from")
+    chain = list(
+        ConfigVersion.objects.filter(
+            device_id=version.device_id,
+            version__gt=base.version,
+            version__lte=version.version,
+        ).order_by("version")
+    )
+    # Skip ahead to the newest version that is already cached.
+    lines = base.data.splitlines()
+    for index in range(len(chain) - 1, -1, -1):
+        cached = text_cache.get(chain[index].pk)
+        if cached is not None:
+            lines = cached.splitlines()
+            chain = chain[index + 1 :]
+            break
+    for step in chain:
+        lines = apply_delta(lines, json.loads(step.data))
+    text = "\n".join(lines)
+    text_cache.put(version.pk, text)
+    return text
+
+
+def archive_config(device, text, captured_at=None):
+    """
+    Adds a backup of ``device`` to the archive.
+
+    Returns ``(version, created)``; ``created`` is False when the text is
+    identical to the latest version.
+    """
+    options = archive_options()
+    captured_at = captured_at or timezone.now()
+    text = "\n".join(text.splitlines())
+    digest = hashlib.sha256(text.encode()).hexdigest()
+    with transaction.atomic():
+        latest = (
+            ConfigVersion.objects.select_for_update()
+            .filter(device=device)
+            .order_by("-version")
+            .first()
+        )
+        if latest is not None and latest.digest == digest:
+            latest.last_seen_at = captured_at
+            latest.save(update_fields=["last_seen_at"])
+            return latest, False
+
+        lines = text.splitlines()
+        fields = {
+            "kind": "snapshot",
+            "data": text,
+            "lines_added": len(lines),
+            "lines_removed": 0,
+        }
+        if latest is not None:
+            delta = make_delta(version_text(latest).splitlines(), lines)
+            added, removed = _delta_counts(delta)
+            fields.update(lines_added=added, lines_removed=removed)
+            previous_snapshot = (
+                ConfigVersion.objects.filter(device=device, kind="snapshot")
+                .order_by("-version")
+                .values_list("version", flat=True)
+                .first()
+            )
+            encoded = json.dumps(delta, separators=(",", ":"))
+            if (
+                latest.version - (previous_snapshot or 0)
+                < options["SNAPSHOT_INTERVAL"] - 1
+                and len(encoded) <= len(text) * options["MAX_DELTA_RATIO"]
+            ):
+                fields.update(kind="delta", data=encoded)
+
+        version = ConfigVersion.objects.create(
+            device=device,
+            version=latest.version + 1 if latest else 1,
+            digest=digest,
+            size=len(text.encode()),
+            line_count=len(lines),
+            captured_at=captured_at,
+            last_seen_at=captured_at,
+            **fields,
+        )
+    text_cache.put(version.pk, text)
+    return version, True
+
+
+def diff_versions(from_version, to_version):
+    """
+    Returns the cached ``ConfigDiff`` between two versions, computing it once.
+    """
+    cached = ConfigDiff.objects.filter(
+        from_version=from_version, to_version=to_version
+    ).first()
+    if cached is not None:
+        return cached
+    lines = list(
+        difflib.unified_diff(
+            version_text(from_version).splitlines(),
+            version_text(to_version).splitlines(),
+            fromfile=f"{from_version.device.name} v{from_version.version}",
+            tofile=f"{to_version.device.name} v{to_version.version}",
+            lineterm="",
+        )
+    )
+    body = lines[2:]
+    diff, _ = ConfigDiff.objects.get_or_create(
+        from_version=from_version,
+        to_version=to_version,
+        defaults={
+            "diff": "\n".join(lines),
+            "lines_added": sum(1 for line in body if line.startswith("+")),
+            "lines_removed": sum(1 for line in body if line.startswith("-")),
+        },
+    )
+    return diff
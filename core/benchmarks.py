@@ -0,0 +1,347 @@
+"""
+End-to-end benchmarks of the command execution paths.
+
+Every scenario runs against ``FakeDeviceServer`` devices and reports
+throughput, latency percentiles, time spent in database writes and peak
+Python memory. For the command paths latency is the time from the start of
+the run until each result arrives; for the REST API it is per request.
+
+``manage.py benchmark`` creates the devices in a throwaway test database,
+runs the scenarios and saves the results as JSON. ``measure_storage`` backs
+``manage.py benchmark_storage``, which compares stored output size and read
+latency with and without compression and deduplication.
+"""
+
+import json
+import random
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Count, Sum
+from django.db.models.functions import Length
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from netmiko_tools.connection_pool import get_connection_pool
+from nornir_tools.inventory import inventory_cache
+from nornir_tools.utils import backup_config, run_commands
+
+from .blobs import collect_garbage, delete_referencing, referencing_relations
+from .concurrency import reset_concurrency_controller
+from .history import HistoryWriter
+from .models import NetworkDevice, OutputBlob
+
+SCENARIOS = {}
+
+WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE")
+
+
+def scenario(name):
+    """
+    Registers a benchmark scenario under ``name``.
+
+    A scenario is called with the benchmark context and the run's start time
+    and returns ``(latencies, failed)``.
+    """
+
+    def decorator(func):
+        SCENARIOS[name] = func
+        return func
+
+    return decorator
+
+
+def percentile(values, fraction):
+    """
+    Returns the nearest-rank percentile of ``values`` (0 < fraction <= 1).
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, round(fraction * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class DatabaseWriteTimer:
+    """
+    Execute wrapper that adds up the time spent in write statements.
+    """
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.statements = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.lstrip().upper().startswith(WRITE_STATEMENTS):
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.statements += 1
+
+
+class BenchmarkContext:
+    """
+    Devices, commands and a logged-in client shared by the scenarios.
+    """
+
+    def __init__(self, devices, commands, user):
+        self.devices = devices
+        self.commands = commands
+        # The test client's default host is not in ALLOWED_HOSTS outside tests.
+        host = settings.ALLOWED_HOSTS[0].lstrip("*.") if settings.ALLOWED_HOSTS else ""
+        self.client = Client(HTTP_HOST=host or "localhost")
+        self.client.force_login(user)
+
+    @property
+    def device_names(self):
+        return [device.name for device in self.devices]
+
+
+def benchmark_user():
+    user, _ = get_user_model().objects.get_or_create(
+        username="benchmark", defaults={"is_staff": True, "is_superuser": True}
+    )
+    return user
+
+
+def create_devices(count, server):
+    """
+    Replaces the benchmark devices with ``count`` devices served by ``server``.
+
+    Each device gets its own loopback address (127.0.x.y) because addresses
+    are unique; the simulator must listen on all of them.
+    """
+    NetworkDevice.objects.filter(name__startswith="bench-").delete()
+    NetworkDevice.objects.bulk_create(
+        NetworkDevice(
+            name=f"bench-{index:04d}",
+            ip_address=f"127.0.{index // 250}.{index % 250 + 1}",
+            port=server.port,
+            device_type="cisco_ios",
+            username=server.username,
+            password=server.password,
+        )
+        for index in range(count)
+    )
+    return list(NetworkDevice.objects.filter(name__startswith="bench-"))
+
+
+def reset_state():
+    """
+    Drops sessions, cached inventory and learned limits between scenarios.
+    """
+    get_connection_pool().close_all()
+    inventory_cache.clear()
+    reset_concurrency_controller()
+
+
+def run_scenario(name, context, track_memory=True):
+    """
+    Runs one scenario and returns its measurements as a dict.
+    """
+    reset_state()
+    timer = DatabaseWriteTimer()
+    if track_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        with connection.execute_wrapper(timer):
+            latencies, failed = SCENARIOS[name](context, started)
+        elapsed = time.perf_counter() - started
+        peak_memory = tracemalloc.get_traced_memory()[1] if track_memory else None
+    finally:
+        if track_memory:
+            tracemalloc.stop()
+
+    return {
+        "path": name,
+        "devices": len(context.devices),
+        "results": len(latencies),
+        "failed": failed,
+        "elapsed": round(elapsed, 3),
+        "throughput": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "p50": _rounded(percentile(latencies, 0.50)),
+        "p95": _rounded(percentile(latencies, 0.95)),
+        "p99": _rounded(percentile(latencies, 0.99)),
+        "db_write_seconds": round(timer.seconds, 4),
+        "db_write_statements": timer.statements,
+        "peak_memory_mb": (
+            round(peak_memory / 1024 / 1024, 2) if peak_memory is not None else None
+        ),
+    }
+
+
+def _rounded(value):
+    return round(value, 4) if value is not None else None
+
+
+@scenario("netmiko")
+def netmiko_view(context, started):
+    """
+    POSTs to the Netmiko streaming view and times each result event.
+    """
+    response = context.client.post(
+        reverse("netmiko_tools:stream"),
+        {
+            "execution_type": "show_cmd",
+            "command": context.commands[0],
+            "show_commands": "\n".join(context.commands[1:]),
+            "multiple_devices": [device.pk for device in context.devices],
+        },
+        secure=True,
+    )
+    if response.status_code != 200:
+        raise RuntimeError(f"Stream request failed: {response.content[:200]!r}")
+    latencies = []
+    failed = 0
+    for chunk in response.streaming_content:
+        event = chunk.decode() if isinstance(chunk, bytes) else chunk
+        if not event.startswith("event: result"):
+            continue
+        latencies.append(time.perf_counter() - started)
+        data = json.loads(event.split("data: ", 1)[1])
+        if data["status"] != "success":
+            failed += 1
+    return latencies, failed
+
+
+def _nornir_callback(started, latencies, outcome):
+    def on_result(device, command, status, output):
+        latencies.append(time.perf_counter() - started)
+        if status != "success":
+            outcome["failed"] += 1
+
+    return on_result
+
+
+@scenario("nornir_show")
+def nornir_show(context, started):
+    """
+    Runs ``run_commands`` and times each host/command result.
+    """
+    latencies, outcome = [], {"failed": 0}
+    run_commands(
+        context.device_names,
+        context.commands,
+        on_result=_nornir_callback(started, latencies, outcome),
+    )
+    return latencies, outcome["failed"]
+
+
+@scenario("nornir_backup")
+def nornir_backup(context, started):
+    """
+    Runs ``backup_config`` and times each host result.
+    """
+    latencies, outcome = [], {"failed": 0}
+    backup_config(
+        context.device_names, on_result=_nornir_callback(started, latencies, outcome)
+    )
+    return latencies, outcome["failed"]
+
+
+@scenario("rest")
+def rest_api(context, started):
+    """
+    Fetches the device list and every device's status through the REST API.
+    """
+    urls = [reverse("core:networkdevice-list")] + [
+        reverse("core:networkdevice-status", args=[device.pk])
+        for device in context.devices
+    ]
+    latencies = []
+    failed = 0
+    for url in urls:
+        request_started = time.perf_counter()
+        response = context.client.get(url, secure=True)
+        latencies.append(time.perf_counter() - request_started)
+        if response.status_code != 200:
+            failed += 1
+    return latencies, failed
+
+
+def sample_config(size, rng):
+    """
+    Returns roughly ``size`` bytes of running-config-like text.
+
+    Interfaces get random addresses and descriptions so the text compresses
+    like a real config rather than like a repeated line.
+    """
+    lines = ["!", "version 15.2", f"hostname bench-{rng.randrange(10000)}", "!"]
+    length = sum(len(line) + 1 for line in lines)
+    index = 0
+    while length < size:
+        block = [
+            f"interface GigabitEthernet0/{index}",
+            f" description uplink-{rng.randrange(1000):03d}-{rng.choice('abcdef')}",
+            " ip address 10.{}.{}.{} 255.255.255.0".format(
+                rng.randrange(256), rng.randrange(256), rng.randrange(1, 255)
+            ),
+            f" ip ospf cost {rng.randrange(1, 100)}",
+            " no shutdown",
+            "!",
+        ]
+        lines.extend(block)
+        length += sum(len(line) + 1 for line in block)
+        index += 1
+    return "\n".join(lines)[:size]
+
+
+def measure_storage(model, device, outputs, threshold, reads=200, seed=0):
+    """
+    Stores ``outputs`` as history rows with the given compression threshold
+    and returns the stored size, write time and read latencies.
+
+    Outputs go through ``HistoryWriter`` like real runs, so repeated outputs
+    share one ``OutputBlob``. A threshold of None stores every blob
+    uncompressed, which is the baseline.
+    """
+    # Blobs are shared between the history tables; start from an empty store.
+    for relation in referencing_relations():
+        delete_referencing(relation.related_model.objects.all())
+    collect_garbage(grace_period=timedelta(0))
+    with override_settings(HISTORY_COMPRESSION={"THRESHOLD": threshold}):
+        started = time.perf_counter()
+        with HistoryWriter(model, batch_size=500, flush_interval=60) as history:
+            for output in outputs:
+                history.add(
+                    device=device, command="show running-config", output=output
+                )
+        write_seconds = time.perf_counter() - started
+
+    blobs = OutputBlob.objects.aggregate(count=Count("id"), total=Sum(Length("data")))
+    stored = blobs["total"] or 0
+    started = time.perf_counter()
+    scanned = sum(len(row.output) for row in model.objects.select_related("blob"))
+    scan_seconds = time.perf_counter() - started
+
+    pks = list(model.objects.values_list("pk", flat=True))
+    rng = random.Random(seed)
+    latencies = []
+    for _ in range(min(reads, len(pks))):
+        pk = rng.choice(pks)
+        request_started = time.perf_counter()
+        model.objects.select_related("blob").get(pk=pk).output
+        latencies.append(time.perf_counter() - request_started)
+
+    logical = sum(len(output.encode()) for output in outputs)
+    return {
+        "threshold": threshold,
+        "rows": len(outputs),
+        "blobs": blobs["count"],
+        "logical_bytes": logical,
+        "stored_bytes": stored,
+        "ratio": round(stored / logical, 3) if logical else None,
+        "write_seconds": round(write_seconds, 4),
+        "scan_seconds": round(scan_seconds, 4),
+        "scanned_chars": scanned,
+        "read_p50": _rounded(percentile(latencies, 0.50)),
+        "read_p95": _rounded(percentile(latencies, 0.95)),
+    }
@@ -0,0 +1,232 @@
+"""
+Content-addressed storage for command output.
+
+History rows point at an ``OutputBlob`` keyed by the SHA-256 of the output
+instead of storing their own copy, so a nightly backup of an unchanged
+config costs one small row and a hash lookup. Each blob counts the rows
+referencing it; deleting history through ``delete_referencing()`` (or one
+row at a time, through the ``post_delete`` signal) releases references in
+bulk, and ``collect_garbage()`` removes blobs nobody references any more.
+``recount_references()`` rebuilds the counts from the history tables should
+they ever drift, e.g. after rows were removed with raw SQL.
+"""
+
+import hashlib
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import (
+    BinaryField,
+    Count,
+    ExpressionWrapper,
+    F,
+    IntegerField,
+    OuterRef,
+    Subquery,
+    Value,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .fields import iter_decompressed
+from .models import OutputBlob
+
+# Keeps lookups below SQLite's bound-parameter limit.
+LOOKUP_BATCH_SIZE = 500
+
+# History listings show this much of each output; the rest is fetched lazily.
+PREVIEW_LINES = 10
+PREVIEW_CHARS = 1000
+
+# Unreferenced blobs younger than this are kept: a concurrent writer may have
+# looked the blob up and be about to add its reference.
+DEFAULT_GRACE_PERIOD = timedelta(hours=1)
+
+_bulk_release = ContextVar("bulk_blob_release", default=False)
+
+
+def digest_text(text):
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def iter_blob_output(blob_id, chunk_size):
+    """
+    Returns an iterator over a blob's output as UTF-8 bytes, in chunks of at
+    most ``chunk_size``. Only the stored (compressed) bytes are loaded.
+    """
+    # Read as a plain binary column to skip the field's full decompression.
+    stored = ExpressionWrapper(F("data"), output_field=BinaryField())
+    data = OutputBlob.objects.values_list(stored, flat=True).get(pk=blob_id)
+    return iter_decompressed(data or b"", chunk_size)
+
+
+def output_preview(text):
+    """
+    Returns ``(preview, line count)`` for an output.
+    """
+    lines = text.splitlines()
+    return "\n".join(lines[:PREVIEW_LINES])[:PREVIEW_CHARS], len(lines)
+
+
+def _chunks(items, size=LOOKUP_BATCH_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def _adjust_refcounts(counts, sign):
+    """
+    Applies ``{blob id: references}`` with one UPDATE per distinct count.
+    """
+    by_count = defaultdict(list)
+    for blob_id, count in counts.items():
+        by_count[count].append(blob_id)
+    now = timezone.now()
+    for count, blob_ids in by_count.items():
+        for chunk in _chunks(blob_ids):
+            OutputBlob.objects.filter(pk__in=chunk).update(
+                refcount=F("refcount") + sign * count, last_used_at=now
+            )
+
+
+def store_outputs(texts):
+    """
+    Ensures a blob exists for every text and adds one reference per text.
+
+    Returns ``{digest: blob id}``.
+    """
+    counts = Counter()
+    texts_by_digest = {}
+    for text in texts:
+        digest = digest_text(text)
+        counts[digest] += 1
+        texts_by_digest.setdefault(digest, text)
+
+    with transaction.atomic():
+        blob_ids = {}
+        for chunk in _chunks(counts):
+            blob_ids.update(
+                OutputBlob.objects.filter(digest__in=chunk).values_list("digest", "id")
+            )
+        missing = [digest for digest in counts if digest not in blob_ids]
+        if missing:
+            blobs = []
+            for digest in missing:
+                text = texts_by_digest[digest]
+                preview, line_count = output_preview(text)
+                blobs.append(
+                    OutputBlob(
+                        digest=digest,
+                        data=text,
+                        size=len(text.encode()),
+                        preview=preview,
+                        line_count=line_count,
+                    )
+                )
+            # Another writer may insert the same digest first; re-read after.
+            OutputBlob.objects.bulk_create(
+                blobs,
+                batch_size=LOOKUP_BATCH_SIZE,
+                ignore_conflicts=True,
+            )
+            for chunk in _chunks(missing):
+                blob_ids.update(
+                    OutputBlob.objects.filter(digest__in=chunk).values_list(
+                        "digest", "id"
+                    )
+                )
+        _adjust_refcounts(
+            {blob_ids[digest]: count for digest, count in counts.items()}, 1
+        )
+    return blob_ids
+
+
+def release_blobs(blob_ids):
+    """
+    Drops one reference per id in ``blob_ids`` (ids may repeat).
+    """
+    _adjust_refcounts(Counter(blob_id for blob_id in blob_ids if blob_id), -1)
+
+
+def delete_referencing(queryset):
+    """
+    Deletes rows of a ``BlobOutput`` model and releases their blob references
+    with a handful of grouped UPDATEs rather than one per row.
+
+    Returns the ``(count, per-model counts)`` of ``QuerySet.delete()``.
+    """
+    token = _bulk_release.set(True)
+    try:
+        with transaction.atomic():
+            counts = Counter(
+                dict(
+                    queryset.order_by()
+                    .values_list("blob")
+                    .annotate(references=Count("pk"))
+                )
+            )
+            deleted = queryset.delete()
+            _adjust_refcounts(counts, -1)
+    finally:
+        _bulk_release.reset(token)
+    return deleted
+
+
+def release_deleted_row(sender, instance, **kwargs):
+    """
+    ``post_delete`` receiver releasing the blob of a single deleted row.
+    """
+    if not _bulk_release.get() and instance.blob_id:
+        release_blobs([instance.blob_id])
+
+
+def referencing_relations():
+    """
+    Returns the reverse relations of every model pointing at ``OutputBlob``.
+    """
+    return [
+        relation
+        for relation in OutputBlob._meta.related_objects
+        if relation.field.name == "blob"
+    ]
+
+
+def collect_garbage(grace_period=DEFAULT_GRACE_PERIOD, batch_size=1000):
+    """
+    Deletes unreferenced blobs in batches and returns how many were removed.
+
+    A blob must have a zero refcount, be idle for ``grace_period`` and have
+    no referencing rows, so a drifted count can never delete live output.
+    """
+    candidates = OutputBlob.objects.filter(
+        refcount__lte=0, last_used_at__lt=timezone.now() - grace_period
+    )
+    for relation in referencing_relations():
+        candidates = candidates.filter(**{f"{relation.name}__isnull": True})
+    removed = 0
+    while True:
+        batch = list(candidates.values_list("pk", flat=True)[:batch_size])
+        if not batch:
+            return removed
+        removed += OutputBlob.objects.filter(pk__in=batch).delete()[0]
+
+
+def recount_references():
+    """
+    Recomputes every blob's refcount from the referencing tables.
+    """
+    total = Value(0, output_field=IntegerField())
+    for relation in referencing_relations():
+        references = (
+            relation.related_model.objects.filter(blob=OuterRef("pk"))
+            .order_by()
+            .values("blob")
+            .annotate(total=Count("pk"))
+            .values("total")
+        )
+        total = total + Coalesce(
+            Subquery(references, output_field=IntegerField()), 0
+        )
+    return OutputBlob.objects.update(refcount=total)
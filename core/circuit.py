@@ -0,0 +1,210 @@
+"""
+Per-device circuit breakers for device connections.
+
+A device that is down costs the full connect timeout on every run. Each
+device's breaker counts consecutive connection failures (timeouts, refused or
+reset connections, SSH negotiation errors); once ``FAILURE_THRESHOLD`` is
+reached the circuit opens and connections are refused with ``CircuitOpen``
+until ``retry_at``, so results come back as "skipped" immediately. After the
+cooling-off period one caller is let through as a probe (half-open): success
+closes the circuit, another failure opens it again for twice as long, up to
+``MAX_COOL_OFF``. Authentication failures prove the device is reachable and
+do not count.
+
+State lives in ``DeviceCircuit`` rows so the web server and every job worker
+share it; healthy devices have no row and cost one primary-key lookup per
+connection.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from paramiko.ssh_exception import AuthenticationException, SSHException
+
+from .metrics import CIRCUIT_EVENTS
+from .models import DeviceCircuit
+
+DEFAULT_OPTIONS = {
+    "ENABLED": True,
+    "FAILURE_THRESHOLD": 3,
+    "COOL_OFF": 60,
+    "MAX_COOL_OFF": 900,
+    "PROBE_TIMEOUT": 120,
+}
+
+
+def circuit_options():
+    """
+    Returns the default options updated with ``settings.CIRCUIT_BREAKER``.
+    """
+    options = dict(DEFAULT_OPTIONS)
+    options.update(getattr(settings, "CIRCUIT_BREAKER", {}))
+    return options
+
+
+class CircuitOpen(Exception):
+    """
+    Raised instead of connecting to a device whose circuit is open.
+    """
+
+    def __init__(self, circuit):
+        self.circuit = circuit
+        retry_at = timezone.localtime(circuit.retry_at)
+        super().__init__(
+            f"skipped: circuit open after {circuit.consecutive_failures} "
+            f"connection failures, next attempt after {retry_at:%H:%M:%S}"
+        )
+
+
+def is_connection_failure(exception):
+    """
+    True for errors showing the device could not be reached, as opposed to
+    rejected credentials or failing commands.
+    """
+    if isinstance(exception, AuthenticationException):
+        return False
+    return isinstance(exception, (OSError, SSHException))
+
+
+def cool_off(failures, options):
+    """
+    Returns how long a circuit stays open after ``failures`` consecutive
+    failures, doubling with every failed probe.
+    """
+    doublings = max(failures - options["FAILURE_THRESHOLD"], 0)
+    seconds = options["COOL_OFF"] * 2 ** min(doublings, 16)
+    return timedelta(seconds=min(seconds, options["MAX_COOL_OFF"]))
+
+
+def check_circuit(device_id, now=None):
+    """
+    Raises ``CircuitOpen`` unless a connection to the device may be attempted.
+
+    Returns the device's ``DeviceCircuit`` (None when it has none); pass it to
+    ``record_connection`` once the attempt finished. When an open circuit's
+    cooling-off period has passed, exactly one caller is let through as the
+    probe.
+    """
+    options = circuit_options()
+    if not options["ENABLED"]:
+        return None
+    circuit = DeviceCircuit.objects.filter(pk=device_id).first()
+    if circuit is None or circuit.state == "closed":
+        return circuit
+    now = now or timezone.now()
+    if circuit.state == "open":
+        due = circuit.retry_at is None or circuit.retry_at <= now
+    else:
+        # A probe that never reported back does not hold the circuit forever.
+        stale = now - timedelta(seconds=options["PROBE_TIMEOUT"])
+        due = circuit.probe_started_at is None or circuit.probe_started_at <= stale
+    if due:
+        claimed = DeviceCircuit.objects.filter(
+            pk=device_id,
+            state=circuit.state,
+            probe_started_at=circuit.probe_started_at,
+        ).update(state="half_open", probe_started_at=now)
+        if claimed:
+            circuit.state = "half_open"
+            circuit.probe_started_at = now
+            CIRCUIT_EVENTS.labels("probe").inc()
+            return circuit
+    CIRCUIT_EVENTS.labels("skipped").inc()
+    raise CircuitOpen(circuit)
+
+
+def record_connection(device_id, circuit, exception=None):
+    """
+    Records the outcome of a connection attempt allowed by ``check_circuit``.
+
+    Errors other than connection failures count as a success, since the
+    device answered.
+    """
+    options = circuit_options()
+    if not options["ENABLED"]:
+        return
+    if exception is None or not is_connection_failure(exception):
+        if circuit is not None and (
+            circuit.state != "closed" or circuit.consecutive_failures
+        ):
+            DeviceCircuit.objects.filter(pk=device_id).update(
+                state="closed",
+                consecutive_failures=0,
+                opened_at=None,
+                retry_at=None,
+                probe_started_at=None,
+            )
+            if circuit.state != "closed":
+                CIRCUIT_EVENTS.labels("closed").inc()
+        return
+    now = timezone.now()
+    with transaction.atomic():
+        circuit, _ = DeviceCircuit.objects.select_for_update().get_or_create(
+            pk=device_id
+        )
+        circuit.consecutive_failures += 1
+        circuit.last_failure_at = now
+        circuit.last_error = str(exception) or type(exception).__name__
+        if (
+            circuit.state == "half_open"
+            or circuit.consecutive_failures >= options["FAILURE_THRESHOLD"]
+        ):
+            if circuit.state != "open":
+                CIRCUIT_EVENTS.labels("opened").inc()
+            circuit.state = "open"
+            circuit.opened_at = now
+            circuit.retry_at = now + cool_off(circuit.consecutive_failures, options)
+            circuit.probe_started_at = None
+        circuit.save()
+
+
+class ConnectionAttempts:
+    """
+    Circuit breaker accounting for one device operation, however many
+    connection attempts its retries make.
+
+    Creating it checks the circuit (raising ``CircuitOpen``). The first
+    successful connection is recorded at once; ``finish()`` records a single
+    failure when no attempt connected. ``device_id`` None disables both.
+    """
+
+    def __init__(self, device_id):
+        self.device_id = device_id
+        self.circuit = check_circuit(device_id) if device_id is not None else None
+        self.connected = False
+        self.error = None
+
+    def succeeded(self):
+        if not self.connected:
+            self.connected = True
+            if self.device_id is not None:
+                record_connection(self.device_id, self.circuit)
+
+    def failed(self, exception):
+        self.error = exception
+
+    def finish(self):
+        if self.connected or self.error is None:
+            return
+        if self.device_id is not None:
+            record_connection(self.device_id, self.circuit, self.error)
+        self.error = None
+
+
+def device_circuit(device):
+    """
+    Returns the device's ``DeviceCircuit``, or an unsaved closed one.
+    """
+    try:
+        return device.circuit
+    except DeviceCircuit.DoesNotExist:
+        return DeviceCircuit(device=device)
+
+
+def reset_circuit(device_id):
+    """
+    Closes a device's circuit, e.g. after it was repaired.
+    """
+    DeviceCircuit.objects.filter(pk=device_id).delete()
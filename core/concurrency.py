@@ -0,0 +1,516 @@
+"""
+Adaptive concurrency limits for command runs.
+
+Every device session runs inside ``ConcurrencyController.slot()``, which waits
+until the session fits under the global, per-device-type and per-site limits
+and until no other session to the same device is open. The global limit
+adapts AIMD-style: it grows by one after a window of healthy completions and
+is cut multiplicatively when the error rate or latency of a window rises, so
+large estates are not capped at a fixed worker count and small boxes back off
+on their own.
+
+Limits come from ``settings.COMMAND_CONCURRENCY`` and can be tightened per job
+through ``job.options["concurrency"]``.
+
+Worker threads query the database (circuits, learned timeouts, device
+locks), so they close their connection when each device is done.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import asynccontextmanager, contextmanager
+from datetime import timedelta
+from statistics import median
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.utils import timezone
+
+from .metrics import SESSIONS_ACTIVE, SESSIONS_WAITING, SLOT_WAIT_SECONDS
+
+DEFAULT_OPTIONS = {
+    "GLOBAL_LIMIT": 10,
+    "MIN_LIMIT": 1,
+    "MAX_LIMIT": 50,
+    "PER_DEVICE_TYPE": {},
+    "PER_SITE": {},
+    "ADAPTIVE": True,
+    "LATENCY_TOLERANCE": 2.0,
+    "MAX_ERROR_RATE": 0.2,
+    "DECREASE_FACTOR": 0.5,
+    "DEVICE_LOCKS": "local",
+    "LOCK_TIMEOUT": 600,
+    "LOCK_POLL_INTERVAL": 0.5,
+}
+
+# Smallest number of completions evaluated before the limit changes.
+MIN_WINDOW = 5
+
+logger = logging.getLogger(__name__)
+
+
+def concurrency_options(overrides=None):
+    """
+    Returns the default options updated with settings and per-job overrides.
+    """
+    options = dict(DEFAULT_OPTIONS)
+    options.update(getattr(settings, "COMMAND_CONCURRENCY", {}))
+    options.update(overrides or {})
+    return options
+
+
+class AIMDLimit:
+    """
+    Additive-increase/multiplicative-decrease limit driven by completions.
+
+    Latency is judged against the best window median seen so far. The baseline
+    drifts up slowly so a network that is permanently slower is eventually
+    accepted rather than pinning the limit at its minimum.
+    """
+
+    def __init__(
+        self,
+        initial,
+        minimum,
+        maximum,
+        latency_tolerance=2.0,
+        max_error_rate=0.2,
+        decrease_factor=0.5,
+    ):
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self.value = min(max(initial, self.minimum), self.maximum)
+        self.latency_tolerance = latency_tolerance
+        self.max_error_rate = max_error_rate
+        self.decrease_factor = decrease_factor
+        self.baseline = None
+        self.increases = 0
+        self.decreases = 0
+        self._samples = []
+        self._peak_in_flight = 0
+
+    def record(self, latency, failed, in_flight):
+        """
+        Adds one completion and re-evaluates the limit once a window is full.
+        """
+        self._samples.append((latency, failed))
+        self._peak_in_flight = max(self._peak_in_flight, in_flight)
+        if len(self._samples) < max(self.value, MIN_WINDOW):
+            return
+
+        failures = sum(1 for _, sample_failed in self._samples if sample_failed)
+        error_rate = failures / len(self._samples)
+        latencies = [
+            sample_latency
+            for sample_latency, sample_failed in self._samples
+            if not sample_failed
+        ]
+        window_latency = median(latencies) if latencies else None
+        congested = error_rate > self.max_error_rate or (
+            window_latency is not None
+            and self.baseline is not None
+            and window_latency > self.baseline * self.latency_tolerance
+        )
+
+        if window_latency is not None:
+            if self.baseline is None:
+                self.baseline = window_latency
+            else:
+                self.baseline = min(window_latency, self.baseline * 1.1)
+
+        if congested:
+            self.value = max(self.minimum, int(self.value * self.decrease_factor))
+            self.decreases += 1
+        elif self._peak_in_flight >= self.value and self.value < self.maximum:
+            # Only grow when the current limit was actually used.
+            self.value += 1
+            self.increases += 1
+
+        self._samples = []
+        self._peak_in_flight = 0
+
+
+class Limiter:
+    """
+    Counts open sessions against global, per-device-type and per-site limits.
+    """
+
+    def __init__(self, options):
+        self.per_device_type = options["PER_DEVICE_TYPE"]
+        self.per_site = options["PER_SITE"]
+        self.adaptive = None
+        self.fixed_limit = options["GLOBAL_LIMIT"]
+        if options["ADAPTIVE"]:
+            self.adaptive = AIMDLimit(
+                options["GLOBAL_LIMIT"],
+                options["MIN_LIMIT"],
+                options["MAX_LIMIT"],
+                options["LATENCY_TOLERANCE"],
+                options["MAX_ERROR_RATE"],
+                options["DECREASE_FACTOR"],
+            )
+        self.active = 0
+        self.active_by_type = Counter()
+        self.active_by_site = Counter()
+
+    @property
+    def limit(self):
+        return self.adaptive.value if self.adaptive else self.fixed_limit
+
+    @property
+    def max_workers(self):
+        """
+        Upper bound on the number of sessions this limiter can ever allow.
+        """
+        return self.adaptive.maximum if self.adaptive else self.fixed_limit
+
+    def has_room(self, device_type, site, counted=True):
+        """
+        True when a session fits; ``counted=False`` ignores the global limit.
+        """
+        if counted and self.active >= self.limit:
+            return False
+        type_limit = self.per_device_type.get(device_type)
+        if type_limit is not None and self.active_by_type[device_type] >= type_limit:
+            return False
+        site_limit = self.per_site.get(site) if site else None
+        if site_limit is not None and self.active_by_site[site] >= site_limit:
+            return False
+        return True
+
+    def take(self, device_type, site, counted=True):
+        if counted:
+            self.active += 1
+        self.active_by_type[device_type] += 1
+        if site:
+            self.active_by_site[site] += 1
+
+    def give_back(self, device_type, site, latency, failed, counted=True):
+        in_flight = self.active
+        self.active_by_type[device_type] -= 1
+        if site:
+            self.active_by_site[site] -= 1
+        if not counted:
+            return
+        self.active -= 1
+        if self.adaptive:
+            self.adaptive.record(latency, failed, in_flight)
+
+
+class Lease:
+    """
+    Handle for an open slot; call ``mark_failed()`` when the session failed.
+    """
+
+    def __init__(self, device_id):
+        self.device_id = device_id
+        self.failed = False
+
+    def mark_failed(self):
+        self.failed = True
+
+
+class DatabaseDeviceLocks:
+    """
+    Per-device leases stored in ``DeviceLock`` so separate worker processes
+    never open concurrent sessions to the same device.
+
+    While this process holds leases, a background thread renews them every
+    third of ``lock_timeout``, so only leases of dead workers expire, however
+    long a session runs.
+    """
+
+    def __init__(self, lock_timeout=600, poll_interval=0.5):
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self._held = {}
+        self._held_lock = threading.Lock()
+        self._renewer = None
+
+    def acquire(self, device_id):
+        from .models import DeviceLock
+
+        owner = uuid.uuid4().hex
+        while True:
+            try:
+                with transaction.atomic():
+                    DeviceLock.objects.create(device_id=device_id, owner=owner)
+                break
+            except IntegrityError:
+                # A lease not renewed within the timeout belongs to a dead worker.
+                expired = timezone.now() - timedelta(seconds=self.lock_timeout)
+                DeviceLock.objects.filter(
+                    device_id=device_id, renewed_at__lt=expired
+                ).delete()
+                time.sleep(self.poll_interval)
+        with self._held_lock:
+            self._held[device_id] = owner
+            if self._renewer is None:
+                self._renewer = threading.Thread(target=self._renew, daemon=True)
+                self._renewer.start()
+        return owner
+
+    def release(self, device_id, owner):
+        from .models import DeviceLock
+
+        with self._held_lock:
+            self._held.pop(device_id, None)
+        DeviceLock.objects.filter(device_id=device_id, owner=owner).delete()
+
+    def _renew(self):
+        from .models import DeviceLock
+
+        try:
+            while True:
+                time.sleep(self.lock_timeout / 3)
+                with self._held_lock:
+                    owners = list(self._held.values())
+                    if not owners:
+                        self._renewer = None
+                        return
+                try:
+                    DeviceLock.objects.filter(owner__in=owners).update(
+                        renewed_at=timezone.now()
+                    )
+                except DatabaseError:
+                    logger.warning("Could not renew device locks", exc_info=True)
+        finally:
+            connection.close()
+
+
+def _closing_connection(func, *args):
+    """
+    Calls ``func`` and closes the calling thread's database connection, for
+    work handed to short-lived or pooled threads.
+    """
+    try:
+        return func(*args)
+    finally:
+        connection.close()
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class ConcurrencyController:
+    """
+    Hands out session slots to worker threads.
+
+    Usage::
+
+        with controller.slot(device.pk, device.device_type, device.site) as lease:
+            if not run(device):
+                lease.mark_failed()
+    """
+
+    def __init__(self, options=None):
+        options = options or concurrency_options()
+        self.options = options
+        self.limiter = Limiter(options)
+        self._condition = threading.Condition()
+        self._busy_devices = set()
+        self._async_waiters = []
+        self.device_waits = 0
+        self.database_locks = None
+        if options["DEVICE_LOCKS"] == "database":
+            self.database_locks = DatabaseDeviceLocks(
+                options["LOCK_TIMEOUT"], options["LOCK_POLL_INTERVAL"]
+            )
+
+    def job_limiter(self, overrides=None):
+        """
+        Returns a limiter for one job's own limits, or None without overrides.
+
+        The job limiter is checked in addition to the shared one, so a job can
+        only tighten the limits, never exceed the process-wide ones.
+        """
+        if not overrides:
+            return None
+        return Limiter(concurrency_options(overrides))
+
+    def max_workers(self, job_limiter=None, device_count=None):
+        """
+        Returns a thread pool size large enough for the limit to grow into.
+        """
+        workers = self.limiter.max_workers
+        if job_limiter is not None:
+            workers = min(workers, job_limiter.max_workers)
+        if device_count is not None:
+            workers = min(workers, device_count)
+        return max(1, workers)
+
+    def _can_start(self, device_id, device_type, site, job_limiter, counted=True):
+        if device_id in self._busy_devices:
+            return False
+        if job_limiter is not None and not job_limiter.has_room(device_type, site):
+            return False
+        return self.limiter.has_room(device_type, site, counted)
+
+    def _start(self, device_id, device_type, site, job_limiter, counted=True):
+        self._busy_devices.add(device_id)
+        self.limiter.take(device_type, site, counted)
+        if job_limiter is not None:
+            job_limiter.take(device_type, site)
+
+    def _finish(self, lease, device_type, site, job_limiter, latency, counted=True):
+        with self._condition:
+            self._busy_devices.discard(lease.device_id)
+            self.limiter.give_back(device_type, site, latency, lease.failed, counted)
+            if job_limiter is not None:
+                job_limiter.give_back(device_type, site, latency, lease.failed)
+            self._condition.notify_all()
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError:
+                pass  # The waiter's event loop has closed.
+        SESSIONS_ACTIVE.dec()
+
+    @contextmanager
+    def slot(self, device_id, device_type, site="", job_limiter=None):
+        """
+        Blocks until a session to the device may start, then yields a Lease.
+        """
+        queued = time.monotonic()
+        with self._condition:
+            if device_id in self._busy_devices:
+                self.device_waits += 1
+            SESSIONS_WAITING.inc()
+            while not self._can_start(device_id, device_type, site, job_limiter):
+                self._condition.wait()
+            SESSIONS_WAITING.dec()
+            self._start(device_id, device_type, site, job_limiter)
+        SESSIONS_ACTIVE.inc()
+        SLOT_WAIT_SECONDS.observe(time.monotonic() - queued)
+
+        lease = Lease(device_id)
+        owner = None
+        started = time.monotonic()
+        try:
+            if self.database_locks is not None:
+                owner = self.database_locks.acquire(device_id)
+                started = time.monotonic()
+            yield lease
+        except BaseException:
+            lease.mark_failed()
+            raise
+        finally:
+            latency = time.monotonic() - started
+            if owner is not None:
+                self.database_locks.release(device_id, owner)
+            self._finish(lease, device_type, site, job_limiter, latency)
+
+    @asynccontextmanager
+    async def async_slot(self, device_id, device_type, site="", job_limiter=None):
+        """
+        ``slot()`` for sessions driven from an event loop, waiting without
+        blocking the loop.
+
+        The per-device mutex and the per-device-type, per-site and job limits
+        apply as for threads. The shared global limit, which sizes thread
+        pools, neither applies to nor adapts from these sessions; the asyncio
+        backend caps them with ``ASYNC_ENGINE["MAX_SESSIONS"]``.
+        """
+        loop = asyncio.get_running_loop()
+        queued = time.monotonic()
+        SESSIONS_WAITING.inc()
+        try:
+            first = True
+            while True:
+                with self._condition:
+                    if first and device_id in self._busy_devices:
+                        self.device_waits += 1
+                    first = False
+                    if self._can_start(
+                        device_id, device_type, site, job_limiter, counted=False
+                    ):
+                        self._start(
+                            device_id, device_type, site, job_limiter, counted=False
+                        )
+                        break
+                    future = loop.create_future()
+                    self._async_waiters.append((loop, future))
+                await future
+        finally:
+            SESSIONS_WAITING.dec()
+        SESSIONS_ACTIVE.inc()
+        SLOT_WAIT_SECONDS.observe(time.monotonic() - queued)
+
+        lease = Lease(device_id)
+        owner = None
+        started = time.monotonic()
+        try:
+            if self.database_locks is not None:
+                # The database is only reachable from synchronous code.
+                owner = await asyncio.to_thread(
+                    _closing_connection, self.database_locks.acquire, device_id
+                )
+                started = time.monotonic()
+            yield lease
+        except BaseException:
+            lease.mark_failed()
+            raise
+        finally:
+            latency = time.monotonic() - started
+            if owner is not None:
+                await asyncio.to_thread(
+                    _closing_connection, self.database_locks.release, device_id, owner
+                )
+            self._finish(
+                lease, device_type, site, job_limiter, latency, counted=False
+            )
+
+    def stats(self):
+        with self._condition:
+            adaptive = self.limiter.adaptive
+            return {
+                "limit": self.limiter.limit,
+                "active": self.limiter.active,
+                "active_by_device_type": {
+                    key: count
+                    for key, count in self.limiter.active_by_type.items()
+                    if count
+                },
+                "active_by_site": {
+                    key: count
+                    for key, count in self.limiter.active_by_site.items()
+                    if count
+                },
+                "busy_devices": len(self._busy_devices),
+                "device_waits": self.device_waits,
+                "adaptive": adaptive is not None,
+                "baseline_latency": adaptive.baseline if adaptive else None,
+                "increases": adaptive.increases if adaptive else 0,
+                "decreases": adaptive.decreases if adaptive else 0,
+            }
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_concurrency_controller():
+    """
+    Returns the process-wide controller, creating it from settings on first use.
+    """
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = ConcurrencyController()
+        return _controller
+
+
+def reset_concurrency_controller():
+    """
+    Discards the process-wide controller so the next run starts from settings.
+    """
+    global _controller
+    with _controller_lock:
+        _controller = None
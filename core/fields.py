@@ -0,0 +1,136 @@
+"""
+Model fields shared by the apps.
+
+``CompressedTextField`` stores command output as bytes: outputs smaller than
+the threshold are stored inline as UTF-8, larger ones zlib-compressed. A
+one-byte marker tells the two apart, so the threshold can change at any time
+without touching existing rows. Models see a plain ``str`` either way.
+
+The stored bytes cannot be searched with ``contains``/``icontains`` lookups.
+"""
+
+import zlib
+
+from django import forms
+from django.conf import settings
+from django.db import models
+
+INLINE = b"t"
+ZLIB = b"z"
+
+
+def compression_options():
+    """
+    Returns the configured inline threshold (bytes) and zlib level.
+    """
+    options = getattr(settings, "HISTORY_COMPRESSION", {})
+    return options.get("THRESHOLD", 1024), options.get("LEVEL", 6)
+
+
+def compress_text(text, threshold, level=6):
+    """
+    Encodes text for storage, compressing it when it reaches ``threshold`` bytes.
+
+    A ``threshold`` of None stores everything inline.
+    """
+    data = text.encode()
+    if threshold is not None and len(data) >= threshold:
+        compressed = zlib.compress(data, level)
+        if len(compressed) < len(data):
+            return ZLIB + compressed
+    return INLINE + data
+
+
+def decompress_text(data):
+    """
+    Decodes bytes written by ``compress_text``.
+    """
+    data = bytes(data)
+    marker, payload = data[:1], data[1:]
+    if marker == ZLIB:
+        return zlib.decompress(payload).decode()
+    if marker == INLINE:
+        return payload.decode()
+    # Unmarked bytes (or an empty value) are plain UTF-8.
+    return data.decode(errors="replace")
+
+
+def iter_decompressed(data, chunk_size):
+    """
+    Yields the UTF-8 text of bytes written by ``compress_text`` in chunks of at
+    most ``chunk_size`` bytes, decompressing incrementally so the whole text
+    is never held in memory.
+    """
+    data = memoryview(data)
+    marker, payload = bytes(data[:1]), data[1:]
+    if marker == ZLIB:
+        decompressor = zlib.decompressobj()
+        while payload:
+            chunk = decompressor.decompress(payload, chunk_size)
+            if chunk:
+                yield chunk
+            payload = decompressor.unconsumed_tail
+        tail = decompressor.flush()
+        if tail:
+            yield tail
+        return
+    if marker != INLINE:
+        payload = data
+    for start in range(0, len(payload), chunk_size):
+        yield bytes(payload[start : start + chunk_size])
+
+
+class CompressedTextField(models.BinaryField):
+    """
+    Text field stored compressed in a binary column, decompressed on load.
+
+    ``threshold`` overrides ``HISTORY_COMPRESSION["THRESHOLD"]`` for this field.
+    """
+
+    description = "Text stored zlib-compressed above a size threshold"
+    empty_values = [None, ""]
+
+    def __init__(self, *args, threshold=None, **kwargs):
+        self.threshold = threshold
+        kwargs.setdefault("editable", True)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.threshold is not None:
+            kwargs["threshold"] = self.threshold
+        if kwargs.get("editable") is True:
+            del kwargs["editable"]
+        return name, path, args, kwargs
+
+    def get_default(self):
+        if self.has_default():
+            return super().get_default()
+        return ""
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return decompress_text(value)
+
+    def to_python(self, value):
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return decompress_text(value)
+        return value
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if isinstance(value, str):
+            threshold, level = compression_options()
+            if self.threshold is not None:
+                threshold = self.threshold
+            value = compress_text(value, threshold, level)
+        return super().get_db_prep_value(value, connection, prepared)
+
+    def value_to_string(self, obj):
+        # Serialize as text so fixtures stay readable and portable.
+        return self.value_from_object(obj)
+
+    def formfield(self, **kwargs):
+        return models.Field.formfield(
+            self, **{"form_class": forms.CharField, "widget": forms.Textarea, **kwargs}
+        )
@@ -0,0 +1,85 @@
+"""
+Buffered writer for command history rows.
+
+Bulk runs produce one history row per device; inserting them one at a time
+serializes SQLite writers and, on large runs, costs as much as the SSH work.
+``HistoryWriter`` collects rows and writes them with ``bulk_create`` inside a
+single transaction once a batch fills up or the flush interval elapses.
+Time spent writing is accumulated in ``write_seconds``; it is measured per
+batch, so it is reported per run rather than stored on each row.
+"""
+
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+
+def writer_options():
+    """
+    Returns the configured batch size and flush interval.
+    """
+    options = getattr(settings, "HISTORY_WRITER", {})
+    return options.get("BATCH_SIZE", 100), options.get("FLUSH_INTERVAL", 2.0)
+
+
+class HistoryWriter:
+    """
+    Collects unsaved model instances and inserts them in batches.
+
+    Use as a context manager so the remaining rows are flushed on exit::
+
+        with HistoryWriter(CommandHistory) as writer:
+            for device, output, status in results:
+                writer.add(device=device, command=command, output=output)
+    """
+
+    def __init__(self, model, batch_size=None, flush_interval=None):
+        default_batch_size, default_flush_interval = writer_options()
+        self.model = model
+        self.batch_size = batch_size or default_batch_size
+        self.flush_interval = (
+            default_flush_interval if flush_interval is None else flush_interval
+        )
+        self.pending = []
+        self.written = 0
+        self.write_seconds = 0.0
+        self._last_flush = time.monotonic()
+
+    def add(self, **fields):
+        """
+        Queues a row, flushing when the batch is full or the time window elapsed.
+        """
+        instance = self.model(**fields)
+        self.pending.append(instance)
+        if (
+            len(self.pending) >= self.batch_size
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        ):
+            self.flush()
+        return instance
+
+    def flush(self):
+        """
+        Writes every pending row in one transaction.
+        """
+        self._last_flush = time.monotonic()
+        if not self.pending:
+            return
+        started = time.perf_counter()
+        with transaction.atomic():
+            attach_blobs = getattr(self.model, "attach_blobs", None)
+            if attach_blobs is not None:
+                # Deduplicated output: resolve the batch's blobs in bulk too.
+                attach_blobs(self.pending)
+            self.model.objects.bulk_create(self.pending, batch_size=self.batch_size)
+        self.write_seconds += time.perf_counter() - started
+        self.written += len(self.pending)
+        self.pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+        return False
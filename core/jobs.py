@@ -0,0 +1,297 @@
+"""
+Background job engine backed by the Django database.
+
+Views submit jobs and return immediately; the ``run_jobs`` management command
+claims queued jobs and executes them with the runner registered for the job's
+engine and kind. Runners persist a ``JobResult`` per device as soon as it
+completes, so the status API can report progress while the job is running.
+
+While a job runs, its worker records a heartbeat on it. A running job whose
+heartbeat is older than ``JOB_WORKER["STALE_AFTER"]`` lost its worker, so the
+next worker looking for work marks it failed; its devices that did not
+succeed can then be retried like any finished job's.
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .metrics import JOB_SECONDS, JOBS
+from .models import Job, JobResult
+
+logger = logging.getLogger(__name__)
+
+JOB_RUNNERS = {}
+
+DEFAULT_OPTIONS = {
+    "HEARTBEAT_INTERVAL": 30,
+    "STALE_AFTER": 300,
+}
+
+
+def worker_options():
+    """
+    Returns the default options updated with ``settings.JOB_WORKER``.
+    """
+    options = dict(DEFAULT_OPTIONS)
+    options.update(getattr(settings, "JOB_WORKER", {}))
+    return options
+
+
+def register_runner(engine, kind):
+    """
+    Decorator registering a callable that executes jobs of the given engine and kind.
+
+    Runners are called with the job and a ``record_result(device, command,
+    status, output, cached=False)`` callback to invoke once per completed
+    device; ``cached`` marks results that did not come from the device.
+    """
+
+    def decorator(func):
+        JOB_RUNNERS[(engine, kind)] = func
+        return func
+
+    return decorator
+
+
+def submit_job(
+    engine, kind, devices, commands, options=None, user=None, parent=None
+):
+    """
+    Queues a job for the background worker and returns it; ``parent`` is the
+    job it retries, if any.
+    """
+    with transaction.atomic():
+        job = Job.objects.create(
+            engine=engine,
+            kind=kind,
+            commands=list(commands),
+            options=options or {},
+            created_by=user if user and user.is_authenticated else None,
+            parent=parent,
+        )
+        job.devices.set(devices)
+    return job
+
+
+def retry_devices(job):
+    """
+    Returns the devices of a job that did not succeed: those with a failed or
+    skipped result, and those it never reached.
+    """
+    unsuccessful = job.results.exclude(status="success").values("device")
+    reached = job.results.values("device")
+    return job.devices.filter(Q(pk__in=unsuccessful) | ~Q(pk__in=reached))
+
+
+def retry_job(job, user=None):
+    """
+    Queues the commands of a finished job again on its devices that did not
+    succeed, as a job linked to it through ``parent``. Returns the new job, or
+    None when every device succeeded.
+    """
+    if not job.is_finished:
+        raise ValueError(f"Job {job.pk} has not finished yet")
+    devices = list(retry_devices(job))
+    if not devices:
+        return None
+    return submit_job(
+        job.engine,
+        job.kind,
+        devices,
+        job.commands,
+        dict(job.options),
+        user=user,
+        parent=job,
+    )
+
+
+def default_worker_id():
+    """
+    Returns an identifier for this worker process.
+    """
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def reclaim_stale_jobs(now=None):
+    """
+    Marks running jobs whose worker stopped sending heartbeats as failed and
+    returns their ids.
+
+    As in ``claim_next_job``, a conditional UPDATE ensures each job is
+    reclaimed once, and not after its worker reported in again.
+    """
+    now = now or timezone.now()
+    stale = now - timedelta(seconds=worker_options()["STALE_AFTER"])
+    candidates = Job.objects.filter(status="running").filter(
+        Q(heartbeat_at__lt=stale) | Q(heartbeat_at__isnull=True, started_at__lt=stale)
+    )
+    reclaimed = []
+    for job in candidates.only("engine", "kind", "worker", "heartbeat_at"):
+        updated = Job.objects.filter(
+            pk=job.pk, status="running", heartbeat_at=job.heartbeat_at
+        ).update(
+            status="failed",
+            error=f"Worker {job.worker} stopped responding",
+            finished_at=now,
+        )
+        if updated:
+            logger.warning("Job %s lost its worker %s", job.pk, job.worker)
+            JOBS.labels(job.engine, job.kind, "failed").inc()
+            reclaimed.append(job.pk)
+    return reclaimed
+
+
+class Heartbeat:
+    """
+    Context manager recording a heartbeat on a running job from a background
+    thread every ``interval`` seconds.
+    """
+
+    def __init__(self, job, interval=None):
+        self.job = job
+        self.interval = interval or worker_options()["HEARTBEAT_INTERVAL"]
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        try:
+            while not self._stopped.wait(self.interval):
+                try:
+                    Job.objects.filter(pk=self.job.pk, status="running").update(
+                        heartbeat_at=timezone.now()
+                    )
+                except DatabaseError:
+                    logger.warning(
+                        "Could not record the heartbeat of job %s",
+                        self.job.pk,
+                        exc_info=True,
+                    )
+        finally:
+            connection.close()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+
+
+def claim_next_job(worker_id):
+    """
+    Atomically marks the oldest queued job as running and returns it, or None.
+
+    The conditional UPDATE means two workers polling the same database can never
+    claim the same job, without relying on row locks SQLite does not have.
+    Running jobs that lost their worker are reclaimed first.
+    """
+    reclaim_stale_jobs()
+    candidates = Job.objects.filter(status="queued").order_by("created_at", "id")
+    for job_id in candidates.values_list("id", flat=True)[:10]:
+        now = timezone.now()
+        claimed = Job.objects.filter(pk=job_id, status="queued").update(
+            status="running", worker=worker_id, started_at=now, heartbeat_at=now
+        )
+        if claimed:
+            return Job.objects.get(pk=job_id)
+    return None
+
+
+def record_result(job, device, command, status, output, cached=False):
+    """
+    Persists the result of a job on one device.
+    """
+    return JobResult.objects.create(
+        job=job,
+        device=device,
+        command=command,
+        status=status,
+        output=output,
+        cached=cached,
+    )
+
+
+def run_job(job):
+    """
+    Executes a claimed job with its registered runner and records the outcome.
+    """
+    runner = JOB_RUNNERS.get((job.engine, job.kind))
+    started = time.perf_counter()
+    try:
+        if runner is None:
+            raise ValueError(f"No runner registered for {job.engine} {job.kind} jobs")
+        with Heartbeat(job):
+            runner(
+                job,
+                lambda device, command, status, output, cached=False: record_result(
+                    job, device, command, status, output, cached
+                ),
+            )
+    except Exception as e:
+        logger.exception("Job %s failed", job.pk)
+        job.status = "failed"
+        job.error = str(e)
+    else:
+        job.status = "completed"
+    job.finished_at = timezone.now()
+    finished = Job.objects.filter(pk=job.pk, status="running").update(
+        status=job.status, error=job.error, finished_at=job.finished_at
+    )
+    if not finished:
+        # Reclaimed as stale while it ran; keep the recorded outcome.
+        logger.warning("Job %s was reclaimed before it finished", job.pk)
+        job.refresh_from_db()
+        return job
+    JOBS.labels(job.engine, job.kind, job.status).inc()
+    JOB_SECONDS.labels(job.engine, job.kind).observe(time.perf_counter() - started)
+    return job
+
+
+def job_summary(job, after=0):
+    """
+    Returns a JSON-serializable snapshot of a job and its results newer than ``after``.
+    """
+    results = job.results.filter(pk__gt=after).select_related("device")
+    counts = {"success": 0, "failed": 0, "skipped": 0}
+    for row in job.results.values("status").annotate(total=Count("id")):
+        counts[row["status"]] = row["total"]
+    return {
+        "id": job.pk,
+        "engine": job.engine,
+        "kind": job.kind,
+        "status": job.status,
+        "error": job.error,
+        "commands": job.commands,
+        "device_count": job.devices.count(),
+        "completed_count": job.results.values("device").distinct().count(),
+        "counts": counts,
+        "retry_count": retry_devices(job).count() if job.is_finished else 0,
+        "parent_id": job.parent_id,
+        "retry_ids": list(job.retries.values_list("pk", flat=True)),
+        "created_at": job.created_at.isoformat(),
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "results": [
+            {
+                "id": result.pk,
+                "device": result.device.name,
+                "device_id": result.device_id,
+                "command": result.command,
+                "status": result.status,
+                "output": result.output,
+                "cached": result.cached,
+                "completed_at": result.completed_at.isoformat(),
+            }
+            for result in results
+        ],
+    }
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from core.archive import archive_config
+from core.models import NetworkDevice
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed the configuration archive from successful running-config backups "
+        "in the command history, oldest first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--device", action="append", help="Device name (repeatable)."
+        )
+
+    def handle(self, *args, **options):
+        devices = NetworkDevice.objects.filter(config_versions__isnull=True)
+        if options["device"]:
+            devices = devices.filter(name__in=options["device"])
+        for device in devices.distinct():
+            backups = (
+                device.command_history.filter(
+                    command="show running-config", status="success"
+                )
+                .select_related("blob")
+                .order_by("executed_at")
+            )
+            created = 0
+            for row in backups.iterator():
+                created += archive_config(device, row.output, row.executed_at)[1]
+            self.stdout.write(f"{device.name}: {created} versions")
@@ -0,0 +1,142 @@
+import json
+import platform
+import secrets
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from core.benchmarks import (
+    SCENARIOS,
+    BenchmarkContext,
+    benchmark_user,
+    create_devices,
+    run_scenario,
+)
+from core.simulator import FakeDeviceServer
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the Netmiko, Nornir and REST paths against simulated SSH "
+        "devices in a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--devices",
+            type=int,
+            nargs="+",
+            default=[10, 100, 1000],
+            help="Fleet sizes to benchmark.",
+        )
+        parser.add_argument(
+            "--paths",
+            nargs="+",
+            choices=sorted(SCENARIOS),
+            default=list(SCENARIOS),
+            help="Execution paths to benchmark.",
+        )
+        parser.add_argument(
+            "--commands",
+            nargs="+",
+            default=["show version", "show ip interface brief"],
+        )
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.05,
+            help="Seconds each simulated device takes to answer a command.",
+        )
+        parser.add_argument("--output-size", type=int, default=2048)
+        parser.add_argument("--failure-rate", type=float, default=0.0)
+        parser.add_argument(
+            "--no-memory",
+            action="store_true",
+            help="Skip tracemalloc, which slows the runs down.",
+        )
+        parser.add_argument("--output", default="benchmark_results.json")
+        parser.add_argument(
+            "--compare",
+            help="Earlier results file to compare throughput and p95 against.",
+        )
+
+    def handle(self, *args, **options):
+        if min(options["devices"]) < 1:
+            raise CommandError("--devices must be at least 1.")
+        baseline = None
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                baseline = {
+                    (result["path"], result["devices"]): result
+                    for result in json.load(f)["results"]
+                }
+
+        results = []
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            # Devices use 127.0.x.y addresses, so listen on all of them with
+            # throwaway credentials.
+            with FakeDeviceServer(
+                host="0.0.0.0",
+                latency=options["latency"],
+                output_size=options["output_size"],
+                failure_rate=options["failure_rate"],
+                password=secrets.token_hex(16),
+            ) as server:
+                user = benchmark_user()
+                for count in options["devices"]:
+                    context = BenchmarkContext(
+                        create_devices(count, server), options["commands"], user
+                    )
+                    for path in options["paths"]:
+                        self.stdout.write(f"Running {path} with {count} devices...")
+                        result = run_scenario(
+                            path, context, track_memory=not options["no_memory"]
+                        )
+                        results.append(result)
+                        self.report(result, baseline)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        with open(options["output"], "w") as f:
+            json.dump(
+                {
+                    "metadata": {
+                        "created_at": timezone.now().isoformat(),
+                        "python": platform.python_version(),
+                        "database": connection.vendor,
+                        "commands": options["commands"],
+                        "latency": options["latency"],
+                        "output_size": options["output_size"],
+                        "failure_rate": options["failure_rate"],
+                    },
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+        self.stdout.write(self.style.SUCCESS(f"Results saved to {options['output']}"))
+
+    def report(self, result, baseline):
+        line = (
+            "  {path} x{devices}: {elapsed}s, {throughput} results/s, "
+            "p50 {p50}s p95 {p95}s p99 {p99}s, {failed} failed, "
+            "db writes {db_write_seconds}s"
+        ).format(**result)
+        if result["peak_memory_mb"] is not None:
+            line += f", peak memory {result['peak_memory_mb']} MB"
+        previous = (baseline or {}).get((result["path"], result["devices"]))
+        if previous and previous["throughput"] and previous["p95"]:
+            line += " (throughput {:+.1f}%, p95 {:+.1f}%)".format(
+                _change(previous["throughput"], result["throughput"]),
+                _change(previous["p95"], result["p95"]),
+            )
+        self.stdout.write(line)
+
+
+def _change(before, after):
+    return (after - before) / before * 100
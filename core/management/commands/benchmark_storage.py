@@ -0,0 +1,110 @@
+import json
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.benchmarks import measure_storage, sample_config
+from core.fields import compression_options
+from core.models import NetworkDevice
+from netmiko_tools.models import CommandHistory
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare stored output size and read latency with and without "
+        "compression in a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=2000)
+        parser.add_argument(
+            "--output-size",
+            type=int,
+            default=20000,
+            help="Size in bytes of the large (backup-like) outputs.",
+        )
+        parser.add_argument(
+            "--small-fraction",
+            type=float,
+            default=0.5,
+            help="Share of rows holding short show-command outputs (200 bytes).",
+        )
+        parser.add_argument(
+            "--duplicate-fraction",
+            type=float,
+            default=0.5,
+            help="Share of rows repeating an earlier output, like unchanged "
+            "nightly backups.",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=int,
+            help="Inline threshold to test; defaults to HISTORY_COMPRESSION.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Also save the results as JSON.")
+
+    def handle(self, *args, **options):
+        threshold = options["threshold"]
+        if threshold is None:
+            threshold = compression_options()[0]
+        rng = random.Random(options["seed"])
+        sizes = [
+            200 if rng.random() < options["small_fraction"] else options["output_size"]
+            for _ in range(options["rows"])
+        ]
+        outputs = []
+        for size in sizes:
+            if outputs and rng.random() < options["duplicate_fraction"]:
+                outputs.append(rng.choice(outputs))
+            else:
+                outputs.append(sample_config(size, rng))
+
+        results = []
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            device = NetworkDevice.objects.create(
+                name="bench-storage",
+                ip_address="127.0.0.1",
+                device_type="cisco_ios",
+                username="bench",
+                password="bench",
+            )
+            # Both engines share one history table, so one model covers both.
+            for label, mode_threshold in (
+                ("uncompressed", None),
+                ("compressed", threshold),
+            ):
+                result = measure_storage(
+                    CommandHistory,
+                    device,
+                    outputs,
+                    mode_threshold,
+                    seed=options["seed"],
+                )
+                result.update(model=CommandHistory.__name__, mode=label)
+                results.append(result)
+                self.report(result)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(
+                    {"database": connection.vendor, "results": results}, f, indent=2
+                )
+            self.stdout.write(
+                self.style.SUCCESS(f"Results saved to {options['output']}")
+            )
+
+    def report(self, result):
+        self.stdout.write(
+            "  {model} {mode}: {rows} rows in {blobs} blobs, {stored_bytes} bytes "
+            "stored for {logical_bytes} "
+            "(ratio {ratio}), write {write_seconds}s, full scan {scan_seconds}s, "
+            "row read p50 {read_p50}s p95 {read_p95}s".format(**result)
+        )
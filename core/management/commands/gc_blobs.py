@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from core.blobs import DEFAULT_GRACE_PERIOD, collect_garbage, recount_references
+
+
+class Command(BaseCommand):
+    help = "Delete stored command outputs no history row references any more."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace-minutes",
+            type=float,
+            default=DEFAULT_GRACE_PERIOD.total_seconds() / 60,
+            help="Keep unreferenced outputs used more recently than this.",
+        )
+        parser.add_argument(
+            "--recount",
+            action="store_true",
+            help="Rebuild reference counts from the history tables first.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options["recount"]:
+            updated = recount_references()
+            self.stdout.write(f"Recounted references of {updated} outputs")
+        removed = collect_garbage(
+            grace_period=timedelta(minutes=options["grace_minutes"]),
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} unreferenced outputs"))
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.reachability import next_interval, poll_reachability, reachability_options
+
+
+class Command(BaseCommand):
+    help = (
+        "Probe every active device with a TCP connect on an interval and store "
+        "the results for the status API, dashboard and device list."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            help="Seconds between rounds (defaults to REACHABILITY['INTERVAL']).",
+        )
+        parser.add_argument("--timeout", type=float, help="Connect timeout per probe.")
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run a single round and exit.",
+        )
+
+    def handle(self, *args, **options):
+        reachability = reachability_options()
+        if options["interval"] is not None:
+            reachability["INTERVAL"] = options["interval"]
+        if options["timeout"] is not None:
+            reachability["TIMEOUT"] = options["timeout"]
+        self.stdout.write("Reachability poller started")
+        try:
+            while True:
+                close_old_connections()
+                started = time.monotonic()
+                online, offline = poll_reachability(options=reachability)
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f"{online} online, {offline} offline ({elapsed:.1f}s)"
+                )
+                if options["once"]:
+                    break
+                time.sleep(max(next_interval(reachability) - elapsed, 0.0))
+        except KeyboardInterrupt:
+            self.stdout.write("Reachability poller stopped")
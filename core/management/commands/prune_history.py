@@ -0,0 +1,95 @@
+import os
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.blobs import collect_garbage
+from core.retention import (
+    RetentionArchive,
+    expired_audit_log,
+    expired_history,
+    prune_audit_log,
+    prune_history,
+    retention_options,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete command history and audit log entries past their retention "
+        "period (HISTORY_RETENTION), in batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many rows each policy would remove.",
+        )
+        parser.add_argument(
+            "--archive-dir",
+            help="Export removed rows as gzipped NDJSON into this directory "
+            "(defaults to HISTORY_RETENTION['ARCHIVE_DIR']).",
+        )
+        parser.add_argument("--batch-size", type=int)
+        parser.add_argument(
+            "--pause",
+            type=float,
+            help="Seconds to sleep between batches.",
+        )
+        parser.add_argument(
+            "--skip-gc",
+            action="store_true",
+            help="Leave unreferenced outputs for a later gc_blobs run.",
+        )
+
+    def handle(self, *args, **options):
+        retention = retention_options()
+        batch_size = options["batch_size"] or retention["BATCH_SIZE"]
+        pause = options["pause"]
+        if pause is None:
+            pause = retention["BATCH_PAUSE"]
+        now = timezone.now()
+        expired = expired_history(retention["POLICIES"], now=now)
+        audit_days = retention["AUDIT_LOG_DAYS"]
+        audit_log = None
+        if audit_days is not None:
+            audit_log = expired_audit_log(audit_days, now=now)
+
+        if options["dry_run"]:
+            for policy, queryset in expired:
+                self.stdout.write(f"{self.describe(policy)}: {queryset.count()} rows")
+            if audit_log is not None:
+                self.stdout.write(
+                    f"audit log older than {audit_days} days: {audit_log.count()}"
+                )
+            return
+
+        archive_dir = options["archive_dir"] or retention["ARCHIVE_DIR"]
+        archive = None
+        if archive_dir:
+            archive = RetentionArchive(
+                os.path.join(archive_dir, f"history-{now:%Y%m%dT%H%M%S}.ndjson.gz")
+            )
+        try:
+            for policy, queryset in expired:
+                removed = prune_history(queryset, batch_size, pause, archive)
+                self.stdout.write(f"{self.describe(policy)}: removed {removed} rows")
+            if audit_log is not None:
+                removed = prune_audit_log(audit_log, batch_size, pause, archive)
+                self.stdout.write(f"audit log: removed {removed} entries")
+        finally:
+            if archive is not None:
+                archive.close()
+        if archive is not None and archive.rows:
+            self.stdout.write(f"Archived {archive.rows} rows to {archive.path}")
+        if not options["skip_gc"]:
+            collected = collect_garbage()
+            self.stdout.write(f"Removed {collected} unreferenced outputs")
+        self.stdout.write(self.style.SUCCESS("Retention run complete"))
+
+    def describe(self, policy):
+        conditions = ", ".join(
+            f"{key}={value}" for key, value in policy.items() if key != "days"
+        )
+        return f"{conditions or 'all'} older than {policy['days']} days"
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.jobs import claim_next_job, default_worker_id, run_job
+
+
+class Command(BaseCommand):
+    help = "Run queued command jobs, using the database as the job queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=2.0,
+            help="Seconds to wait between polls when the queue is empty.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once the queue is empty instead of polling forever.",
+        )
+        parser.add_argument(
+            "--worker-id",
+            default=default_worker_id(),
+            help="Identifier recorded on the jobs this worker claims.",
+        )
+
+    def handle(self, *args, **options):
+        worker_id = options["worker_id"]
+        self.stdout.write(f"Job worker {worker_id} started")
+        try:
+            while True:
+                close_old_connections()
+                job = claim_next_job(worker_id)
+                if job is None:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll_interval"])
+                    continue
+
+                self.stdout.write(f"Running {job}")
+                run_job(job)
+                self.stdout.write(f"{job} finished: {job.status}")
+        except KeyboardInterrupt:
+            self.stdout.write("Job worker stopped")
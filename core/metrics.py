@@ -0,0 +1,582 @@
+"""
+In-process metrics registry exposed in the Prometheus text format.
+
+Counters, gauges and histograms live in memory and are cheap to update (a
+dict lookup under a per-metric lock). The web server and the ``run_jobs``
+workers are separate processes, so when ``METRICS["MULTIPROCESS_DIR"]`` is
+set every process periodically writes a snapshot of its values to
+``<dir>/<pid>.json`` and ``/metrics`` merges the snapshots: counters and
+histograms are summed over every file, gauges only over processes that are
+still alive. Snapshots of exited processes are folded into one
+``dead.json`` (without their gauges) and removed at scrape time, so the
+directory does not grow with every worker restart. Point the directory at
+local, per-host storage and empty it when the service is redeployed.
+
+``/metrics`` requires ``METRICS["TOKEN"]`` as a bearer token or a logged-in
+user, unless ``ALLOW_ANONYMOUS`` opts in to unauthenticated scrapes.
+
+Values that are global by nature, such as the number of queued jobs, are
+computed at scrape time by collectors registered with ``register_collector``
+instead of being stored.
+
+Usage::
+
+    JOBS = counter("netmgr_jobs_total", "Jobs run", ["engine", "status"])
+    JOBS.labels("netmiko", "completed").inc()
+"""
+
+import atexit
+import json
+import math
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+from django.conf import settings
+from django.db.models import Count
+
+DEFAULT_OPTIONS = {
+    "ENABLED": True,
+    "MULTIPROCESS_DIR": None,
+    "FLUSH_INTERVAL": 5.0,
+    "TOKEN": None,
+    "ALLOW_ANONYMOUS": False,
+}
+
+# Counters and histograms of exited processes, summed.
+DEAD_SNAPSHOT = "dead.json"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def metrics_options():
+    """
+    Returns the default options updated with ``settings.METRICS``.
+    """
+    options = dict(DEFAULT_OPTIONS)
+    options.update(getattr(settings, "METRICS", {}))
+    return options
+
+
+class _Child:
+    """
+    One labelled series of a metric.
+    """
+
+    def __init__(self, metric, key):
+        self._metric = metric
+        self._key = key
+
+    def inc(self, amount=1):
+        self._metric._add(self._key, amount)
+
+    def dec(self, amount=1):
+        self._metric._add(self._key, -amount)
+
+    def set(self, value):
+        self._metric._set(self._key, value)
+
+    def observe(self, value):
+        self._metric._observe(self._key, value)
+
+
+class Metric:
+    """
+    Base class holding the values of every label combination of a metric.
+    """
+
+    type = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        if len(values) != len(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {values}"
+            )
+        return _Child(self, tuple(str(value) for value in values))
+
+    # Unlabelled metrics are updated directly.
+    def inc(self, amount=1):
+        self._add((), amount)
+
+    def dec(self, amount=1):
+        self._add((), -amount)
+
+    def set(self, value):
+        self._set((), value)
+
+    def observe(self, value):
+        self._observe((), value)
+
+    def _add(self, key, amount):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        self.registry.mark_dirty()
+
+    def _set(self, key, value):
+        with self._lock:
+            self._values[key] = value
+        self.registry.mark_dirty()
+
+    def _observe(self, key, value):
+        raise TypeError(f"{self.type} metrics cannot observe values")
+
+    def snapshot(self):
+        """
+        Returns ``[[label values, value], ...]`` for JSON serialization.
+        """
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def _add(self, key, amount):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        super()._add(key, amount)
+
+    def _set(self, key, value):
+        raise TypeError("Counters cannot be set")
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=None):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets or DEFAULT_BUCKETS))
+
+    def _add(self, key, amount):
+        raise TypeError("Histograms only observe values")
+
+    _set = _add
+
+    def _observe(self, key, value):
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # One count per bucket, then +Inf, then the sum.
+                counts = self._values[key] = [0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            else:
+                counts[len(self.buckets)] += 1
+            counts[-1] += value
+        self.registry.mark_dirty()
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(key), list(value)] for key, value in self._values.items()]
+
+
+class MetricsRegistry:
+    """
+    Holds the metrics of this process and renders the merged exposition.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = []
+        self._lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._flusher = None
+        self._flusher_pid = None
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self.metrics[metric.name] = metric
+        return metric
+
+    def register_collector(self, func):
+        """
+        Registers a callable returning ``(name, type, help, samples)`` tuples
+        at scrape time; ``samples`` is a list of ``(labels dict, value)``.
+        """
+        self.collectors.append(func)
+        return func
+
+    def mark_dirty(self):
+        self._dirty.set()
+        if self._flusher_pid != os.getpid():
+            # First update in this process, or in a worker forked after one.
+            self._start_flusher()
+
+    def _start_flusher(self):
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+            options = metrics_options()
+            if not options["ENABLED"] or not options["MULTIPROCESS_DIR"]:
+                return  # Nothing to share with other processes.
+            self._flusher = threading.Thread(
+                target=self._flush_periodically,
+                args=(options["MULTIPROCESS_DIR"], options["FLUSH_INTERVAL"]),
+                name="metrics-flusher",
+                daemon=True,
+            )
+            self._flusher.start()
+            atexit.register(self.flush, options["MULTIPROCESS_DIR"])
+
+    def _flush_periodically(self, directory, interval):
+        while True:
+            self._dirty.wait()
+            time.sleep(interval)
+            self.flush(directory)
+
+    def snapshot(self):
+        return {
+            name: {"type": metric.type, "values": metric.snapshot()}
+            for name, metric in list(self.metrics.items())
+        }
+
+    def flush(self, directory):
+        """
+        Atomically writes this process's values to ``<directory>/<pid>.json``.
+        """
+        self._dirty.clear()
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{os.getpid()}.json")
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as handle:
+            json.dump(self.snapshot(), handle)
+        os.replace(temporary, path)
+
+    def merged_values(self, directory=None):
+        """
+        Returns ``{name: {label values: value}}`` over this and, with a
+        directory, every other process.
+        """
+        snapshots = [(self.snapshot(), True)]
+        if directory and os.path.isdir(directory):
+            dead = _read_snapshot(os.path.join(directory, DEAD_SNAPSHOT))
+            if dead is not None:
+                snapshots.append((dead, False))
+            for pid, path in _process_snapshots(directory):
+                if pid == os.getpid():
+                    continue  # The live values above are newer.
+                snapshot = _read_snapshot(path)
+                if snapshot is not None:
+                    snapshots.append((snapshot, _process_alive(pid)))
+
+        merged = {name: {} for name in self.metrics}
+        for snapshot, alive in snapshots:
+            for name, data in snapshot.items():
+                metric = self.metrics.get(name)
+                if metric is None or (metric.type == "gauge" and not alive):
+                    continue
+                _add_values(merged[name], data["values"])
+        return merged
+
+    def prune(self, directory):
+        """
+        Folds the snapshots of exited processes into ``DEAD_SNAPSHOT`` and
+        removes them. Their gauges are dropped; counters and histograms keep
+        counting towards the totals.
+        """
+        if fcntl is None or not os.path.isdir(directory):
+            return
+        dead = [
+            (pid, path)
+            for pid, path in _process_snapshots(directory)
+            if not _process_alive(pid)
+        ]
+        if not dead:
+            return
+        with open(os.path.join(directory, ".prune.lock"), "w") as lock:
+            # Another scrape folding the same files would count them twice.
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            totals = {}
+            paths = []
+            dead_path = os.path.join(directory, DEAD_SNAPSHOT)
+            for path in [dead_path] + [path for _, path in dead]:
+                snapshot = _read_snapshot(path)
+                if snapshot is None:
+                    continue
+                if path != dead_path:
+                    paths.append(path)
+                for name, data in snapshot.items():
+                    if data["type"] == "gauge":
+                        continue
+                    entry = totals.setdefault(
+                        name, {"type": data["type"], "values": {}}
+                    )
+                    _add_values(entry["values"], data["values"])
+            if not paths:
+                return
+            temporary = f"{dead_path}.tmp"
+            with open(temporary, "w") as handle:
+                json.dump(
+                    {
+                        name: {
+                            "type": entry["type"],
+                            "values": [
+                                [list(key), value]
+                                for key, value in entry["values"].items()
+                            ],
+                        }
+                        for name, entry in totals.items()
+                    },
+                    handle,
+                )
+            os.replace(temporary, dead_path)
+            for path in paths:
+                os.remove(path)
+
+    def render(self, directory=None):
+        """
+        Returns the Prometheus text exposition (format 0.0.4).
+        """
+        lines = []
+        merged = self.merged_values(directory)
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f"# HELP {name} {_escape_help(metric.documentation)}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            for key, value in sorted(merged[name].items()):
+                labels = dict(zip(metric.labelnames, key))
+                if metric.type == "histogram":
+                    lines.extend(_histogram_lines(name, metric.buckets, labels, value))
+                else:
+                    lines.append(_sample(name, labels, value))
+        for collector in self.collectors:
+            for name, metric_type, documentation, samples in collector():
+                lines.append(f"# HELP {name} {_escape_help(documentation)}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    lines.append(_sample(name, labels, value))
+        return "\n".join(lines) + "\n"
+
+
+def _process_snapshots(directory):
+    """
+    Yields ``(pid, path)`` for every per-process snapshot in ``directory``.
+    """
+    for filename in os.listdir(directory):
+        pid, extension = os.path.splitext(filename)
+        if extension == ".json" and pid.isdigit():
+            yield int(pid), os.path.join(directory, filename)
+
+
+def _read_snapshot(path):
+    try:
+        with open(path) as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None  # Missing, or being replaced; the next scrape reads it.
+
+
+def _add_values(values, samples):
+    """
+    Adds snapshot ``[[labels, value], ...]`` samples into ``values``.
+    """
+    for labels, value in samples:
+        key = tuple(labels)
+        if isinstance(value, list):
+            current = values.get(key)
+            if current is None or len(current) != len(value):
+                values[key] = list(value)
+            else:
+                values[key] = [a + b for a, b in zip(current, value)]
+        else:
+            values[key] = values.get(key, 0) + value
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _escape_help(text):
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+def _sample(name, labels, value):
+    if labels:
+        rendered = ",".join(
+            f'{key}="{_escape_label(str(label))}"' for key, label in labels.items()
+        )
+        return f"{name}{{{rendered}}} {_format_value(value)}"
+    return f"{name} {_format_value(value)}"
+
+
+def _histogram_lines(name, buckets, labels, counts):
+    cumulative = 0
+    for bound, count in zip(buckets + (math.inf,), counts):
+        cumulative += count
+        bucket_labels = dict(labels, le=_format_value(float(bound)))
+        yield _sample(f"{name}_bucket", bucket_labels, cumulative)
+    yield _sample(f"{name}_sum", labels, float(counts[-1]))
+    yield _sample(f"{name}_count", labels, cumulative)
+
+
+registry = MetricsRegistry()
+
+
+def counter(name, documentation, labelnames=()):
+    return registry.register(Counter(registry, name, documentation, labelnames))
+
+
+def gauge(name, documentation, labelnames=()):
+    return registry.register(Gauge(registry, name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=None):
+    return registry.register(
+        Histogram(registry, name, documentation, labelnames, buckets)
+    )
+
+
+def register_collector(func):
+    return registry.register_collector(func)
+
+
+def render_metrics():
+    """
+    Returns the exposition for ``/metrics`` merged across processes.
+    """
+    directory = metrics_options()["MULTIPROCESS_DIR"]
+    if directory:
+        registry.prune(directory)
+    return registry.render(directory)
+
+
+# Metrics shared by the execution engines and the web tier.
+
+JOBS = counter(
+    "netmgr_jobs_total", "Background jobs finished", ["engine", "kind", "status"]
+)
+JOB_SECONDS = histogram(
+    "netmgr_job_duration_seconds",
+    "Wall time of background jobs",
+    ["engine", "kind"],
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600),
+)
+DEVICE_OPERATIONS = counter(
+    "netmgr_device_operations_total",
+    "Device operations (one session's commands) by outcome",
+    ["engine", "device_type", "status"],
+)
+DEVICE_OPERATION_SECONDS = histogram(
+    "netmgr_device_operation_duration_seconds",
+    "Time spent connecting, running and parsing per device operation",
+    ["engine", "device_type"],
+)
+DEVICE_FAILURES = counter(
+    "netmgr_device_failures_total",
+    "Failed device operations by exception class",
+    ["engine", "exception"],
+)
+DEVICE_RETRIES = counter(
+    "netmgr_device_retries_total",
+    "Device operations retried after a transient failure, by exception class",
+    ["exception"],
+)
+SESSIONS_OPENED = counter(
+    "netmgr_sessions_opened_total",
+    "SSH sessions opened to devices",
+    ["engine", "device_type"],
+)
+SESSIONS_ACTIVE = gauge(
+    "netmgr_sessions_active", "Device sessions holding a concurrency slot"
+)
+SESSIONS_WAITING = gauge(
+    "netmgr_sessions_waiting", "Device sessions queued for a concurrency slot"
+)
+SLOT_WAIT_SECONDS = histogram(
+    "netmgr_slot_wait_seconds", "Time spent waiting for a concurrency slot"
+)
+CIRCUIT_EVENTS = counter(
+    "netmgr_circuit_events_total",
+    "Device circuit breaker events (opened, probe, closed or skipped)",
+    ["event"],
+)
+SHOW_CACHE_LOOKUPS = counter(
+    "netmgr_show_cache_lookups_total",
+    "Show command cache lookups by outcome (hit, coalesced, miss or bypass)",
+    ["outcome"],
+)
+HTTP_REQUESTS = counter(
+    "netmgr_http_requests_total", "HTTP requests", ["view", "method", "status"]
+)
+HTTP_REQUEST_SECONDS = histogram(
+    "netmgr_http_request_duration_seconds",
+    "Time to produce a response, excluding streamed bodies",
+    ["view", "method"],
+)
+HTTP_REQUEST_QUERIES = histogram(
+    "netmgr_http_request_queries",
+    "Database queries run per request",
+    ["view"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+
+
+def record_device_operation(engine, device_type, status, seconds, exception=None):
+    """
+    Counts one device operation and, when it failed, its exception class.
+    """
+    DEVICE_OPERATIONS.labels(engine, device_type, status).inc()
+    DEVICE_OPERATION_SECONDS.labels(engine, device_type).observe(seconds)
+    if status != "success":
+        name = type(exception).__name__ if exception is not None else "CommandFailed"
+        DEVICE_FAILURES.labels(engine, name).inc()
+
+
+@register_collector
+def _job_queue():
+    from .models import Job
+
+    counts = dict(
+        Job.objects.filter(status__in=("queued", "running"))
+        .order_by()
+        .values_list("status")
+        .annotate(total=Count("id"))
+    )
+    yield (
+        "netmgr_jobs_pending",
+        "gauge",
+        "Jobs waiting for or held by a worker",
+        [
+            ({"status": status}, counts.get(status, 0))
+            for status in ("queued", "running")
+        ],
+    )
@@ -0,0 +1,57 @@
+"""
+Request metrics for the web tier.
+"""
+
+import time
+
+from django.db import connection
+
+from .metrics import (
+    HTTP_REQUEST_QUERIES,
+    HTTP_REQUEST_SECONDS,
+    HTTP_REQUESTS,
+    metrics_options,
+)
+
+
+class QueryCounter:
+    """
+    Database execute wrapper counting the queries of one request.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """
+    Records latency, status and query count per view.
+
+    Views are labelled by URL name so the series stay bounded; unmatched
+    paths share the "unmatched" label. For streaming responses only the time
+    to the first byte is measured.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = metrics_options()["ENABLED"]
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+        queries = QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = getattr(request, "resolver_match", None)
+        view = (match.view_name if match else None) or "unmatched"
+        HTTP_REQUESTS.labels(view, request.method, response.status_code).inc()
+        HTTP_REQUEST_SECONDS.labels(view, request.method).observe(elapsed)
+        HTTP_REQUEST_QUERIES.labels(view).observe(queries.count)
+        return response
@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-17 07:51
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_job_jobresult'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeviceLock',
+            fields=[
+                ('device', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='lock', serialize=False, to='core.networkdevice')),
+                ('owner', models.CharField(max_length=64)),
+                ('acquired_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Device Lock',
+                'verbose_name_plural': 'Device Locks',
+            },
+        ),
+        migrations.AddField(
+            model_name='networkdevice',
+            name='site',
+            field=models.CharField(blank=True, help_text='Location used for per-site limits', max_length=100),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-17 08:14
+
+import core.fields
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_networkdevice_site_devicelock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutputBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64, unique=True)),
+                ('data', core.fields.CompressedTextField(blank=True)),
+                ('size', models.PositiveIntegerField(default=0, help_text='Uncompressed size in bytes')),
+                ('refcount', models.IntegerField(default=0, help_text='Number of history rows pointing at this blob')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['refcount', 'last_used_at'], name='core_output_refcoun_bbd328_idx')],
+            },
+        ),
+    ]
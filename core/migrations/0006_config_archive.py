@@ -0,0 +1,58 @@
+# Generated by Django 5.2 on 2026-10-17 08:19
+
+import core.fields
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_outputblob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConfigVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField()),
+                ('kind', models.CharField(choices=[('snapshot', 'Snapshot'), ('delta', 'Delta')], max_length=10)),
+                ('data', core.fields.CompressedTextField(blank=True)),
+                ('digest', models.CharField(max_length=64)),
+                ('size', models.PositiveIntegerField(default=0)),
+                ('line_count', models.PositiveIntegerField(default=0)),
+                ('lines_added', models.PositiveIntegerField(default=0)),
+                ('lines_removed', models.PositiveIntegerField(default=0)),
+                ('captured_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_seen_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Last backup that returned this configuration')),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='config_versions', to='core.networkdevice')),
+            ],
+            options={
+                'verbose_name': 'Configuration Version',
+                'verbose_name_plural': 'Configuration Versions',
+                'ordering': ['device', '-version'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ConfigDiff',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('diff', core.fields.CompressedTextField(blank=True)),
+                ('lines_added', models.PositiveIntegerField(default=0)),
+                ('lines_removed', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('from_version', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.configversion')),
+                ('to_version', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.configversion')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='configversion',
+            constraint=models.UniqueConstraint(fields=('device', 'version'), name='unique_device_config_version'),
+        ),
+        migrations.AddConstraint(
+            model_name='configdiff',
+            constraint=models.UniqueConstraint(fields=('from_version', 'to_version'), name='unique_config_diff'),
+        ),
+    ]
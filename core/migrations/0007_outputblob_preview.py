@@ -0,0 +1,50 @@
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+# Same limits as core.blobs at the time of writing.
+PREVIEW_LINES = 10
+PREVIEW_CHARS = 1000
+
+
+def fill_previews(apps, schema_editor):
+    OutputBlob = apps.get_model("core", "OutputBlob")
+    batch = []
+    for blob in OutputBlob.objects.only("pk", "data").order_by("pk").iterator(
+        chunk_size=BATCH_SIZE
+    ):
+        lines = blob.data.splitlines()
+        blob.preview = "\n".join(lines[:PREVIEW_LINES])[:PREVIEW_CHARS]
+        blob.line_count = len(lines)
+        batch.append(blob)
+        if len(batch) >= BATCH_SIZE:
+            OutputBlob.objects.bulk_update(batch, ["preview", "line_count"])
+            batch = []
+    if batch:
+        OutputBlob.objects.bulk_update(batch, ["preview", "line_count"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_config_archive"),
+        # Blobs created while moving existing output must get previews too.
+        ("netmiko_tools", "0004_history_output_blobs"),
+        ("nornir_tools", "0004_history_output_blobs"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="outputblob",
+            name="line_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="outputblob",
+            name="preview",
+            field=models.TextField(
+                blank=True, help_text="First lines of the output, for history listings"
+            ),
+        ),
+        migrations.RunPython(fill_previews, migrations.RunPython.noop),
+    ]
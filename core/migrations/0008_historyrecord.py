@@ -0,0 +1,39 @@
+# Generated by Django 5.2 on 2026-10-17 08:29
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_outputblob_preview'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistoryRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('connect_time', models.FloatField(blank=True, help_text='Seconds to connect, handshake and log in', null=True)),
+                ('prompt_time', models.FloatField(blank=True, help_text='Seconds for prompt detection and setup', null=True)),
+                ('command_time', models.FloatField(blank=True, help_text='Seconds to send the command and read output', null=True)),
+                ('parse_time', models.FloatField(blank=True, help_text='Seconds spent parsing output with TextFSM', null=True)),
+                ('bytes_received', models.PositiveIntegerField(default=0)),
+                ('engine', models.CharField(choices=[('netmiko', 'Netmiko'), ('nornir', 'Nornir')], max_length=20)),
+                ('command', models.TextField()),
+                ('status', models.CharField(default='success', max_length=20)),
+                ('executed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('blob', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='%(app_label)s_%(class)s_set', to='core.outputblob')),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='command_history', to='core.networkdevice')),
+            ],
+            options={
+                'verbose_name': 'Command History',
+                'verbose_name_plural': 'Command histories',
+                'ordering': ['-executed_at'],
+                'abstract': False,
+                'indexes': [models.Index(fields=['executed_at'], name='history_time_idx'), models.Index(fields=['device', 'executed_at'], name='history_device_time_idx'), models.Index(fields=['device', 'engine', 'executed_at'], name='history_device_engine_idx'), models.Index(fields=['status', 'executed_at'], name='history_status_time_idx')],
+            },
+        ),
+    ]
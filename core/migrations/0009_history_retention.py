@@ -0,0 +1,52 @@
+# Generated by Django 5.2 on 2026-10-17 08:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def classify_existing_history(apps, schema_editor):
+    # Rows written before command types existed. Backups were only taken by
+    # Nornir's backup_config, so Netmiko running-config output stays show
+    # output. A Nornir show run of exactly that command cannot be told apart
+    # and is kept as a backup, the longest retained type. Anything that is not
+    # a show command was a configuration push.
+    HistoryRecord = apps.get_model('core', 'HistoryRecord')
+    HistoryRecord.objects.filter(engine='nornir', command='show running-config').update(command_type='backup')
+    HistoryRecord.objects.exclude(command__istartswith='show').update(command_type='config')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_historyrecord'),
+        # Classify the legacy rows after they were copied into HistoryRecord.
+        ('netmiko_tools', '0006_unified_history'),
+        ('nornir_tools', '0006_unified_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historyrecord',
+            name='command_type',
+            field=models.CharField(choices=[('show', 'Show'), ('config', 'Configuration'), ('backup', 'Backup')], default='show', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='HistoryRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('engine', models.CharField(choices=[('netmiko', 'Netmiko'), ('nornir', 'Nornir')], max_length=20)),
+                ('command_type', models.CharField(choices=[('show', 'Show'), ('config', 'Configuration'), ('backup', 'Backup')], max_length=20)),
+                ('status', models.CharField(max_length=20)),
+                ('operations', models.PositiveIntegerField(default=0)),
+                ('command_time', models.FloatField(default=0.0, help_text='Total seconds spent running the commands')),
+                ('bytes_received', models.BigIntegerField(default=0)),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='history_rollups', to='core.networkdevice')),
+            ],
+            options={
+                'ordering': ['-day'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'device', 'engine', 'command_type', 'status'), name='unique_history_rollup')],
+            },
+        ),
+        migrations.RunPython(classify_existing_history, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-17 08:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_device_circuit'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeviceStatus',
+            fields=[
+                ('device', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='reachability', serialize=False, to='core.networkdevice')),
+                ('status', models.CharField(choices=[('online', 'Online'), ('offline', 'Offline')], max_length=10)),
+                ('rtt_ms', models.FloatField(blank=True, help_text='TCP connect round-trip time', null=True)),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('checked_at', models.DateTimeField()),
+                ('changed_at', models.DateTimeField(help_text='When the status last changed')),
+            ],
+            options={
+                'verbose_name': 'Device Status',
+                'verbose_name_plural': 'Device Statuses',
+                'indexes': [models.Index(fields=['status', 'checked_at'], name='core_device_status_27e3b2_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-17 08:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_device_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='networkdevice',
+            name='connect_timeout',
+            field=models.PositiveIntegerField(blank=True, help_text='Seconds to wait for a connection; blank to learn from past runs', null=True),
+        ),
+        migrations.AddField(
+            model_name='networkdevice',
+            name='read_timeout',
+            field=models.PositiveIntegerField(blank=True, help_text='Seconds to wait for each command; blank to learn from past runs', null=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-17 08:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_device_timeouts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='parent',
+            field=models.ForeignKey(blank=True, help_text='Job whose failed and skipped devices this job runs again', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='retries', to='core.job'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-17 09:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_job_parent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobresult',
+            name='cached',
+            field=models.BooleanField(default=False, help_text='Served from the show command cache instead of the device'),
+        ),
+    ]
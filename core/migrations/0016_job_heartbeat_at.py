@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-17 09:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_jobresult_cached'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, help_text='Last time the worker running this job reported in', null=True),
+        ),
+    ]
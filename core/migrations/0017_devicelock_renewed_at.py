@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-17 09:26
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_job_heartbeat_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='devicelock',
+            name='renewed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='Last time the owner confirmed it still holds the lease'),
+        ),
+    ]
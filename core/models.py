@@ -1,8 +1,11 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
 from django.utils import timezone
 from django.contrib.auth.models import AbstractUser, Group, Permission
 from django.core.exceptions import ValidationError
 
+from .fields import CompressedTextField
+
 DEVICE_TYPES = [
     ("arista_eos", "arista_eos"),
     ("cisco_ios", "cisco_ios"),
@@ -102,8 +105,21 @@ class NetworkDevice(models.Model):
     password = models.CharField(max_length=100)
     enable_password = models.CharField(max_length=100, blank=True, null=True)
     port = models.IntegerField(default=22)
+    site = models.CharField(
+        max_length=100, blank=True, help_text="Location used for per-site limits"
+    )
     is_active = models.BooleanField(default=True)
     description = models.TextField(blank=True)
+    connect_timeout = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Seconds to wait for a connection; blank to learn from past runs",
+    )
+    read_timeout = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Seconds to wait for each command; blank to learn from past runs",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -116,6 +132,207 @@ class NetworkDevice(models.Model):
         verbose_name_plural = "Network Devices"
 
 
+class OperationTimings(models.Model):
+    """Abstract model adding per-phase timings to command history rows"""
+    connect_time = models.FloatField(
+        null=True, blank=True, help_text="Seconds to connect, handshake and log in"
+    )
+    prompt_time = models.FloatField(
+        null=True, blank=True, help_text="Seconds for prompt detection and setup"
+    )
+    command_time = models.FloatField(
+        null=True, blank=True, help_text="Seconds to send the command and read output"
+    )
+    parse_time = models.FloatField(
+        null=True, blank=True, help_text="Seconds spent parsing output with TextFSM"
+    )
+    bytes_received = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class OutputBlob(models.Model):
+    """Command output stored once per distinct content, keyed by its SHA-256"""
+    digest = models.CharField(max_length=64, unique=True)
+    data = CompressedTextField(blank=True)
+    size = models.PositiveIntegerField(
+        default=0, help_text="Uncompressed size in bytes"
+    )
+    preview = models.TextField(
+        blank=True, help_text="First lines of the output, for history listings"
+    )
+    line_count = models.PositiveIntegerField(default=0)
+    refcount = models.IntegerField(
+        default=0, help_text="Number of history rows pointing at this blob"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=["refcount", "last_used_at"])]
+
+    def __str__(self):
+        return f"{self.digest[:12]} ({self.size} bytes, {self.refcount} refs)"
+
+    @property
+    def is_truncated(self):
+        """True when ``preview`` is shorter than the full output."""
+        return len(self.preview.encode()) < self.size
+
+
+class BlobOutput(models.Model):
+    """Abstract model keeping a row's output in a shared, deduplicated OutputBlob
+
+    ``output`` reads and writes like a text field; the blob is looked up or
+    created when the row is saved (or, for ``HistoryWriter`` batches, by
+    ``attach_blobs``).
+    """
+    blob = models.ForeignKey(
+        OutputBlob,
+        on_delete=models.PROTECT,
+        related_name="%(app_label)s_%(class)s_set",
+        editable=False,
+    )
+
+    _output_text = None
+    _output_dirty = False
+
+    class Meta:
+        abstract = True
+
+    @property
+    def output(self):
+        if self._output_text is None:
+            self._output_text = self.blob.data if self.blob_id else ""
+        return self._output_text
+
+    @output.setter
+    def output(self, value):
+        self._output_text = value or ""
+        self._output_dirty = True
+
+    @classmethod
+    def attach_blobs(cls, instances):
+        """Points every instance with new output at its blob, adding references."""
+        from .blobs import digest_text, store_outputs
+
+        pending = [instance for instance in instances if instance._output_dirty]
+        if not pending:
+            return
+        blob_ids = store_outputs(instance._output_text for instance in pending)
+        for instance in pending:
+            instance.blob_id = blob_ids[digest_text(instance._output_text)]
+            instance._output_dirty = False
+
+    def save(self, *args, **kwargs):
+        if not self._output_dirty:
+            return super().save(*args, **kwargs)
+        from .blobs import release_blobs
+
+        with transaction.atomic():
+            previous = self.blob_id
+            self.attach_blobs([self])
+            super().save(*args, **kwargs)
+            if previous and previous != self.blob_id:
+                release_blobs([previous])
+
+
+class HistoryRecord(BlobOutput, OperationTimings):
+    """Model for one command run on a device, by any execution engine
+
+    ``netmiko_tools.CommandHistory`` and ``nornir_tools.NornirCommandHistory``
+    are proxies limited to their own ``engine``; query this model directly
+    for history across engines.
+    """
+    ENGINE_CHOICES = [
+        ("netmiko", "Netmiko"),
+        ("nornir", "Nornir"),
+    ]
+    COMMAND_TYPE_CHOICES = [
+        ("show", "Show"),
+        ("config", "Configuration"),
+        ("backup", "Backup"),
+    ]
+    # Engine given to rows created through a per-engine proxy.
+    ENGINE = None
+
+    device = models.ForeignKey(
+        NetworkDevice, on_delete=models.CASCADE, related_name="command_history"
+    )
+    engine = models.CharField(max_length=20, choices=ENGINE_CHOICES)
+    command = models.TextField()
+    command_type = models.CharField(
+        max_length=20, choices=COMMAND_TYPE_CHOICES, default="show"
+    )
+    status = models.CharField(max_length=20, default="success")
+    executed_at = models.DateTimeField(default=timezone.now)
+
+    def __init__(self, *args, **kwargs):
+        # Rows loaded from the database arrive positionally with their engine.
+        if self.ENGINE and not args:
+            kwargs.setdefault("engine", self.ENGINE)
+        super().__init__(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.device.name} - {self.command[:50]}"
+
+    class Meta(OperationTimings.Meta):
+        ordering = ["-executed_at"]
+        verbose_name = "Command History"
+        verbose_name_plural = "Command histories"
+        indexes = [
+            models.Index(fields=["executed_at"], name="history_time_idx"),
+            models.Index(
+                fields=["device", "executed_at"], name="history_device_time_idx"
+            ),
+            models.Index(
+                fields=["device", "engine", "executed_at"],
+                name="history_device_engine_idx",
+            ),
+            models.Index(
+                fields=["status", "executed_at"], name="history_status_time_idx"
+            ),
+        ]
+
+
+class EngineHistoryManager(models.Manager):
+    """Manager of a per-engine ``HistoryRecord`` proxy, limited to its engine"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(engine=self.model.ENGINE)
+
+
+class HistoryRollup(models.Model):
+    """Model for daily totals of history rows removed by the retention policy"""
+    day = models.DateField()
+    device = models.ForeignKey(
+        NetworkDevice, on_delete=models.CASCADE, related_name="history_rollups"
+    )
+    engine = models.CharField(max_length=20, choices=HistoryRecord.ENGINE_CHOICES)
+    command_type = models.CharField(
+        max_length=20, choices=HistoryRecord.COMMAND_TYPE_CHOICES
+    )
+    status = models.CharField(max_length=20)
+    operations = models.PositiveIntegerField(default=0)
+    command_time = models.FloatField(
+        default=0.0, help_text="Total seconds spent running the commands"
+    )
+    bytes_received = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.device.name} {self.day} {self.command_type} {self.status}"
+
+    class Meta:
+        ordering = ["-day"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "device", "engine", "command_type", "status"],
+                name="unique_history_rollup",
+            )
+        ]
+
+
 class DeviceGroup(models.Model):
     """Model for organizing devices into groups"""
     name = models.CharField(max_length=100)
@@ -155,3 +372,236 @@ class CommandTemplate(models.Model):
         ordering = ["name"]
         verbose_name = "Command Template"
         verbose_name_plural = "Command Templates"
+
+
+class Job(models.Model):
+    """Model for a command run queued for a background worker"""
+    STATUS_CHOICES = [
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("completed", "Completed"),
+        ("failed", "Failed"),
+    ]
+    ENGINE_CHOICES = [
+        ("netmiko", "Netmiko"),
+        ("nornir", "Nornir"),
+    ]
+    KIND_CHOICES = [
+        ("show", "Show Commands"),
+        ("config", "Configuration Commands"),
+        ("backup", "Backup Configuration"),
+    ]
+
+    engine = models.CharField(max_length=20, choices=ENGINE_CHOICES)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    commands = models.JSONField(default=list)
+    options = models.JSONField(default=dict, blank=True)
+    devices = models.ManyToManyField(NetworkDevice, related_name="jobs")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="queued")
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    parent = models.ForeignKey(
+        "self",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="retries",
+        help_text="Job whose failed and skipped devices this job runs again",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Last time the worker running this job reported in",
+    )
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Job #{self.pk} ({self.engine} {self.kind})"
+
+    @property
+    def is_finished(self):
+        return self.status in ("completed", "failed")
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [models.Index(fields=["status", "created_at"])]
+        verbose_name = "Job"
+        verbose_name_plural = "Jobs"
+
+
+class JobResult(models.Model):
+    """Model for the outcome of a job on a single device"""
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name="results")
+    device = models.ForeignKey(NetworkDevice, on_delete=models.CASCADE, related_name="job_results")
+    command = models.TextField(blank=True)
+    status = models.CharField(max_length=20, default="success")
+    output = models.TextField(blank=True)
+    cached = models.BooleanField(
+        default=False,
+        help_text="Served from the show command cache instead of the device",
+    )
+    completed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.job} - {self.device.name} ({self.status})"
+
+    class Meta:
+        ordering = ["id"]
+        verbose_name = "Job Result"
+        verbose_name_plural = "Job Results"
+
+
+class DeviceLock(models.Model):
+    """Model for a device session lease shared between worker processes"""
+    device = models.OneToOneField(
+        NetworkDevice, on_delete=models.CASCADE, primary_key=True, related_name="lock"
+    )
+    owner = models.CharField(max_length=64)
+    acquired_at = models.DateTimeField(default=timezone.now)
+    renewed_at = models.DateTimeField(
+        default=timezone.now,
+        help_text="Last time the owner confirmed it still holds the lease",
+    )
+
+    def __str__(self):
+        return f"{self.device.name} locked by {self.owner}"
+
+    class Meta:
+        verbose_name = "Device Lock"
+        verbose_name_plural = "Device Locks"
+
+
+class DeviceCircuit(models.Model):
+    """Model for the connection circuit breaker of a device
+
+    A device without a row is closed (healthy). See ``core.circuit``.
+    """
+    STATE_CHOICES = [
+        ("closed", "Closed"),
+        ("open", "Open"),
+        ("half_open", "Half-open"),
+    ]
+
+    device = models.OneToOneField(
+        NetworkDevice,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="circuit",
+    )
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default="closed")
+    consecutive_failures = models.PositiveIntegerField(default=0)
+    opened_at = models.DateTimeField(null=True, blank=True)
+    retry_at = models.DateTimeField(
+        null=True, blank=True, help_text="When an open circuit lets a probe through"
+    )
+    probe_started_at = models.DateTimeField(null=True, blank=True)
+    last_failure_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.device.name}: {self.get_state_display()}"
+
+    class Meta:
+        verbose_name = "Device Circuit"
+        verbose_name_plural = "Device Circuits"
+
+
+class DeviceStatus(models.Model):
+    """Model for the latest reachability probe of a device (see core.reachability)"""
+    STATUS_CHOICES = [
+        ("online", "Online"),
+        ("offline", "Offline"),
+    ]
+
+    device = models.OneToOneField(
+        NetworkDevice,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="reachability",
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    rtt_ms = models.FloatField(
+        null=True, blank=True, help_text="TCP connect round-trip time"
+    )
+    error = models.CharField(max_length=255, blank=True)
+    checked_at = models.DateTimeField()
+    changed_at = models.DateTimeField(help_text="When the status last changed")
+
+    def __str__(self):
+        return f"{self.device.name}: {self.status}"
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "checked_at"])]
+        verbose_name = "Device Status"
+        verbose_name_plural = "Device Statuses"
+
+
+class ConfigVersion(models.Model):
+    """Model for one archived configuration of a device
+
+    Versions form a chain per device: a ``snapshot`` stores the full text, a
+    ``delta`` stores the line changes against the previous version (see
+    ``core.archive``).
+    """
+    KIND_CHOICES = [
+        ("snapshot", "Snapshot"),
+        ("delta", "Delta"),
+    ]
+
+    device = models.ForeignKey(
+        NetworkDevice, on_delete=models.CASCADE, related_name="config_versions"
+    )
+    version = models.PositiveIntegerField()
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    data = CompressedTextField(blank=True)
+    digest = models.CharField(max_length=64)
+    size = models.PositiveIntegerField(default=0)
+    line_count = models.PositiveIntegerField(default=0)
+    lines_added = models.PositiveIntegerField(default=0)
+    lines_removed = models.PositiveIntegerField(default=0)
+    captured_at = models.DateTimeField(default=timezone.now)
+    last_seen_at = models.DateTimeField(
+        default=timezone.now, help_text="Last backup that returned this configuration"
+    )
+
+    def __str__(self):
+        return f"{self.device.name} v{self.version}"
+
+    class Meta:
+        ordering = ["device", "-version"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["device", "version"], name="unique_device_config_version"
+            )
+        ]
+        verbose_name = "Configuration Version"
+        verbose_name_plural = "Configuration Versions"
+
+
+class ConfigDiff(models.Model):
+    """Model caching the unified diff between two configuration versions"""
+    from_version = models.ForeignKey(
+        ConfigVersion, on_delete=models.CASCADE, related_name="+"
+    )
+    to_version = models.ForeignKey(
+        ConfigVersion, on_delete=models.CASCADE, related_name="+"
+    )
+    diff = CompressedTextField(blank=True)
+    lines_added = models.PositiveIntegerField(default=0)
+    lines_removed = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.from_version} -> v{self.to_version.version}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["from_version", "to_version"], name="unique_config_diff"
+            )
+        ]
@@ -0,0 +1,133 @@
+"""
+Keyset ("cursor") pagination for command history.
+
+History is listed newest first by ``(executed_at, id)``. A cursor encodes
+the last row of the previous page and the next page starts strictly after
+it, so every page is one range scan on the ``(device, executed_at)`` index
+however deep it is, where OFFSET pagination reads and discards every
+skipped row. Rows inserted while paging never shift later pages either.
+"""
+
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+from django.http import Http404
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class KeysetPage:
+    """
+    One page of rows plus the cursor of the page after it, if any.
+    """
+
+    def __init__(self, rows, next_cursor):
+        self.rows = rows
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def encode_cursor(row):
+    raw = f"{row.executed_at.isoformat()}|{row.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Returns the ``(executed_at, id)`` a cursor points at.
+
+    Raises ``ValueError`` for a malformed cursor.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        executed_at, pk = raw.rsplit("|", 1)
+        return datetime.fromisoformat(executed_at), int(pk)
+    except (TypeError, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def page_size_from(value, default=DEFAULT_PAGE_SIZE):
+    """
+    Parses a requested page size, clamped to ``1..MAX_PAGE_SIZE``.
+    """
+    try:
+        return max(1, min(int(value), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return default
+
+
+def keyset_page(queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Returns the ``KeysetPage`` of ``queryset`` following ``cursor``.
+    """
+    queryset = queryset.order_by("-executed_at", "-id")
+    if cursor:
+        executed_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(executed_at__lt=executed_at) | Q(executed_at=executed_at, id__lt=pk)
+        )
+    # One extra row tells whether another page follows.
+    rows = list(queryset[: page_size + 1])
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        return KeysetPage(rows, encode_cursor(rows[-1]))
+    return KeysetPage(rows, None)
+
+
+def history_page(request, queryset):
+    """
+    Returns the page of ``queryset`` selected by ``?cursor=``, ``?page_size=``
+    and an optional ``?status=`` filter.
+    """
+    status = request.GET.get("status")
+    if status:
+        queryset = queryset.filter(status=status)
+    try:
+        return keyset_page(
+            queryset,
+            request.GET.get("cursor"),
+            page_size_from(request.GET.get("page_size")),
+        )
+    except ValueError as e:
+        raise Http404(str(e))
+
+
+class HistoryCursorPagination(pagination.BasePagination):
+    """
+    DRF pagination over ``keyset_page``; ``?cursor=`` and ``?page_size=``.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        try:
+            self.page = keyset_page(
+                queryset,
+                request.query_params.get("cursor"),
+                page_size_from(request.query_params.get("page_size")),
+            )
+        except ValueError as e:
+            raise NotFound(str(e))
+        return self.page.rows
+
+    def get_next_link(self):
+        if not self.page.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return pagination.replace_query_param(url, "cursor", self.page.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
@@ -0,0 +1,188 @@
+"""
+Device reachability polling.
+
+``poll_reachability`` (see ``manage.py poll_reachability``) opens a TCP
+connection to every active device's ``ip_address:port`` from one event loop,
+at most ``CONCURRENCY`` at a time, and stores the outcome and round-trip time
+in ``DeviceStatus``, one row per device. Rounds repeat every ``INTERVAL``
+seconds give or take ``JITTER`` (a fraction of the interval) so several
+pollers do not probe in lockstep.
+
+The device status API, the dashboard and the device list read that table
+instead of touching the network. A status older than ``STALE_AFTER`` seconds
+(the poller stopped) is reported as "unknown".
+"""
+
+import asyncio
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from .models import DeviceStatus, NetworkDevice
+
+DEFAULT_OPTIONS = {
+    "INTERVAL": 60,
+    "JITTER": 0.1,
+    "TIMEOUT": 3.0,
+    "CONCURRENCY": 500,
+    "STALE_AFTER": 300,
+}
+
+
+def reachability_options():
+    """
+    Returns the default options updated with ``settings.REACHABILITY``.
+    """
+    options = dict(DEFAULT_OPTIONS)
+    options.update(getattr(settings, "REACHABILITY", {}))
+    return options
+
+
+async def probe(host, port, timeout):
+    """
+    Opens and closes a TCP connection; returns ``(online, rtt_ms, error)``.
+    """
+    started = time.perf_counter()
+    try:
+        _, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port), timeout
+        )
+    except (OSError, asyncio.TimeoutError) as e:
+        return False, None, str(e) or type(e).__name__
+    rtt_ms = (time.perf_counter() - started) * 1000
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return True, rtt_ms, ""
+
+
+async def probe_all(targets, timeout, concurrency):
+    """
+    Probes ``(device_id, host, port)`` targets concurrently and returns their
+    outcomes keyed by device id.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(device_id, host, port):
+        async with semaphore:
+            return device_id, await probe(host, port, timeout)
+
+    return dict(await asyncio.gather(*(run(*target) for target in targets)))
+
+
+def record_statuses(outcomes, now=None):
+    """
+    Stores probe outcomes in ``DeviceStatus`` with one bulk upsert.
+    """
+    now = now or timezone.now()
+    previous = {
+        device_id: (status, changed_at)
+        for device_id, status, changed_at in DeviceStatus.objects.filter(
+            pk__in=list(outcomes)
+        ).values_list("pk", "status", "changed_at")
+    }
+    rows = []
+    for device_id, (online, rtt_ms, error) in outcomes.items():
+        status = "online" if online else "offline"
+        last_status, changed_at = previous.get(device_id, (None, now))
+        rows.append(
+            DeviceStatus(
+                device_id=device_id,
+                status=status,
+                rtt_ms=rtt_ms,
+                error=error[:255],
+                checked_at=now,
+                changed_at=changed_at if last_status == status else now,
+            )
+        )
+    DeviceStatus.objects.bulk_create(
+        rows,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=["device"],
+        update_fields=["status", "rtt_ms", "error", "checked_at", "changed_at"],
+    )
+
+
+def poll_reachability(devices=None, options=None):
+    """
+    Runs one probe round over ``devices`` (every active device by default),
+    stores the results and returns ``(online, offline)`` counts.
+    """
+    options = options or reachability_options()
+    if devices is None:
+        devices = NetworkDevice.objects.filter(is_active=True)
+    targets = [
+        (device.pk, device.ip_address, device.port)
+        for device in devices.only("pk", "ip_address", "port")
+    ]
+    if not targets:
+        return 0, 0
+    outcomes = asyncio.run(
+        probe_all(targets, options["TIMEOUT"], options["CONCURRENCY"])
+    )
+    record_statuses(outcomes)
+    online = sum(1 for outcome in outcomes.values() if outcome[0])
+    return online, len(outcomes) - online
+
+
+def next_interval(options):
+    """
+    Returns the seconds until the next round, jittered around ``INTERVAL``.
+    """
+    spread = options["INTERVAL"] * options["JITTER"]
+    return max(options["INTERVAL"] + random.uniform(-spread, spread), 0.0)
+
+
+def _fresh_since():
+    return timezone.now() - timedelta(seconds=reachability_options()["STALE_AFTER"])
+
+
+def with_reachability(queryset):
+    """
+    Annotates devices with ``reachability_status`` ("online", "offline" or
+    "unknown") and ``reachability_rtt`` from their status rows.
+    """
+    fresh = When(
+        reachability__checked_at__gte=_fresh_since(), then=F("reachability__status")
+    )
+    return queryset.annotate(
+        reachability_status=Case(fresh, default=Value("unknown")),
+        reachability_rtt=F("reachability__rtt_ms"),
+    )
+
+
+def online_devices(queryset=None):
+    """
+    Returns the active devices whose latest probe, still fresh, succeeded.
+    """
+    queryset = queryset if queryset is not None else NetworkDevice.objects.all()
+    return queryset.filter(
+        is_active=True,
+        reachability__status="online",
+        reachability__checked_at__gte=_fresh_since(),
+    )
+
+
+def device_reachability(device):
+    """
+    Returns the device's latest reachability as a JSON-serializable dict.
+    """
+    row = DeviceStatus.objects.filter(pk=device.pk).first()
+    if row is None or row.checked_at < _fresh_since():
+        status = "unknown"
+    else:
+        status = row.status
+    return {
+        "status": status,
+        "rtt_ms": row.rtt_ms if row else None,
+        "error": row.error if row else "",
+        "checked_at": row.checked_at if row else None,
+        "changed_at": row.changed_at if row else None,
+    }
@@ -0,0 +1,353 @@
+"""
+Short-lived cache of show-command results.
+
+The same show command is often sent to the same device several times within
+a few seconds, by people refreshing a page or by overlapping jobs.
+``ResultCache`` keeps each successful result for a short time, keyed by the
+device, the normalized command and whether the output was parsed with
+TextFSM, and coalesces concurrent identical requests: the first caller claims
+the key and runs the command, later callers wait for its result instead of
+opening another session. They wait about as long as the command may take to
+answer (its read timeout, or ``WAIT_TIMEOUT`` seconds when set) and then run
+it themselves, so a stuck run never holds a web request for long.
+
+TTLs come from ``settings.SHOW_COMMAND_CACHE``: ``TTLS`` maps command
+prefixes to seconds (the longest matching prefix wins, 0 disables caching for
+the command) and ``DEFAULT_TTL`` covers every other command. Configuration
+commands are never cached; running them invalidates the device's entries,
+and results still in flight at that moment are handed to their waiters but
+not stored. Entries live in the process that ran the command, so a lookup
+also checks the history for configuration pushed to the device by another
+process since the entry was stored.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils import timezone
+
+from .metrics import SHOW_CACHE_LOOKUPS
+from .models import HistoryRecord
+from .timeouts import read_timeout
+
+DEFAULT_OPTIONS = {
+    "ENABLED": True,
+    "DEFAULT_TTL": 30,
+    "TTLS": {},
+    "MAX_ENTRIES": 10000,
+    "WAIT_TIMEOUT": None,
+    "CHECK_HISTORY": True,
+}
+
+# Netmiko's send_command() read timeout, used when none was learned.
+DEFAULT_READ_TIMEOUT = 10
+
+
+def cache_options():
+    """
+    Returns the default options updated with ``settings.SHOW_COMMAND_CACHE``.
+    """
+    options = dict(DEFAULT_OPTIONS)
+    options.update(getattr(settings, "SHOW_COMMAND_CACHE", {}))
+    return options
+
+
+def normalize_command(command):
+    """
+    Collapses whitespace so trivially different spellings share an entry.
+    """
+    return " ".join(command.split())
+
+
+def configured_since(device_id, since):
+    """
+    True when configuration commands were recorded for the device at or
+    after ``since``.
+    """
+    return HistoryRecord.objects.filter(
+        device_id=device_id, command_type="config", executed_at__gte=since
+    ).exists()
+
+
+class PendingResult:
+    """
+    Result of a command another caller is running.
+    """
+
+    def __init__(self):
+        self.result = None
+        self._done = threading.Event()
+
+    def set(self, result):
+        self.result = result
+        self._done.set()
+
+    def wait(self, timeout=None):
+        """
+        Returns the result, or None when the run was abandoned or timed out.
+        """
+        self._done.wait(timeout)
+        return self.result
+
+
+class CacheLookup:
+    """
+    Outcome of looking up one device's commands.
+
+    ``cached`` maps commands to results served from the cache, ``pending``
+    maps commands to results another caller is producing, and ``claimed``
+    lists the commands this caller must run and hand back with
+    ``resolve()``. Unresolved claims must be released with ``abandon()``.
+    Pending commands whose run does not complete in time move to
+    ``uncached`` (see ``wait()``).
+    """
+
+    def __init__(self, cache, device_id, use_textfsm, generation):
+        self.cache = cache
+        self.device_id = device_id
+        self.use_textfsm = use_textfsm
+        self.generation = generation
+        self.cached = {}
+        self.pending = {}
+        self.claimed = []
+        self.uncached = []
+        self._claims = {}
+        self._resolved = {}
+        self._shared = {}
+
+    @property
+    def commands_to_run(self):
+        """
+        Commands this caller still runs itself: its claims and uncacheable
+        ones without a result yet.
+        """
+        return [
+            command
+            for command in self.claimed + self.uncached
+            if command not in self._resolved
+        ]
+
+    def resolve(self, outputs):
+        """
+        Stores the results of the claimed commands and wakes their waiters.
+        """
+        self._resolved.update(outputs)
+        for command in self.claimed:
+            pending = self._claims.pop(command, None)
+            if pending is not None:
+                self.cache.complete(self, command, pending, outputs.get(command))
+
+    def abandon(self):
+        """
+        Releases every claim not resolved yet; its waiters see no result.
+        """
+        for command, pending in list(self._claims.items()):
+            self.cache.complete(self, command, pending, None)
+        self._claims.clear()
+
+    def wait(self, timeout, started=None):
+        """
+        Waits until ``timeout(command)`` seconds after ``started`` (a
+        ``time.monotonic()`` value, now by default) for each result another
+        caller is producing. Commands whose run did not complete in time or
+        was abandoned move to ``uncached`` and are returned, for this caller
+        to run itself.
+        """
+        started = started or time.monotonic()
+        late = []
+        for command, pending in list(self.pending.items()):
+            remaining = started + timeout(command) - time.monotonic()
+            result = pending.wait(max(remaining, 0))
+            if result is None:
+                late.append(command)
+                del self.pending[command]
+                self.uncached.append(command)
+            else:
+                self._shared[command] = result
+        return late
+
+    def outputs(self, commands):
+        """
+        Returns every command's result in ``commands`` order, once ``wait()``
+        and ``resolve()`` accounted for each of them.
+        """
+        outputs = {}
+        for command in commands:
+            if command in self.cached:
+                outputs[command] = dict(self.cached[command], cached=True)
+            elif command in self._shared:
+                result = self._shared[command]
+                # Timings stay with the caller that ran the command.
+                outputs[command] = {
+                    "status": result["status"],
+                    "output": result["output"],
+                    "cached": True,
+                }
+            else:
+                outputs[command] = self._resolved[command]
+        return outputs
+
+
+class ResultCache:
+    """
+    Thread-safe TTL cache of show-command results with in-flight coalescing.
+    """
+
+    def __init__(self, options=None):
+        self.options = options or cache_options()
+        self._lock = threading.Lock()
+        # key -> (expires_at, stored_at, result), oldest first.
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._generations = {}
+
+    @property
+    def enabled(self):
+        return self.options["ENABLED"]
+
+    def wait_timeout(self, device, command):
+        """
+        Returns the seconds to wait for another caller's run of ``command``
+        on ``device`` before running it again.
+        """
+        if self.options["WAIT_TIMEOUT"] is not None:
+            return self.options["WAIT_TIMEOUT"]
+        timeout = read_timeout(device.pk, command, device.read_timeout)
+        return timeout or DEFAULT_READ_TIMEOUT
+
+    def ttl(self, command):
+        """
+        Returns the seconds a result of ``command`` stays cached.
+        """
+        command = normalize_command(command)
+        best = None
+        for prefix, ttl in self.options["TTLS"].items():
+            prefix = normalize_command(prefix)
+            if command.startswith(prefix) and (best is None or len(prefix) > best[0]):
+                best = (len(prefix), ttl)
+        return self.options["DEFAULT_TTL"] if best is None else best[1]
+
+    def lookup(self, device_id, commands, use_textfsm, force_refresh=False):
+        """
+        Sorts one device's commands into cached, pending and claimed ones.
+
+        ``force_refresh`` ignores stored results; a run of the same command
+        already in flight is still joined, as it is no older than the request.
+        """
+        use_textfsm = bool(use_textfsm)
+        if self.options["CHECK_HISTORY"] and not force_refresh:
+            since = self._oldest_entry(device_id, commands, use_textfsm)
+            if since is not None and configured_since(device_id, since):
+                # Configured from another process since the entries were stored.
+                self.invalidate_device(device_id)
+        now = time.monotonic()
+        with self._lock:
+            lookup = CacheLookup(
+                self, device_id, use_textfsm, self._generations.get(device_id, 0)
+            )
+            for command in commands:
+                if not self.ttl(command):
+                    lookup.uncached.append(command)
+                    continue
+                key = (device_id, normalize_command(command), use_textfsm)
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] <= now:
+                    del self._entries[key]
+                    entry = None
+                if entry is not None and not force_refresh:
+                    self._entries.move_to_end(key)
+                    lookup.cached[command] = entry[2]
+                elif key in self._pending:
+                    lookup.pending[command] = self._pending[key]
+                else:
+                    pending = self._pending[key] = PendingResult()
+                    lookup._claims[command] = pending
+                    lookup.claimed.append(command)
+        for outcome, count in (
+            ("hit", len(lookup.cached)),
+            ("coalesced", len(lookup.pending)),
+            ("miss", len(lookup.claimed)),
+            ("bypass", len(lookup.uncached)),
+        ):
+            if count:
+                SHOW_CACHE_LOOKUPS.labels(outcome).inc(count)
+        return lookup
+
+    def _oldest_entry(self, device_id, commands, use_textfsm):
+        with self._lock:
+            stored = [
+                entry[1]
+                for entry in (
+                    self._entries.get(
+                        (device_id, normalize_command(command), use_textfsm)
+                    )
+                    for command in commands
+                )
+                if entry is not None
+            ]
+        return min(stored, default=None)
+
+    def complete(self, lookup, command, pending, result):
+        """
+        Hands ``result`` to the waiters of a claim and stores it when it
+        succeeded and the device was not reconfigured in the meantime.
+        """
+        key = (lookup.device_id, normalize_command(command), lookup.use_textfsm)
+        with self._lock:
+            if self._pending.get(key) is pending:
+                del self._pending[key]
+            if (
+                result is not None
+                and result.get("status") == "success"
+                and self._generations.get(lookup.device_id, 0) == lookup.generation
+            ):
+                self._entries[key] = (
+                    time.monotonic() + self.ttl(command),
+                    timezone.now(),
+                    {"status": result["status"], "output": result["output"]},
+                )
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.options["MAX_ENTRIES"]:
+                    self._entries.popitem(last=False)
+        pending.set(result)
+
+    def invalidate_device(self, device_id):
+        """
+        Drops the device's entries; results already in flight are not stored.
+        """
+        with self._lock:
+            self._generations[device_id] = self._generations.get(device_id, 0) + 1
+            for key in [key for key in self._entries if key[0] == device_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "in_flight": len(self._pending)}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """
+    Returns the process-wide cache, creating it from settings on first use.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
+
+
+def invalidate_device(device_id):
+    """
+    Drops the cached show results of a device after its configuration changed.
+    """
+    get_result_cache().invalidate_device(device_id)
@@ -0,0 +1,235 @@
+"""
+Command history retention.
+
+``HISTORY_RETENTION["POLICIES"]`` is an ordered list of rules. Each rule
+matches on any of ``engine``, ``command_type``, ``status`` and ``command``
+and keeps the rows it matches for ``days`` days, or forever when ``days``
+is None. A row follows the first rule it matches; rows matching no rule are
+kept.
+
+Expired rows are removed in batches of ``BATCH_SIZE``, each in its own short
+transaction with an optional pause in between, so writers are never locked
+out for long. Before a batch is deleted its rows are added to the daily
+``HistoryRollup`` totals and, when an archive is given, exported as
+gzip-compressed NDJSON. Deleting releases the rows' output blobs; blobs no
+longer referenced are removed by ``core.blobs.collect_garbage``.
+"""
+
+import gzip
+import json
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .blobs import delete_referencing
+from .models import AuditLog, HistoryRecord, HistoryRollup
+
+DEFAULT_OPTIONS = {
+    "POLICIES": [
+        {"command_type": "backup", "days": None},
+        {"status": "failed", "days": 90},
+        {"command_type": "config", "days": 365},
+        {"command_type": "show", "days": 30},
+    ],
+    "AUDIT_LOG_DAYS": 365,
+    "BATCH_SIZE": 500,
+    "BATCH_PAUSE": 0.05,
+    "ARCHIVE_DIR": None,
+}
+
+MATCH_KEYS = ("engine", "command_type", "status", "command")
+
+HISTORY_EXPORT_FIELDS = (
+    "id",
+    "engine",
+    "command",
+    "command_type",
+    "status",
+    "executed_at",
+    "connect_time",
+    "prompt_time",
+    "command_time",
+    "parse_time",
+    "bytes_received",
+)
+
+
+def retention_options():
+    """
+    Returns the default options updated with ``settings.HISTORY_RETENTION``.
+    """
+    options = dict(DEFAULT_OPTIONS)
+    options.update(getattr(settings, "HISTORY_RETENTION", {}))
+    return options
+
+
+def _policy_match(policy):
+    unknown = set(policy) - set(MATCH_KEYS) - {"days"}
+    if unknown:
+        raise ImproperlyConfigured(
+            f"Unknown HISTORY_RETENTION policy keys: {', '.join(sorted(unknown))}"
+        )
+    return Q(**{key: policy[key] for key in MATCH_KEYS if key in policy})
+
+
+def expired_history(policies, now=None):
+    """
+    Returns ``(policy, queryset)`` for every policy that expires rows, the
+    queryset holding the rows it expires as of ``now``.
+    """
+    now = now or timezone.now()
+    expired = []
+    earlier = []
+    for policy in policies:
+        match = _policy_match(policy)
+        if policy.get("days") is not None:
+            queryset = HistoryRecord.objects.filter(
+                match, executed_at__lt=now - timedelta(days=policy["days"])
+            )
+            # Rows matched by an earlier policy follow that policy instead.
+            for previous in earlier:
+                queryset = queryset.exclude(previous)
+            expired.append((policy, queryset))
+        if not match:
+            # A rule without conditions matches everything after it.
+            break
+        earlier.append(match)
+    return expired
+
+
+def rollup_history(queryset):
+    """
+    Adds the rows of ``queryset`` to the daily ``HistoryRollup`` totals.
+    """
+    groups = (
+        queryset.order_by()
+        .annotate(day=TruncDate("executed_at"))
+        .values("day", "device", "engine", "command_type", "status")
+        .annotate(
+            operations=Count("id"),
+            total_command_time=Sum("command_time"),
+            total_bytes=Sum("bytes_received"),
+        )
+    )
+    for group in groups:
+        rollup, _ = HistoryRollup.objects.get_or_create(
+            day=group["day"],
+            device_id=group["device"],
+            engine=group["engine"],
+            command_type=group["command_type"],
+            status=group["status"],
+        )
+        HistoryRollup.objects.filter(pk=rollup.pk).update(
+            operations=F("operations") + group["operations"],
+            command_time=F("command_time") + (group["total_command_time"] or 0.0),
+            bytes_received=F("bytes_received") + (group["total_bytes"] or 0),
+        )
+
+
+class RetentionArchive:
+    """
+    Gzip-compressed NDJSON file receiving rows before they are deleted.
+
+    The file is only created once the first row is written.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self._file = None
+
+    def write(self, record):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = gzip.open(self.path, "wt", encoding="utf-8")
+        self._file.write(json.dumps(record, cls=DjangoJSONEncoder) + "\n")
+        self.rows += 1
+
+    def write_history(self, queryset):
+        for row in queryset.select_related("blob", "device"):
+            record = {field: getattr(row, field) for field in HISTORY_EXPORT_FIELDS}
+            record.update(model="history", device=row.device.name, output=row.output)
+            self.write(record)
+
+    def write_audit_log(self, queryset):
+        for entry in queryset.select_related("user", "device"):
+            self.write(
+                {
+                    "model": "audit_log",
+                    "id": entry.pk,
+                    "user": entry.user.username if entry.user else None,
+                    "action": entry.action,
+                    "device": entry.device.name if entry.device else None,
+                    "details": entry.details,
+                    "ip_address": entry.ip_address,
+                    "timestamp": entry.timestamp,
+                }
+            )
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _delete_in_batches(queryset, delete_batch, batch_size, pause):
+    removed = 0
+    while True:
+        batch = list(queryset.values_list("pk", flat=True)[:batch_size])
+        if not batch:
+            return removed
+        with transaction.atomic():
+            delete_batch(queryset.model.objects.filter(pk__in=batch))
+        removed += len(batch)
+        if pause:
+            time.sleep(pause)
+
+
+def prune_history(queryset, batch_size=500, pause=0.0, archive=None):
+    """
+    Rolls up, optionally archives, and deletes the history rows of
+    ``queryset`` in batches. Returns the number of rows removed.
+    """
+
+    def delete_batch(rows):
+        if archive is not None:
+            archive.write_history(rows)
+        rollup_history(rows)
+        delete_referencing(rows)
+
+    return _delete_in_batches(queryset, delete_batch, batch_size, pause)
+
+
+def expired_audit_log(days, now=None):
+    """
+    Returns the audit log entries older than ``days``.
+    """
+    now = now or timezone.now()
+    return AuditLog.objects.filter(timestamp__lt=now - timedelta(days=days))
+
+
+def prune_audit_log(queryset, batch_size=500, pause=0.0, archive=None):
+    """
+    Deletes the audit log entries of ``queryset`` in batches, optionally
+    archiving them first. Returns the number of entries removed.
+    """
+
+    def delete_batch(entries):
+        if archive is not None:
+            archive.write_audit_log(entries)
+        entries.delete()
+
+    return _delete_in_batches(queryset, delete_batch, batch_size, pause)
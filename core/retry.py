@@ -0,0 +1,135 @@
+"""
+Retries of transient device failures, and per-job deadlines.
+
+A dropped session or a timeout on one device out of hundreds should not
+leave that device failed for the whole run. ``RetryPolicy`` lets a device
+operation run up to ``MAX_ATTEMPTS`` times when it fails with one of the
+``RETRY_ON`` exception classes. ``NO_RETRY_ON`` takes precedence, so rejected
+credentials and open circuits fail at once. Between attempts it sleeps a
+random time up to ``BACKOFF * 2 ** (attempt - 1)`` seconds, capped at
+``MAX_BACKOFF`` ("full jitter"), so devices that failed together do not
+retry in lockstep.
+
+Jobs add a deadline: ``JOB_DEADLINE`` seconds after the runner started, or
+``options["deadline"]`` for one job. Devices not started by then are reported
+as "skipped: job deadline reached" without connecting, and no retry is
+started (or slept into) past it, so a large job finishes in bounded time and
+its skipped devices can be run again later.
+"""
+
+import random
+import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .metrics import DEVICE_RETRIES
+
+DEFAULT_OPTIONS = {
+    "MAX_ATTEMPTS": 3,
+    "BACKOFF": 1.0,
+    "MAX_BACKOFF": 30.0,
+    "RETRY_ON": [
+        "netmiko.exceptions.NetmikoTimeoutException",
+        "netmiko.exceptions.ReadTimeout",
+        "paramiko.ssh_exception.SSHException",
+        "builtins.ConnectionError",
+        "builtins.TimeoutError",
+        "builtins.EOFError",
+    ],
+    "NO_RETRY_ON": [
+        "paramiko.ssh_exception.AuthenticationException",
+        "core.circuit.CircuitOpen",
+    ],
+    "JOB_DEADLINE": None,
+}
+
+
+def retry_options(overrides=None):
+    """
+    Returns the default options updated with ``settings.RETRY_POLICY`` and
+    then with ``overrides``.
+    """
+    options = dict(DEFAULT_OPTIONS)
+    options.update(getattr(settings, "RETRY_POLICY", {}))
+    options.update(overrides or {})
+    return options
+
+
+def _exception_classes(paths):
+    return tuple(
+        import_string(path) if isinstance(path, str) else path for path in paths
+    )
+
+
+class DeadlineExceeded(Exception):
+    """
+    Raised instead of starting work on a device once the job's deadline passed.
+    """
+
+    def __init__(self):
+        super().__init__("skipped: job deadline reached")
+
+
+class RetryPolicy:
+    """
+    Decides whether and when a failed device operation runs again.
+
+    ``deadline`` is a ``time.monotonic()`` value after which no work starts.
+    """
+
+    def __init__(self, options=None, deadline=None):
+        self.options = options or retry_options()
+        self.deadline = deadline
+        self._retry_on = _exception_classes(self.options["RETRY_ON"])
+        self._no_retry_on = _exception_classes(self.options["NO_RETRY_ON"])
+
+    def expired(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def check_deadline(self):
+        """
+        Raises ``DeadlineExceeded`` once the deadline has passed.
+        """
+        if self.expired():
+            raise DeadlineExceeded()
+
+    def is_retryable(self, exception):
+        if isinstance(exception, self._no_retry_on):
+            return False
+        return isinstance(exception, self._retry_on)
+
+    def delay(self, attempt):
+        """
+        Returns the jittered seconds to wait after failed attempt ``attempt``.
+        """
+        ceiling = self.options["BACKOFF"] * 2 ** min(attempt - 1, 16)
+        return random.uniform(0, min(ceiling, self.options["MAX_BACKOFF"]))
+
+    def backoff(self, attempt, exception):
+        """
+        Sleeps before the next attempt and returns True, or returns False when
+        ``exception`` ends the operation: it is not retryable, ``attempt`` was
+        the last one, or the deadline would pass while waiting.
+        """
+        if attempt >= self.options["MAX_ATTEMPTS"] or not self.is_retryable(
+            exception
+        ):
+            return False
+        seconds = self.delay(attempt)
+        if self.deadline is not None and time.monotonic() + seconds >= self.deadline:
+            return False
+        DEVICE_RETRIES.labels(type(exception).__name__).inc()
+        time.sleep(seconds)
+        return True
+
+
+def job_retry_policy(job):
+    """
+    Returns the policy for a job starting now, with ``options["retry"]``
+    overriding the settings and its deadline counted from now.
+    """
+    options = retry_options(job.options.get("retry"))
+    seconds = job.options.get("deadline", options["JOB_DEADLINE"])
+    deadline = time.monotonic() + seconds if seconds else None
+    return RetryPolicy(options, deadline)
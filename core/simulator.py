@@ -0,0 +1,208 @@
+"""
+Local SSH stand-in for network devices, used by the benchmark commands.
+
+``FakeDeviceServer`` is a small paramiko server that behaves enough like a
+Cisco IOS CLI for Netmiko (prompt, command echo, ``terminal`` commands) and
+also answers SSH exec requests for the asyncio backend. Every command waits
+``latency`` seconds and returns ``output_size`` bytes; with ``failure_rate``
+a command drops the session instead, the way an overloaded device would.
+"""
+
+import logging
+import random
+import socket
+import threading
+import time
+
+import paramiko
+
+logger = logging.getLogger(__name__)
+# Clients hanging up mid-session is normal here; keep paramiko's noise quiet.
+logger.addHandler(logging.NullHandler())
+
+
+class _ServerInterface(paramiko.ServerInterface):
+    def __init__(self, server):
+        self.server = server
+        self.ready = threading.Event()
+
+    def check_auth_password(self, username, password):
+        if (username, password) == (self.server.username, self.server.password):
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_pty_request(self, *args):
+        return True
+
+    def check_channel_shell_request(self, channel):
+        self.ready.set()
+        return True
+
+    def check_channel_exec_request(self, channel, command):
+        command = command.decode() if isinstance(command, bytes) else command
+        threading.Thread(
+            target=self.server.handle_exec, args=(channel, command), daemon=True
+        ).start()
+        return True
+
+
+class FakeDeviceServer:
+    """
+    Threaded SSH server simulating any number of identical devices.
+
+    Usage::
+
+        with FakeDeviceServer(latency=0.05, output_size=4096) as server:
+            connect to 127.0.0.1:server.port as admin/admin
+    """
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        latency=0.0,
+        output_size=1024,
+        failure_rate=0.0,
+        prompt="sim#",
+        username="admin",
+        password="admin",
+        seed=None,
+    ):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.output_size = output_size
+        self.failure_rate = failure_rate
+        self.prompt = prompt
+        self.username = username
+        self.password = password
+        self.host_key = paramiko.RSAKey.generate(2048)
+        self.connections = 0
+        self.commands = 0
+        self.failures = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._socket = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((self.host, self.port))
+        self._socket.listen(1024)
+        self.port = self._socket.getsockname()[1]
+        threading.Thread(target=self._accept, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._socket is not None:
+            self._socket.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def _accept(self):
+        while not self._stopped.is_set():
+            try:
+                client, _ = self._socket.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._serve, args=(client,), daemon=True).start()
+
+    def _serve(self, client):
+        transport = paramiko.Transport(client)
+        transport.set_log_channel(f"{__name__}.transport")
+        transport.add_server_key(self.host_key)
+        interface = _ServerInterface(self)
+        try:
+            transport.start_server(server=interface)
+        except (paramiko.SSHException, EOFError, OSError):
+            transport.close()
+            return
+        with self._lock:
+            self.connections += 1
+        channel = transport.accept(timeout=30)
+        if channel is None:
+            transport.close()
+            return
+        if interface.ready.wait(timeout=5):
+            try:
+                self._run_shell(channel)
+            except (EOFError, OSError, paramiko.SSHException):
+                pass  # The client went away.
+            transport.close()
+        # Exec channels are answered by handle_exec; the client closes them.
+
+    def _respond(self, command):
+        """
+        Returns the output for a command, or None when the session should drop.
+        """
+        if not command or command.startswith("terminal "):
+            # Session setup is never delayed or failed.
+            return ""
+        with self._lock:
+            self.commands += 1
+            failed = self._random.random() < self.failure_rate
+            if failed:
+                self.failures += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if failed:
+            return None
+        line = f"{command} output line for benchmarking purposes\r\n"
+        repeats = self.output_size // len(line) + 1
+        return (line * repeats)[: self.output_size]
+
+    def handle_exec(self, channel, command):
+        output = self._respond(command)
+        try:
+            if output is None:
+                channel.get_transport().close()
+                return
+            channel.sendall(output.encode())
+            channel.send_exit_status(0)
+            channel.close()
+        except (EOFError, OSError, paramiko.SSHException):
+            pass
+
+    def _run_shell(self, channel):
+        channel.sendall(f"\r\n{self.prompt}".encode())
+        buffer = ""
+        while not self._stopped.is_set():
+            data = channel.recv(4096)
+            if not data:
+                return
+            buffer += data.decode(errors="replace")
+            while "\n" in buffer or "\r" in buffer:
+                index = min(
+                    position
+                    for position in (buffer.find("\n"), buffer.find("\r"))
+                    if position != -1
+                )
+                command, buffer = buffer[:index].strip(), buffer[index + 1 :]
+                if buffer.startswith("\n"):
+                    buffer = buffer[1:]
+                if command in ("exit", "quit", "logout"):
+                    channel.close()
+                    return
+                output = self._respond(command)
+                if output is None:
+                    channel.get_transport().close()
+                    return
+                reply = command + "\r\n"
+                if output:
+                    reply += output.rstrip("\r\n") + "\r\n"
+                channel.sendall((reply + self.prompt).encode())
@@ -0,0 +1,44 @@
+"""
+Helpers for streaming per-device results to the browser as Server-Sent Events.
+"""
+
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+
+def sse_event(event, data):
+    """
+    Formats one Server-Sent Event with a JSON payload.
+    """
+    payload = json.dumps(data, cls=DjangoJSONEncoder)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def device_result_event(device, command, status, output):
+    """
+    Formats the ``result`` event sent when a device completes.
+    """
+    return sse_event(
+        "result",
+        {
+            "device": device.name,
+            "device_id": device.pk,
+            "ip_address": device.ip_address,
+            "command": command,
+            "status": status,
+            "output": output if isinstance(output, str) else str(output),
+        },
+    )
+
+
+def event_stream_response(events):
+    """
+    Wraps an iterator of formatted events in an unbuffered streaming response.
+    """
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Stop nginx from buffering the stream until the run finishes.
+    response["X-Accel-Buffering"] = "no"
+    return response
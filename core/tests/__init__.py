@@ -0,0 +1,12 @@
+from core.models import NetworkDevice
+
+
+def make_device(name="r1", **fields):
+    """
+    Creates a device with placeholder credentials and an unused address.
+    """
+    fields.setdefault("ip_address", f"192.0.2.{NetworkDevice.objects.count() + 1}")
+    fields.setdefault("device_type", "cisco_ios")
+    fields.setdefault("username", "admin")
+    fields.setdefault("password", "secret")
+    return NetworkDevice.objects.create(name=name, **fields)
@@ -0,0 +1,109 @@
+import random
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.archive import (
+    apply_delta,
+    archive_config,
+    diff_versions,
+    make_delta,
+    text_cache,
+    version_text,
+)
+from core.models import ConfigDiff, ConfigVersion
+
+from . import make_device
+
+BASE_CONFIG = "\n".join(
+    ["hostname r1"]
+    + [
+        f"interface GigabitEthernet0/{port}\n description port {port}\n shutdown"
+        for port in range(40)
+    ]
+)
+
+
+def edit(text, seed):
+    """
+    Returns ``text`` with a few lines changed, removed and added.
+    """
+    rng = random.Random(seed)
+    lines = text.splitlines()
+    for _ in range(3):
+        lines[rng.randrange(len(lines))] = f" description edited {seed}"
+    del lines[rng.randrange(len(lines))]
+    lines.insert(rng.randrange(len(lines)), f"ntp server 10.0.0.{seed % 250}")
+    return "\n".join(lines)
+
+
+class DeltaTests(SimpleTestCase):
+    def test_round_trip(self):
+        cases = [
+            ([], []),
+            ([], ["a", "b"]),
+            (["a", "b"], []),
+            (["a", "b", "c"], ["a", "x", "c", "d"]),
+            (["a", "a", "b"], ["b", "a", "a"]),
+        ]
+        for old, new in cases:
+            with self.subTest(old=old, new=new):
+                self.assertEqual(apply_delta(old, make_delta(old, new)), new)
+
+    def test_identical_texts_have_an_empty_delta(self):
+        self.assertEqual(make_delta(["a", "b"], ["a", "b"]), [])
+
+
+@override_settings(CONFIG_ARCHIVE={"SNAPSHOT_INTERVAL": 5, "MAX_DELTA_RATIO": 0.5})
+class ConfigArchiveTests(TestCase):
+    def setUp(self):
+        self.device = make_device()
+        text_cache.clear()
+
+    def tearDown(self):
+        text_cache.clear()
+
+    def test_every_version_rebuilds_to_its_text(self):
+        texts = [BASE_CONFIG]
+        for seed in range(1, 12):
+            texts.append(edit(texts[-1], seed))
+        for text in texts:
+            archive_config(self.device, text)
+
+        kinds = list(
+            ConfigVersion.objects.filter(device=self.device)
+            .order_by("version")
+            .values_list("kind", flat=True)
+        )
+        snapshots = [index for index, kind in enumerate(kinds) if kind == "snapshot"]
+        self.assertEqual(snapshots, [0, 5, 10])
+
+        text_cache.clear()
+        versions = ConfigVersion.objects.filter(device=self.device).order_by("version")
+        for version, text in zip(versions, texts):
+            with self.subTest(version=version.version):
+                self.assertEqual(version_text(version), text)
+
+    def test_unchanged_config_only_updates_last_seen(self):
+        first, created = archive_config(self.device, BASE_CONFIG)
+        self.assertTrue(created)
+        again, created = archive_config(self.device, BASE_CONFIG + "\n")
+        self.assertFalse(created)
+        self.assertEqual(again.pk, first.pk)
+        self.assertEqual(ConfigVersion.objects.count(), 1)
+
+    def test_large_changes_are_stored_as_snapshots(self):
+        archive_config(self.device, BASE_CONFIG)
+        version, _ = archive_config(self.device, "hostname r2\nend")
+        self.assertEqual(version.kind, "snapshot")
+
+    def test_line_counts_and_cached_diffs(self):
+        old, _ = archive_config(self.device, "hostname r1\nntp server 10.0.0.1")
+        new, _ = archive_config(
+            self.device, "hostname r1\nntp server 10.0.0.2\nlogging host 10.0.0.3"
+        )
+        self.assertEqual((new.lines_added, new.lines_removed), (2, 1))
+        diff = diff_versions(old, new)
+        self.assertIn("+ntp server 10.0.0.2", diff.diff)
+        self.assertEqual((diff.lines_added, diff.lines_removed), (2, 1))
+        self.assertEqual(diff_versions(old, new).pk, diff.pk)
+        self.assertEqual(ConfigDiff.objects.count(), 1)
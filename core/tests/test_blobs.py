@@ -0,0 +1,77 @@
+from datetime import timedelta
+
+from django.test import TestCase
+
+from core.blobs import (
+    collect_garbage,
+    delete_referencing,
+    iter_blob_output,
+    recount_references,
+    store_outputs,
+)
+from core.models import HistoryRecord, OutputBlob
+
+from . import make_device
+
+
+class OutputBlobTests(TestCase):
+    def setUp(self):
+        self.device = make_device()
+
+    def record(self, output):
+        return HistoryRecord.objects.create(
+            device=self.device, engine="netmiko", command="show run", output=output
+        )
+
+    def test_identical_outputs_share_one_blob(self):
+        first = self.record("hostname r1\n")
+        second = self.record("hostname r1\n")
+        self.assertEqual(first.blob_id, second.blob_id)
+        blob = OutputBlob.objects.get()
+        self.assertEqual(blob.refcount, 2)
+        self.assertEqual(blob.size, len("hostname r1\n"))
+        stored = HistoryRecord.objects.get(pk=second.pk)
+        self.assertEqual(stored.output, "hostname r1\n")
+
+    def test_store_outputs_counts_repeated_texts(self):
+        blob_ids = store_outputs(["a", "b", "a"])
+        counts = dict(OutputBlob.objects.values_list("pk", "refcount"))
+        self.assertEqual(len(blob_ids), 2)
+        self.assertEqual(sorted(counts.values()), [1, 2])
+
+    def test_changing_the_output_moves_the_reference(self):
+        record = self.record("before")
+        before = record.blob_id
+        record.output = "after"
+        record.save()
+        self.assertEqual(OutputBlob.objects.get(pk=before).refcount, 0)
+        self.assertEqual(OutputBlob.objects.get(pk=record.blob_id).refcount, 1)
+
+    def test_deleting_rows_releases_references(self):
+        single = self.record("shared")
+        for _ in range(3):
+            self.record("shared")
+        single.delete()
+        self.assertEqual(OutputBlob.objects.get().refcount, 3)
+        delete_referencing(HistoryRecord.objects.all())
+        self.assertEqual(OutputBlob.objects.get().refcount, 0)
+
+    def test_garbage_collection_respects_the_grace_period(self):
+        delete_referencing(HistoryRecord.objects.filter(pk=self.record("old").pk))
+        self.assertEqual(collect_garbage(), 0)
+        self.assertEqual(collect_garbage(grace_period=timedelta(0)), 1)
+        self.assertFalse(OutputBlob.objects.exists())
+
+    def test_garbage_collection_keeps_referenced_blobs_with_drifted_counts(self):
+        self.record("live")
+        OutputBlob.objects.update(refcount=0)
+        self.assertEqual(collect_garbage(grace_period=timedelta(0)), 0)
+        recount_references()
+        self.assertEqual(OutputBlob.objects.get().refcount, 1)
+
+    def test_iter_blob_output_streams_the_stored_text(self):
+        text = "interface GigabitEthernet0/1\n description uplink\n" * 2000
+        record = self.record(text)
+        chunks = list(iter_blob_output(record.blob_id, 4096))
+        self.assertTrue(all(len(chunk) <= 4096 for chunk in chunks))
+        self.assertEqual(b"".join(chunks).decode(), text)
@@ -0,0 +1,124 @@
+import socket
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from paramiko.ssh_exception import AuthenticationException
+
+from core.circuit import (
+    CircuitOpen,
+    ConnectionAttempts,
+    check_circuit,
+    record_connection,
+    reset_circuit,
+)
+from core.models import DeviceCircuit
+
+from . import make_device
+
+BREAKER = {"FAILURE_THRESHOLD": 2, "COOL_OFF": 60, "MAX_COOL_OFF": 200}
+
+
+@override_settings(CIRCUIT_BREAKER=BREAKER)
+class CircuitBreakerTests(TestCase):
+    def setUp(self):
+        self.device = make_device()
+
+    def fail_connections(self, count=1):
+        for _ in range(count):
+            circuit = check_circuit(self.device.pk)
+            record_connection(self.device.pk, circuit, socket.timeout("timed out"))
+
+    def circuit(self):
+        return DeviceCircuit.objects.get(pk=self.device.pk)
+
+    def test_healthy_device_has_no_row(self):
+        self.assertIsNone(check_circuit(self.device.pk))
+        record_connection(self.device.pk, None)
+        self.assertFalse(DeviceCircuit.objects.exists())
+
+    def test_opens_at_the_threshold(self):
+        self.fail_connections()
+        self.assertEqual(self.circuit().state, "closed")
+        self.fail_connections()
+        circuit = self.circuit()
+        self.assertEqual(circuit.state, "open")
+        self.assertEqual(circuit.consecutive_failures, 2)
+        with self.assertRaises(CircuitOpen):
+            check_circuit(self.device.pk)
+
+    def test_success_resets_the_failure_count(self):
+        self.fail_connections()
+        record_connection(self.device.pk, check_circuit(self.device.pk))
+        self.fail_connections()
+        self.assertEqual(self.circuit().state, "closed")
+
+    def test_authentication_failures_do_not_count(self):
+        for _ in range(3):
+            circuit = check_circuit(self.device.pk)
+            record_connection(
+                self.device.pk, circuit, AuthenticationException("bad password")
+            )
+        self.assertFalse(DeviceCircuit.objects.exists())
+
+    def test_one_probe_after_the_cool_off(self):
+        self.fail_connections(2)
+        later = timezone.now() + timedelta(seconds=61)
+        probe = check_circuit(self.device.pk, now=later)
+        self.assertEqual(probe.state, "half_open")
+        # Only one caller probes; the others are still skipped.
+        with self.assertRaises(CircuitOpen):
+            check_circuit(self.device.pk, now=later)
+        record_connection(self.device.pk, probe)
+        circuit = self.circuit()
+        self.assertEqual(circuit.state, "closed")
+        self.assertEqual(circuit.consecutive_failures, 0)
+        self.assertIsNone(circuit.retry_at)
+
+    def test_failed_probe_reopens_for_longer(self):
+        self.fail_connections(2)
+        first_cool_off = self.circuit().retry_at - self.circuit().opened_at
+        later = timezone.now() + timedelta(seconds=61)
+        probe = check_circuit(self.device.pk, now=later)
+        record_connection(self.device.pk, probe, ConnectionRefusedError())
+        circuit = self.circuit()
+        self.assertEqual(circuit.state, "open")
+        self.assertEqual(first_cool_off, timedelta(seconds=60))
+        self.assertEqual(circuit.retry_at - circuit.opened_at, timedelta(seconds=120))
+
+        for _ in range(3):
+            circuit = self.circuit()
+            probe = check_circuit(self.device.pk, now=circuit.retry_at)
+            record_connection(self.device.pk, probe, ConnectionRefusedError())
+        circuit = self.circuit()
+        self.assertEqual(circuit.retry_at - circuit.opened_at, timedelta(seconds=200))
+
+    def test_stale_probe_is_replaced(self):
+        self.fail_connections(2)
+        later = timezone.now() + timedelta(seconds=61)
+        check_circuit(self.device.pk, now=later)
+        replacement = check_circuit(self.device.pk, now=later + timedelta(seconds=121))
+        self.assertEqual(replacement.state, "half_open")
+
+    def test_reset_closes_the_circuit(self):
+        self.fail_connections(2)
+        reset_circuit(self.device.pk)
+        self.assertIsNone(check_circuit(self.device.pk))
+
+    def test_retries_of_one_operation_count_once(self):
+        attempts = ConnectionAttempts(self.device.pk)
+        for _ in range(3):
+            attempts.failed(socket.timeout("timed out"))
+        attempts.finish()
+        self.assertEqual(self.circuit().consecutive_failures, 1)
+
+        attempts = ConnectionAttempts(self.device.pk)
+        attempts.failed(socket.timeout("timed out"))
+        attempts.succeeded()
+        attempts.finish()
+        self.assertEqual(self.circuit().consecutive_failures, 0)
+
+    @override_settings(CIRCUIT_BREAKER=dict(BREAKER, ENABLED=False))
+    def test_disabled_breaker_never_opens(self):
+        self.fail_connections(5)
+        self.assertFalse(DeviceCircuit.objects.exists())
@@ -0,0 +1,188 @@
+import asyncio
+import threading
+from datetime import timedelta
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from core.concurrency import (
+    AIMDLimit,
+    ConcurrencyController,
+    DatabaseDeviceLocks,
+    Limiter,
+    concurrency_options,
+)
+from core.models import DeviceLock
+
+from . import make_device
+
+
+def fill_window(limit, count, latency=1.0, failed=False, in_flight=None):
+    for _ in range(count):
+        limit.record(latency, failed, limit.value if in_flight is None else in_flight)
+
+
+class AIMDLimitTests(SimpleTestCase):
+    def test_grows_by_one_after_a_healthy_window(self):
+        limit = AIMDLimit(5, 1, 10)
+        fill_window(limit, 5)
+        self.assertEqual(limit.value, 6)
+        self.assertEqual(limit.increases, 1)
+
+    def test_does_not_grow_when_the_limit_was_not_used(self):
+        limit = AIMDLimit(5, 1, 10)
+        fill_window(limit, 5, in_flight=2)
+        self.assertEqual(limit.value, 5)
+
+    def test_never_exceeds_the_maximum(self):
+        limit = AIMDLimit(5, 1, 6)
+        fill_window(limit, 5)
+        fill_window(limit, 6)
+        self.assertEqual(limit.value, 6)
+
+    def test_cuts_on_errors(self):
+        limit = AIMDLimit(8, 1, 10, max_error_rate=0.2)
+        fill_window(limit, 6)
+        fill_window(limit, 2, failed=True)
+        self.assertEqual(limit.value, 4)
+        self.assertEqual(limit.decreases, 1)
+
+    def test_cuts_on_latency_against_the_baseline(self):
+        limit = AIMDLimit(5, 1, 10, latency_tolerance=2.0)
+        fill_window(limit, 5, latency=1.0)
+        self.assertEqual(limit.baseline, 1.0)
+        fill_window(limit, 6, latency=3.0)
+        self.assertEqual(limit.value, 3)
+
+    def test_never_drops_below_the_minimum(self):
+        limit = AIMDLimit(5, 2, 10)
+        for _ in range(4):
+            fill_window(limit, 5, failed=True)
+        self.assertEqual(limit.value, 2)
+
+
+class LimiterTests(SimpleTestCase):
+    def limiter(self, **options):
+        return Limiter(concurrency_options(dict(options, ADAPTIVE=False)))
+
+    def test_global_limit(self):
+        limiter = self.limiter(GLOBAL_LIMIT=2)
+        limiter.take("cisco_ios", "")
+        limiter.take("cisco_ios", "")
+        self.assertFalse(limiter.has_room("cisco_ios", ""))
+        # Uncounted sessions only observe the per-type and per-site limits.
+        self.assertTrue(limiter.has_room("cisco_ios", "", counted=False))
+        limiter.give_back("cisco_ios", "", 1.0, False)
+        self.assertTrue(limiter.has_room("cisco_ios", ""))
+
+    def test_per_device_type_and_site_limits(self):
+        limiter = self.limiter(
+            GLOBAL_LIMIT=10, PER_DEVICE_TYPE={"juniper": 1}, PER_SITE={"lab": 1}
+        )
+        limiter.take("juniper", "dc1")
+        self.assertFalse(limiter.has_room("juniper", "dc2", counted=False))
+        self.assertTrue(limiter.has_room("cisco_ios", "dc1"))
+        limiter.take("cisco_ios", "lab", counted=False)
+        self.assertFalse(limiter.has_room("cisco_ios", "lab"))
+        self.assertEqual(limiter.active, 1)
+        limiter.give_back("cisco_ios", "lab", 1.0, False, counted=False)
+        self.assertTrue(limiter.has_room("cisco_ios", "lab"))
+
+    def test_adaptive_limit_only_learns_from_counted_sessions(self):
+        limiter = Limiter(concurrency_options({"GLOBAL_LIMIT": 1}))
+        for _ in range(10):
+            limiter.take("cisco_ios", "", counted=False)
+            limiter.give_back("cisco_ios", "", 1.0, True, counted=False)
+        self.assertEqual(limiter.adaptive._samples, [])
+
+
+class SlotTests(SimpleTestCase):
+    def controller(self, **options):
+        return ConcurrencyController(concurrency_options(dict(options, ADAPTIVE=False)))
+
+    def start_slot(self, controller, device_id, device_type="cisco_ios", site=""):
+        """
+        Opens a slot in a thread; returns (started, release) events.
+        """
+        started, release = threading.Event(), threading.Event()
+
+        def hold():
+            with controller.slot(device_id, device_type, site):
+                started.set()
+                release.wait(5)
+
+        threading.Thread(target=hold, daemon=True).start()
+        return started, release
+
+    def test_one_session_per_device(self):
+        controller = self.controller(GLOBAL_LIMIT=5)
+        first, release_first = self.start_slot(controller, 1)
+        self.assertTrue(first.wait(1))
+        second, release_second = self.start_slot(controller, 1)
+        other, release_other = self.start_slot(controller, 2)
+        self.assertTrue(other.wait(1))
+        self.assertFalse(second.wait(0.1))
+        release_first.set()
+        self.assertTrue(second.wait(1))
+        release_second.set()
+        release_other.set()
+        self.assertEqual(controller.stats()["device_waits"], 1)
+
+    def test_global_limit_blocks_until_a_slot_frees(self):
+        controller = self.controller(GLOBAL_LIMIT=1)
+        first, release_first = self.start_slot(controller, 1)
+        self.assertTrue(first.wait(1))
+        second, release_second = self.start_slot(controller, 2)
+        self.assertFalse(second.wait(0.1))
+        release_first.set()
+        self.assertTrue(second.wait(1))
+        release_second.set()
+
+    def test_job_limiter_tightens_the_shared_limits(self):
+        controller = self.controller(GLOBAL_LIMIT=5)
+        job_limiter = controller.job_limiter({"GLOBAL_LIMIT": 1, "ADAPTIVE": False})
+        self.assertEqual(controller.max_workers(job_limiter, device_count=3), 1)
+        with controller.slot(1, "cisco_ios", job_limiter=job_limiter):
+            self.assertFalse(controller._can_start(2, "cisco_ios", "", job_limiter))
+            self.assertTrue(controller._can_start(2, "cisco_ios", "", None))
+
+    def test_exceptions_mark_the_lease_failed_and_free_the_slot(self):
+        controller = self.controller(GLOBAL_LIMIT=1)
+        with self.assertRaises(OSError):
+            with controller.slot(1, "cisco_ios") as lease:
+                raise OSError("connection reset")
+        self.assertTrue(lease.failed)
+        self.assertEqual(controller.stats()["active"], 0)
+        self.assertEqual(controller.stats()["busy_devices"], 0)
+
+    def test_async_slot_waits_for_a_thread_holding_the_device(self):
+        controller = self.controller(GLOBAL_LIMIT=1)
+        held, release = self.start_slot(controller, 1)
+        self.assertTrue(held.wait(1))
+
+        async def run():
+            threading.Timer(0.1, release.set).start()
+            async with controller.async_slot(1, "cisco_ios") as lease:
+                # The thread's slot was given back before this one opened.
+                return lease, controller.stats()
+
+        lease, stats = asyncio.run(run())
+        self.assertEqual(lease.device_id, 1)
+        self.assertEqual(stats["busy_devices"], 1)
+        # Async sessions do not count against the global limit.
+        self.assertEqual(stats["active"], 0)
+
+
+class DatabaseDeviceLockTests(TestCase):
+    def test_lease_of_a_dead_worker_expires(self):
+        device = make_device()
+        locks = DatabaseDeviceLocks(lock_timeout=600, poll_interval=0.01)
+        DeviceLock.objects.create(
+            device=device,
+            owner="dead",
+            renewed_at=timezone.now() - timedelta(seconds=601),
+        )
+        owner = locks.acquire(device.pk)
+        self.assertEqual(DeviceLock.objects.get(device=device).owner, owner)
+        locks.release(device.pk, owner)
+        self.assertFalse(DeviceLock.objects.exists())
@@ -0,0 +1,97 @@
+import hashlib
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from core.models import HistoryRecord
+
+from . import make_device
+
+# Multi-byte characters make byte offsets differ from character offsets.
+OUTPUT = "".join(
+    f"interface Gi0/{port}\n description café {port}\n" for port in range(500)
+)
+BODY = OUTPUT.encode()
+
+
+class HistoryOutputTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user("operator")
+        self.client.force_login(user)
+        record = HistoryRecord.objects.create(
+            device=make_device(),
+            engine="netmiko",
+            command="show run",
+            output=OUTPUT,
+        )
+        self.url = reverse("core:history_output", args=[record.pk])
+        self.etag = f'"{hashlib.sha256(BODY).hexdigest()}"'
+        # Small chunks so ranges span several of them.
+        patcher = mock.patch("core.views.OUTPUT_CHUNK_SIZE", 1000)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, **headers):
+        return self.client.get(self.url, secure=True, headers=headers)
+
+    def test_full_output(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), BODY)
+        self.assertEqual(response["Content-Length"], str(len(BODY)))
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(response["ETag"], self.etag)
+
+    def test_matching_etag_is_not_modified(self):
+        response = self.get(If_None_Match=self.etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], self.etag)
+        self.assertEqual(self.get(If_None_Match='"stale"').status_code, 200)
+
+    def test_ranges(self):
+        size = len(BODY)
+        cases = {
+            "bytes=0-9": (0, 9),
+            "bytes=995-2004": (995, 2004),
+            f"bytes=1000-{size + 100}": (1000, size - 1),
+            "bytes=5000-": (5000, size - 1),
+            "bytes=-25": (size - 25, size - 1),
+            f"bytes=-{size * 2}": (0, size - 1),
+            f"bytes={size - 1}-{size - 1}": (size - 1, size - 1),
+        }
+        for header, (start, end) in cases.items():
+            with self.subTest(range=header):
+                response = self.get(Range=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(
+                    b"".join(response.streaming_content), BODY[start : end + 1]
+                )
+                self.assertEqual(response["Content-Length"], str(end - start + 1))
+                self.assertEqual(
+                    response["Content-Range"], f"bytes {start}-{end}/{size}"
+                )
+
+    def test_unsatisfiable_ranges(self):
+        size = len(BODY)
+        for header in (f"bytes={size}-", "bytes=20-10"):
+            with self.subTest(range=header):
+                response = self.get(Range=header)
+                self.assertEqual(response.status_code, 416)
+                self.assertEqual(response["Content-Range"], f"bytes */{size}")
+
+    def test_unusable_ranges_serve_the_whole_output(self):
+        for header in ("bytes=0-5,10-20", "items=0-5", "bytes=a-b"):
+            with self.subTest(range=header):
+                response = self.get(Range=header)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(b"".join(response.streaming_content), BODY)
+
+    def test_download(self):
+        response = self.client.get(self.url, {"download": "1"}, secure=True)
+        self.assertIn("attachment", response["Content-Disposition"])
+
+    def test_login_required(self):
+        self.client.logout()
+        self.assertEqual(self.get().status_code, 302)
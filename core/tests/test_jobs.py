@@ -0,0 +1,145 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.jobs import (
+    JOB_RUNNERS,
+    claim_next_job,
+    reclaim_stale_jobs,
+    retry_devices,
+    retry_job,
+    run_job,
+    submit_job,
+)
+from core.models import Job
+
+from . import make_device
+
+
+@override_settings(JOB_WORKER={"HEARTBEAT_INTERVAL": 30, "STALE_AFTER": 300})
+class JobClaimTests(TestCase):
+    def setUp(self):
+        self.device = make_device()
+
+    def submit(self):
+        return submit_job("netmiko", "show", [self.device], ["show version"])
+
+    def test_claims_the_oldest_queued_job_once(self):
+        first, second = self.submit(), self.submit()
+        claimed = claim_next_job("worker-a")
+        self.assertEqual(claimed.pk, first.pk)
+        self.assertEqual(claimed.status, "running")
+        self.assertEqual(claimed.worker, "worker-a")
+        self.assertIsNotNone(claimed.heartbeat_at)
+        self.assertEqual(claim_next_job("worker-b").pk, second.pk)
+        self.assertIsNone(claim_next_job("worker-c"))
+
+    def test_reclaims_jobs_without_recent_heartbeats(self):
+        job = self.submit()
+        claim_next_job("worker-a")
+        self.assertEqual(reclaim_stale_jobs(), [])
+
+        later = timezone.now() + timedelta(seconds=301)
+        self.assertEqual(reclaim_stale_jobs(now=later), [job.pk])
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(job.error, "Worker worker-a stopped responding")
+        # Already failed; a second pass leaves it alone.
+        self.assertEqual(reclaim_stale_jobs(now=later), [])
+
+    def test_jobs_claimed_before_heartbeats_use_their_start(self):
+        job = self.submit()
+        Job.objects.filter(pk=job.pk).update(
+            status="running",
+            started_at=timezone.now() - timedelta(seconds=301),
+            heartbeat_at=None,
+        )
+        self.assertEqual(reclaim_stale_jobs(), [job.pk])
+
+    def test_claiming_reclaims_stale_jobs_first(self):
+        job = self.submit()
+        claim_next_job("worker-a")
+        Job.objects.filter(pk=job.pk).update(
+            heartbeat_at=timezone.now() - timedelta(seconds=301)
+        )
+        self.assertIsNone(claim_next_job("worker-b"))
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+
+    def test_run_job_records_the_outcome(self):
+        job = self.submit()
+        claimed = claim_next_job("worker-a")
+
+        def runner(job, record_result):
+            record_result(self.device, "show version", "success", "IOS")
+
+        with mock.patch.dict(JOB_RUNNERS, {("netmiko", "show"): runner}):
+            finished = run_job(claimed)
+        self.assertEqual(finished.status, "completed")
+        self.assertEqual(job.results.get().output, "IOS")
+
+    def test_run_job_keeps_a_reclaim_that_happened_while_it_ran(self):
+        self.submit()
+        claimed = claim_next_job("worker-a")
+
+        def runner(job, record_result):
+            reclaim_stale_jobs(now=timezone.now() + timedelta(seconds=301))
+
+        with mock.patch.dict(JOB_RUNNERS, {("netmiko", "show"): runner}):
+            finished = run_job(claimed)
+        self.assertEqual(finished.status, "failed")
+        self.assertEqual(
+            Job.objects.get(pk=claimed.pk).error, "Worker worker-a stopped responding"
+        )
+
+
+class JobRetryTests(TestCase):
+    def setUp(self):
+        self.ok, self.failed, self.skipped, self.unreached = (
+            make_device(name) for name in ("ok", "failed", "skipped", "unreached")
+        )
+        self.job = submit_job(
+            "netmiko",
+            "show",
+            [self.ok, self.failed, self.skipped, self.unreached],
+            ["show version", "show clock"],
+            {"use_textfsm": True},
+        )
+        for device, status in (
+            (self.ok, "success"),
+            (self.failed, "success"),
+            (self.failed, "failed"),
+            (self.skipped, "skipped"),
+        ):
+            self.job.results.create(
+                device=device, command="show version", status=status
+            )
+
+    def test_retries_failed_skipped_and_unreached_devices(self):
+        self.assertEqual(
+            set(retry_devices(self.job)), {self.failed, self.skipped, self.unreached}
+        )
+
+    def test_retry_job_links_a_new_job(self):
+        self.job.status = "failed"
+        retry = retry_job(self.job)
+        self.assertEqual(retry.parent, self.job)
+        self.assertEqual(retry.status, "queued")
+        self.assertEqual(retry.commands, ["show version", "show clock"])
+        self.assertEqual(retry.options, {"use_textfsm": True})
+        self.assertEqual(
+            set(retry.devices.all()), {self.failed, self.skipped, self.unreached}
+        )
+        self.assertEqual(list(self.job.retries.all()), [retry])
+
+    def test_unfinished_jobs_are_not_retried(self):
+        with self.assertRaises(ValueError):
+            retry_job(self.job)
+
+    def test_nothing_to_retry_when_every_device_succeeded(self):
+        job = submit_job("netmiko", "show", [self.ok], ["show version"])
+        job.results.create(device=self.ok, command="show version", status="success")
+        job.status = "completed"
+        self.assertIsNone(retry_job(job))
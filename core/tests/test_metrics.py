@@ -0,0 +1,114 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core.metrics import DEAD_SNAPSHOT, Counter, Gauge, Histogram, MetricsRegistry
+
+METRICS = {
+    "ENABLED": True,
+    "MULTIPROCESS_DIR": None,
+    "FLUSH_INTERVAL": 5.0,
+    "TOKEN": None,
+    "ALLOW_ANONYMOUS": False,
+}
+
+
+def exited_pid():
+    process = subprocess.Popen([sys.executable, "-c", ""])
+    process.wait()
+    return process.pid
+
+
+@override_settings(METRICS=METRICS)
+class MultiprocessTests(SimpleTestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+        self.jobs = self.registry.register(
+            Counter(self.registry, "jobs_total", "Jobs", ["status"])
+        )
+        self.active = self.registry.register(
+            Gauge(self.registry, "sessions_active", "Sessions")
+        )
+        self.seconds = self.registry.register(
+            Histogram(self.registry, "job_seconds", "Job time", buckets=(1, 10))
+        )
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write_snapshot(self, pid, jobs, active, seconds):
+        snapshot = {
+            "jobs_total": {"type": "counter", "values": [[["success"], jobs]]},
+            "sessions_active": {"type": "gauge", "values": [[[], active]]},
+            "job_seconds": {"type": "histogram", "values": [[[], seconds]]},
+        }
+        with open(os.path.join(self.directory, f"{pid}.json"), "w") as handle:
+            json.dump(snapshot, handle)
+
+    def test_gauges_of_exited_processes_are_dropped(self):
+        self.jobs.labels("success").inc(2)
+        self.active.set(1)
+        self.write_snapshot(os.getppid(), 3, 4, [1, 0, 0, 0.5])
+        self.write_snapshot(exited_pid(), 5, 6, [0, 1, 0, 2.0])
+        values = self.registry.merged_values(self.directory)
+        self.assertEqual(values["jobs_total"], {("success",): 10})
+        self.assertEqual(values["sessions_active"], {(): 5})
+        self.assertEqual(values["job_seconds"], {(): [1, 1, 0, 2.5]})
+
+    def test_exited_processes_are_folded_into_one_snapshot(self):
+        for jobs in (5, 7):
+            self.write_snapshot(exited_pid(), jobs, 6, [0, 1, 0, 2.0])
+        self.write_snapshot(os.getppid(), 3, 4, [1, 0, 0, 0.5])
+        before = self.registry.merged_values(self.directory)
+
+        self.registry.prune(self.directory)
+        snapshots = sorted(
+            name for name in os.listdir(self.directory) if name.endswith(".json")
+        )
+        self.assertEqual(snapshots, sorted([DEAD_SNAPSHOT, f"{os.getppid()}.json"]))
+        self.assertEqual(self.registry.merged_values(self.directory), before)
+
+        # Later exits add to the folded totals.
+        self.write_snapshot(exited_pid(), 1, 6, [1, 0, 0, 0.1])
+        self.registry.prune(self.directory)
+        values = self.registry.merged_values(self.directory)
+        self.assertEqual(values["jobs_total"], {("success",): 16})
+        with open(os.path.join(self.directory, DEAD_SNAPSHOT)) as handle:
+            self.assertNotIn("sessions_active", json.load(handle))
+
+
+class MetricsEndpointTests(TestCase):
+    def setUp(self):
+        self.url = reverse("core:metrics")
+
+    def get(self, **headers):
+        return self.client.get(self.url, secure=True, headers=headers)
+
+    @override_settings(METRICS=METRICS)
+    def test_anonymous_scrapes_need_an_opt_in(self):
+        self.assertEqual(self.get().status_code, 401)
+        with override_settings(METRICS=dict(METRICS, ALLOW_ANONYMOUS=True)):
+            self.assertEqual(self.get().status_code, 200)
+
+    @override_settings(METRICS=dict(METRICS, TOKEN="s3cret"))
+    def test_bearer_token(self):
+        self.assertEqual(self.get(Authorization="Bearer s3cret").status_code, 200)
+        self.assertEqual(self.get(Authorization="Bearer wrong").status_code, 401)
+        self.assertEqual(self.get().status_code, 401)
+
+    @override_settings(METRICS=METRICS)
+    def test_logged_in_users(self):
+        self.client.force_login(get_user_model().objects.create_user("operator"))
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"# TYPE", response.content)
+
+    @override_settings(METRICS=dict(METRICS, ENABLED=False, ALLOW_ANONYMOUS=True))
+    def test_disabled(self):
+        self.assertEqual(self.get().status_code, 404)
@@ -0,0 +1,108 @@
+import base64
+from datetime import timedelta
+
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.utils import timezone
+
+from core.models import HistoryRecord
+from core.pagination import (
+    MAX_PAGE_SIZE,
+    decode_cursor,
+    encode_cursor,
+    history_page,
+    keyset_page,
+    page_size_from,
+)
+
+from . import make_device
+
+
+def encode(raw):
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+class CursorTests(SimpleTestCase):
+    def test_malformed_cursors_are_rejected(self):
+        for cursor in (
+            "!!!",
+            "a",
+            encode("no separator"),
+            encode("2024-01-01T00:00:00+00:00|abc"),
+            encode("yesterday|12"),
+            base64.urlsafe_b64encode(b"\xff\xfe|1").decode(),
+        ):
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(ValueError):
+                    decode_cursor(cursor)
+
+    def test_page_size_is_clamped(self):
+        self.assertEqual(page_size_from("20"), 20)
+        self.assertEqual(page_size_from("0"), 1)
+        self.assertEqual(page_size_from("100000"), MAX_PAGE_SIZE)
+        self.assertEqual(page_size_from("many", default=7), 7)
+        self.assertEqual(page_size_from(None, default=7), 7)
+
+
+class KeysetPageTests(TestCase):
+    def setUp(self):
+        self.device = make_device()
+        self.now = timezone.now().replace(microsecond=0)
+
+    def record(self, executed_at):
+        return HistoryRecord.objects.create(
+            device=self.device,
+            engine="netmiko",
+            command="show version",
+            output="",
+            executed_at=executed_at,
+        )
+
+    def walk(self, page_size):
+        pages, cursor = [], None
+        while True:
+            page = keyset_page(HistoryRecord.objects.all(), cursor, page_size)
+            pages.append([row.pk for row in page])
+            if not page.has_next:
+                return pages
+            cursor = page.next_cursor
+
+    def test_ties_on_executed_at_are_ordered_by_id(self):
+        # Batched writers give many rows the same timestamp.
+        tied = [self.record(self.now) for _ in range(7)]
+        older = [self.record(self.now - timedelta(seconds=1)) for _ in range(3)]
+        expected = [row.pk for row in reversed(tied)] + [
+            row.pk for row in reversed(older)
+        ]
+        for page_size in (1, 2, 3, 5, 10):
+            with self.subTest(page_size=page_size):
+                pages = self.walk(page_size)
+                self.assertEqual(sum(pages, []), expected)
+                self.assertTrue(all(len(page) <= page_size for page in pages))
+
+    def test_last_page_of_an_exact_multiple_has_no_cursor(self):
+        for seconds in range(4):
+            self.record(self.now - timedelta(seconds=seconds))
+        pages = self.walk(2)
+        self.assertEqual([len(page) for page in pages], [2, 2])
+
+    def test_empty_history(self):
+        page = keyset_page(HistoryRecord.objects.all())
+        self.assertEqual(len(page), 0)
+        self.assertFalse(page.has_next)
+
+    def test_new_rows_do_not_shift_later_pages(self):
+        rows = [self.record(self.now - timedelta(seconds=s)) for s in range(4)]
+        first = keyset_page(HistoryRecord.objects.all(), page_size=2)
+        self.record(self.now + timedelta(seconds=1))
+        second = keyset_page(HistoryRecord.objects.all(), first.next_cursor, 2)
+        self.assertEqual([row.pk for row in second], [rows[2].pk, rows[3].pk])
+
+    def test_cursor_round_trip(self):
+        row = self.record(self.now)
+        self.assertEqual(decode_cursor(encode_cursor(row)), (row.executed_at, row.pk))
+
+    def test_bad_cursor_is_not_found_in_views(self):
+        request = RequestFactory().get("/history/", {"cursor": "not-a-cursor"})
+        with self.assertRaises(Http404):
+            history_page(request, HistoryRecord.objects.all())
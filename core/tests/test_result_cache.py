@@ -0,0 +1,155 @@
+import threading
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import HistoryRecord
+from core.result_cache import ResultCache, cache_options
+
+from . import make_device
+
+SUCCESS = {"status": "success", "output": "Cisco IOS Software"}
+
+
+def make_cache(**options):
+    merged = dict(cache_options(), CHECK_HISTORY=False, TTLS={}, DEFAULT_TTL=30)
+    merged.update(options)
+    return ResultCache(merged)
+
+
+class ResultCacheTtlTests(TestCase):
+    def test_longest_prefix_wins(self):
+        cache = make_cache(
+            TTLS={"show": 5, "show ip": 10, "show ip bgp": 0}, DEFAULT_TTL=30
+        )
+        self.assertEqual(cache.ttl("show version"), 5)
+        self.assertEqual(cache.ttl("show ip route"), 10)
+        self.assertEqual(cache.ttl("show ip bgp summary"), 0)
+        self.assertEqual(cache.ttl("ping 10.0.0.1"), 30)
+
+    def test_prefixes_and_commands_are_normalized(self):
+        cache = make_cache(TTLS={"show  ip   route": 7})
+        self.assertEqual(cache.ttl("  show ip\troute vrf A"), 7)
+
+    def test_zero_ttl_bypasses_the_cache(self):
+        cache = make_cache(TTLS={"show clock": 0})
+        lookup = cache.lookup(1, ["show clock"], False)
+        self.assertEqual(lookup.uncached, ["show clock"])
+        self.assertEqual(lookup.claimed, [])
+        self.assertEqual(cache.stats(), {"entries": 0, "in_flight": 0})
+
+
+class ResultCacheCoalescingTests(TestCase):
+    def test_second_caller_waits_for_the_first(self):
+        cache = make_cache()
+        first = cache.lookup(1, ["show version"], False)
+        second = cache.lookup(1, ["show version"], False)
+        self.assertEqual(first.claimed, ["show version"])
+        self.assertEqual(list(second.pending), ["show version"])
+
+        threading.Timer(0.05, first.resolve, [{"show version": SUCCESS}]).start()
+        self.assertEqual(second.wait(lambda command: 5), [])
+        outputs = second.outputs(["show version"])
+        self.assertEqual(
+            outputs["show version"],
+            {"status": "success", "output": SUCCESS["output"], "cached": True},
+        )
+
+        third = cache.lookup(1, ["show version"], False)
+        self.assertEqual(list(third.cached), ["show version"])
+
+    def test_textfsm_and_raw_results_are_separate(self):
+        cache = make_cache()
+        raw = cache.lookup(1, ["show version"], False)
+        parsed = cache.lookup(1, ["show version"], True)
+        self.assertEqual(raw.claimed, ["show version"])
+        self.assertEqual(parsed.claimed, ["show version"])
+
+    def test_abandoned_claim_is_run_by_the_waiter(self):
+        cache = make_cache()
+        first = cache.lookup(1, ["show version"], False)
+        second = cache.lookup(1, ["show version"], False)
+        first.abandon()
+        self.assertEqual(second.wait(lambda command: 5), ["show version"])
+        self.assertEqual(second.commands_to_run, ["show version"])
+        self.assertEqual(cache.stats()["in_flight"], 0)
+
+    def test_waiter_gives_up_after_its_timeout(self):
+        cache = make_cache()
+        first = cache.lookup(1, ["show version"], False)
+        second = cache.lookup(1, ["show version"], False)
+        self.assertEqual(second.wait(lambda command: 0.05), ["show version"])
+        self.assertEqual(second.commands_to_run, ["show version"])
+        first.abandon()
+
+    def test_failures_are_shared_but_not_stored(self):
+        cache = make_cache()
+        first = cache.lookup(1, ["show version"], False)
+        second = cache.lookup(1, ["show version"], False)
+        first.resolve({"show version": {"status": "failed", "output": "timeout"}})
+        self.assertEqual(second.wait(lambda command: 5), [])
+        outputs = second.outputs(["show version"])
+        self.assertEqual(outputs["show version"]["status"], "failed")
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_force_refresh_joins_a_run_in_flight(self):
+        cache = make_cache()
+        first = cache.lookup(1, ["show version"], False)
+        first.resolve({"show version": SUCCESS})
+        refresh = cache.lookup(1, ["show version"], False, force_refresh=True)
+        self.assertEqual(refresh.claimed, ["show version"])
+        joined = cache.lookup(1, ["show version"], False, force_refresh=True)
+        self.assertEqual(list(joined.pending), ["show version"])
+        refresh.abandon()
+
+    def test_oldest_entries_are_evicted(self):
+        cache = make_cache(MAX_ENTRIES=2)
+        for command in ("show a", "show b", "show c"):
+            cache.lookup(1, [command], False).resolve({command: SUCCESS})
+        self.assertEqual(cache.stats()["entries"], 2)
+        self.assertEqual(cache.lookup(1, ["show a"], False).claimed, ["show a"])
+
+
+class ResultCacheInvalidationTests(TestCase):
+    def test_invalidation_drops_only_that_device(self):
+        cache = make_cache()
+        for device_id in (1, 2):
+            cache.lookup(device_id, ["show version"], False).resolve(
+                {"show version": SUCCESS}
+            )
+        cache.invalidate_device(1)
+        self.assertEqual(
+            cache.lookup(1, ["show version"], False).claimed, ["show version"]
+        )
+        self.assertEqual(
+            list(cache.lookup(2, ["show version"], False).cached), ["show version"]
+        )
+
+    def test_results_in_flight_during_invalidation_are_not_stored(self):
+        cache = make_cache()
+        lookup = cache.lookup(1, ["show version"], False)
+        waiter = cache.lookup(1, ["show version"], False)
+        cache.invalidate_device(1)
+        lookup.resolve({"show version": SUCCESS})
+        # Waiters still get the result, but it is not kept.
+        self.assertEqual(waiter.wait(lambda command: 5), [])
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_configuration_from_another_process_invalidates(self):
+        device = make_device()
+        cache = make_cache(CHECK_HISTORY=True)
+        cache.lookup(device.pk, ["show run"], False).resolve({"show run": SUCCESS})
+        lookup = cache.lookup(device.pk, ["show run"], False)
+        self.assertEqual(list(lookup.cached), ["show run"])
+
+        HistoryRecord.objects.create(
+            device=device,
+            engine="netmiko",
+            command="hostname r1",
+            command_type="config",
+            output="",
+            executed_at=timezone.now() + timedelta(seconds=1),
+        )
+        lookup = cache.lookup(device.pk, ["show run"], False)
+        self.assertEqual(lookup.claimed, ["show run"])
@@ -0,0 +1,133 @@
+import gzip
+import json
+import os
+import tempfile
+from datetime import timedelta
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import HistoryRecord, HistoryRollup, OutputBlob
+from core.retention import (
+    DEFAULT_OPTIONS,
+    RetentionArchive,
+    expired_history,
+    prune_history,
+)
+
+from . import make_device
+
+
+class RetentionTests(TestCase):
+    def setUp(self):
+        self.device = make_device()
+        self.now = timezone.now()
+
+    def record(self, days_ago, command_type="show", status="success", **fields):
+        fields.setdefault("output", "output")
+        return HistoryRecord.objects.create(
+            device=self.device,
+            engine=fields.pop("engine", "netmiko"),
+            command=fields.pop("command", "show version"),
+            command_type=command_type,
+            status=status,
+            executed_at=self.now - timedelta(days=days_ago),
+            **fields,
+        )
+
+    def expired_ids(self, policies):
+        return {
+            pk
+            for _, queryset in expired_history(policies, now=self.now)
+            for pk in queryset.values_list("pk", flat=True)
+        }
+
+    def test_rows_follow_the_first_policy_they_match(self):
+        old_backup = self.record(1000, "backup", "failed")
+        recent_failure = self.record(60, status="failed")
+        old_failure = self.record(91, "config", "failed")
+        recent_show = self.record(29)
+        old_show = self.record(31)
+        recent_config = self.record(300, "config")
+        old_config = self.record(366, "config")
+
+        expired = self.expired_ids(DEFAULT_OPTIONS["POLICIES"])
+        self.assertEqual(expired, {old_failure.pk, old_show.pk, old_config.pk})
+        for kept in (old_backup, recent_failure, recent_show, recent_config):
+            self.assertNotIn(kept.pk, expired)
+
+    def test_rows_matching_no_policy_are_kept(self):
+        self.record(1000, "config")
+        self.assertEqual(self.expired_ids([{"command_type": "show", "days": 1}]), set())
+
+    def test_catch_all_policy_ends_the_list(self):
+        show = self.record(10)
+        config = self.record(10, "config")
+        policies = [
+            {"command_type": "config", "days": None},
+            {"days": 5},
+            {"command_type": "show", "days": 100},
+        ]
+        self.assertEqual(self.expired_ids(policies), {show.pk})
+        self.assertNotIn(config.pk, self.expired_ids(policies))
+
+    def test_command_match(self):
+        version = self.record(10, command="show version")
+        self.record(10, command="show clock")
+        policies = [{"command": "show version", "days": 5}]
+        self.assertEqual(self.expired_ids(policies), {version.pk})
+
+    def test_unknown_policy_keys_are_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            expired_history([{"device": "r1", "days": 5}])
+
+    def test_prune_rolls_up_and_releases_output(self):
+        day = (self.now - timedelta(days=40)).replace(hour=12)
+        for status, command_time, size in (
+            ("success", 1.5, 100),
+            ("success", 2.5, 300),
+            ("failed", 4.0, 0),
+        ):
+            record = self.record(0, status=status, output="shared output")
+            HistoryRecord.objects.filter(pk=record.pk).update(
+                executed_at=day, command_time=command_time, bytes_received=size
+            )
+        blob = OutputBlob.objects.get()
+        self.assertEqual(blob.refcount, 3)
+
+        queryset = HistoryRecord.objects.filter(executed_at__lt=self.now)
+        self.assertEqual(prune_history(queryset, batch_size=2), 3)
+        self.assertFalse(HistoryRecord.objects.exists())
+        blob.refresh_from_db()
+        self.assertEqual(blob.refcount, 0)
+
+        rollups = {
+            rollup.status: rollup
+            for rollup in HistoryRollup.objects.filter(device=self.device)
+        }
+        self.assertEqual(rollups["success"].operations, 2)
+        self.assertEqual(rollups["success"].command_time, 4.0)
+        self.assertEqual(rollups["success"].bytes_received, 400)
+        self.assertEqual(rollups["success"].day, timezone.localdate(day))
+        self.assertEqual(rollups["failed"].operations, 1)
+
+    def test_later_prunes_add_to_existing_rollups(self):
+        for _ in range(2):
+            record = self.record(40)
+            prune_history(HistoryRecord.objects.filter(pk=record.pk))
+        rollup = HistoryRollup.objects.get()
+        self.assertEqual(rollup.operations, 2)
+
+    def test_prune_archives_rows_before_deleting_them(self):
+        record = self.record(40, output="line 1\nline 2")
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "history.ndjson.gz")
+            with RetentionArchive(path) as archive:
+                prune_history(HistoryRecord.objects.all(), archive=archive)
+            with gzip.open(path, "rt") as handle:
+                rows = [json.loads(line) for line in handle]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["id"], record.pk)
+        self.assertEqual(rows[0]["device"], "r1")
+        self.assertEqual(rows[0]["output"], "line 1\nline 2")
@@ -0,0 +1,82 @@
+from datetime import timedelta
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from core.models import HistoryRecord
+from core.timeouts import (
+    DEFAULT_OPTIONS,
+    LatencyProfile,
+    TimeoutAdvisor,
+    derive_timeout,
+    latency_profile,
+)
+
+from . import make_device
+
+
+class DeriveTimeoutTests(SimpleTestCase):
+    def test_needs_enough_samples(self):
+        self.assertIsNone(derive_timeout(None, DEFAULT_OPTIONS, (10, 60)))
+        profile = LatencyProfile(4, 1.0, 1.0)
+        self.assertIsNone(derive_timeout(profile, DEFAULT_OPTIONS, (10, 60)))
+
+    def test_fast_devices_keep_the_driver_default(self):
+        profile = latency_profile([0.1] * 10, 0.3)
+        self.assertEqual(derive_timeout(profile, DEFAULT_OPTIONS, (10, 60)), 10)
+
+    def test_slow_devices_get_more_time_up_to_the_ceiling(self):
+        profile = latency_profile([5.0] * 10, 0.3)
+        self.assertEqual(derive_timeout(profile, DEFAULT_OPTIONS, (10, 60)), 17.0)
+        profile = latency_profile([50.0] * 10, 0.3)
+        self.assertEqual(derive_timeout(profile, DEFAULT_OPTIONS, (10, 60)), 60)
+
+    def test_failures_widen_the_timeout_past_the_floor(self):
+        for failures, expected in ((1, 20), (2, 40), (3, 60), (40, 60)):
+            with self.subTest(failures=failures):
+                profile = latency_profile([0.1] * 10, 0.3, failures)
+                self.assertEqual(
+                    derive_timeout(profile, DEFAULT_OPTIONS, (10, 60)), expected
+                )
+
+    def test_profile_uses_the_larger_of_ewma_and_p95(self):
+        profile = latency_profile([1.0] * 19 + [20.0], 0.3)
+        self.assertEqual(profile.p95, 1.0)
+        self.assertAlmostEqual(profile.ewma, 6.7)
+
+
+class TimeoutAdvisorTests(TestCase):
+    def setUp(self):
+        self.device = make_device()
+        self.advisor = TimeoutAdvisor(dict(DEFAULT_OPTIONS, CACHE_TTL=0))
+        self.now = timezone.now()
+
+    def run_command(self, minutes_ago, status, command_time):
+        HistoryRecord.objects.create(
+            device=self.device,
+            engine="netmiko",
+            command="show tech",
+            status=status,
+            command_time=command_time,
+            output="",
+            executed_at=self.now - timedelta(minutes=minutes_ago),
+        )
+
+    def test_failures_since_the_last_success_widen_the_read_timeout(self):
+        for minute in range(10, 4, -1):
+            self.run_command(minute, "success", 5.0)
+        self.assertEqual(self.advisor.read_timeout(self.device.pk, "show tech"), 17.0)
+
+        self.run_command(3, "failed", 17.0)
+        self.run_command(2, "failed", 17.0)
+        self.assertEqual(self.advisor.read_timeout(self.device.pk, "show tech"), 68.0)
+
+        # A success ends the backoff.
+        self.run_command(1, "success", 5.0)
+        self.assertEqual(self.advisor.read_timeout(self.device.pk, "show tech"), 17.0)
+
+    def test_overrides_win(self):
+        self.assertEqual(
+            self.advisor.read_timeout(self.device.pk, "show tech", override=90), 90.0
+        )
+        self.assertIsNone(self.advisor.connect_timeout(self.device.pk))
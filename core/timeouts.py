@@ -0,0 +1,200 @@
+"""
+Connect and read timeouts learned from past runs.
+
+Fixed timeouts either fail slow devices (satellite links, busy boxes) or wait
+far too long on fast ones. Every history row already records how long the
+session setup and each command took, so the timeouts are derived from the
+last ``WINDOW`` successful runs of the device (and command): the larger of
+the exponentially weighted moving average (``ALPHA``) and the 95th percentile,
+times ``MULTIPLIER`` plus ``MARGIN`` seconds, clamped to ``CONNECT_RANGE`` or
+``READ_RANGE``. The ranges start at Netmiko's own defaults, so learning only
+ever gives a slow device more time.
+
+A device that slowed down past its learned timeout fails without recording a
+new success, so successes alone would never raise the timeout again. Each run
+that failed after the device's (or command's) latest success multiplies the
+timeout by ``FAILURE_BACKOFF`` until a run succeeds.
+
+With fewer than ``MIN_SAMPLES`` runs nothing is learned and the driver's
+default applies. ``NetworkDevice.connect_timeout`` and ``read_timeout``
+override the learned values. Profiles are cached per process for
+``CACHE_TTL`` seconds, so a large job costs at most one query per device and
+command.
+"""
+
+import math
+import threading
+import time
+from typing import NamedTuple
+
+from django.conf import settings
+
+from .models import HistoryRecord
+
+DEFAULT_OPTIONS = {
+    "ENABLED": True,
+    "WINDOW": 50,
+    "MIN_SAMPLES": 5,
+    "ALPHA": 0.3,
+    "MULTIPLIER": 3.0,
+    "MARGIN": 2.0,
+    "CONNECT_RANGE": (10, 60),
+    "READ_RANGE": (10, 600),
+    "FAILURE_BACKOFF": 2.0,
+    "CACHE_TTL": 300,
+}
+
+
+def timeout_options():
+    """
+    Returns the default options updated with ``settings.LEARNED_TIMEOUTS``.
+    """
+    options = dict(DEFAULT_OPTIONS)
+    options.update(getattr(settings, "LEARNED_TIMEOUTS", {}))
+    return options
+
+
+class LatencyProfile(NamedTuple):
+    """Latency of past successful runs, in seconds, and failures since."""
+
+    samples: int
+    ewma: float
+    p95: float
+    failures: int = 0
+
+
+def latency_profile(samples, alpha, failures=0):
+    """
+    Summarizes latency samples given oldest first; None without samples.
+    """
+    if not samples:
+        return None
+    ewma = samples[0]
+    for sample in samples[1:]:
+        ewma = alpha * sample + (1 - alpha) * ewma
+    ordered = sorted(samples)
+    p95 = ordered[max(math.ceil(0.95 * len(ordered)) - 1, 0)]
+    return LatencyProfile(len(samples), ewma, p95, failures)
+
+
+def derive_timeout(profile, options, bounds):
+    """
+    Returns the timeout for a profile, or None when it has too few samples.
+    """
+    if profile is None or profile.samples < options["MIN_SAMPLES"]:
+        return None
+    seconds = max(profile.ewma, profile.p95) * options["MULTIPLIER"]
+    low, high = bounds
+    seconds = max(seconds + options["MARGIN"], low)
+    seconds *= options["FAILURE_BACKOFF"] ** min(profile.failures, 16)
+    return min(seconds, high)
+
+
+class TimeoutAdvisor:
+    """
+    Derives per-device timeouts from the command history, caching profiles.
+    """
+
+    def __init__(self, options=None):
+        self.options = options or timeout_options()
+        self._lock = threading.Lock()
+        self._profiles = {}
+
+    def connect_timeout(self, device_id, override=None):
+        """
+        Returns the seconds to wait for a session to the device, or None for
+        the driver's default.
+        """
+        if override:
+            return float(override)
+        if not self.options["ENABLED"]:
+            return None
+        profile = self.profile(device_id)
+        return derive_timeout(profile, self.options, self.options["CONNECT_RANGE"])
+
+    def read_timeout(self, device_id, command, override=None):
+        """
+        Returns the seconds to wait for ``command``'s output, or None for the
+        driver's default.
+        """
+        if override:
+            return float(override)
+        if not self.options["ENABLED"]:
+            return None
+        profile = self.profile(device_id, command)
+        return derive_timeout(profile, self.options, self.options["READ_RANGE"])
+
+    def profile(self, device_id, command=None):
+        """
+        Returns the session setup profile of a device, or with ``command`` the
+        profile of that command on it.
+        """
+        key = (device_id, command)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._profiles.get(key)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        samples, failures = self._samples(device_id, command)
+        profile = latency_profile(samples, self.options["ALPHA"], failures)
+        with self._lock:
+            self._profiles[key] = (now + self.options["CACHE_TTL"], profile)
+        return profile
+
+    def _samples(self, device_id, command):
+        """
+        Returns the latencies of the last successful runs, oldest first, and
+        the number of runs that failed after the latest of them.
+
+        Only the first history row of a run carries its session timings, and
+        a failed row only carries the timing of a phase it reached, so each
+        failed connection or command counts once.
+        """
+        history = HistoryRecord.objects.filter(device_id=device_id)
+        if command is None:
+            history = history.filter(connect_time__isnull=False)
+            rows = history.filter(status="success").values_list(
+                "executed_at", "connect_time", "prompt_time"
+            )
+            rows = rows.order_by("-executed_at")[: self.options["WINDOW"]]
+            samples = [(at, connect + (prompt or 0.0)) for at, connect, prompt in rows]
+        else:
+            history = history.filter(command=command, command_time__isnull=False)
+            samples = list(
+                history.filter(status="success")
+                .order_by("-executed_at")
+                .values_list("executed_at", "command_time")[: self.options["WINDOW"]]
+            )
+        if not samples:
+            return [], 0
+        failures = history.filter(
+            status="failed", executed_at__gt=samples[0][0]
+        ).count()
+        return [seconds for _, seconds in reversed(samples)], failures
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+
+
+_advisor = None
+_advisor_lock = threading.Lock()
+
+
+def get_timeout_advisor():
+    """
+    Returns the process-wide advisor, creating it from settings on first use.
+    """
+    global _advisor
+    with _advisor_lock:
+        if _advisor is None:
+            _advisor = TimeoutAdvisor()
+        return _advisor
+
+
+def connect_timeout(device_id, override=None):
+    return get_timeout_advisor().connect_timeout(device_id, override)
+
+
+def read_timeout(device_id, command, override=None):
+    return get_timeout_advisor().read_timeout(device_id, command, override)
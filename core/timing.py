@@ -0,0 +1,151 @@
+"""
+Per-phase timing of device operations.
+
+An ``OperationTimer`` records how long each phase of one device operation
+took: opening the SSH session (``connect``), prompt detection and session
+preparation (``prompt``), running each command (``command``) and TextFSM
+parsing (``parse``), plus the bytes of output received. Code that opens
+sessions deep inside the connection pool calls the module-level ``phase()``,
+which times into whichever timer is active in the current context and does
+nothing otherwise.
+
+The numbers are stored on history rows through the ``OperationTimings``
+abstract model; ``phase_summary()`` aggregates them per device type.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models import Avg, Count, Max, Sum
+
+SESSION_PHASES = ("connect", "prompt")
+
+_active_timer = ContextVar("operation_timer", default=None)
+
+
+class OperationTimer:
+    """
+    Collects phase durations for one device operation.
+
+    Session phases are paid once per connection; command phases are kept per
+    command. Use as a context manager to make it the active timer::
+
+        with OperationTimer() as timer:
+            with device_connection(device) as net_connect:
+                ...
+    """
+
+    def __init__(self):
+        self.session = {}
+        self.commands = {}
+        self._token = None
+
+    def __enter__(self):
+        self._token = _active_timer.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _active_timer.reset(self._token)
+        return False
+
+    @contextmanager
+    def phase(self, name, command=None):
+        """
+        Adds the time spent in the block to ``name`` (for ``command``, if given).
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            target = self.session if name in SESSION_PHASES else self._entry(command)
+            target[name] = target.get(name, 0.0) + elapsed
+
+    def add_output(self, command, output):
+        """
+        Counts the bytes of a command's raw output.
+        """
+        if isinstance(output, bytes):
+            size = len(output)
+        elif isinstance(output, str):
+            size = len(output.encode())
+        else:
+            size = 0
+        entry = self._entry(command)
+        entry["bytes_received"] = entry.get("bytes_received", 0) + size
+
+    def _entry(self, command):
+        return self.commands.setdefault(command, {})
+
+    def elapsed(self):
+        """
+        Returns the total seconds recorded across every phase.
+        """
+        total = sum(self.session.values())
+        for entry in self.commands.values():
+            total += entry.get("command", 0.0) + entry.get("parse", 0.0)
+        return total
+
+    def history_fields(self, command=None, include_session=True):
+        """
+        Returns the ``OperationTimings`` field values for a history row.
+
+        Session phases are only included on the row that paid for them (the
+        first command of a session), so averages are not skewed by repeats.
+        """
+        entry = self.commands.get(command, {})
+        fields = {
+            "command_time": _rounded(entry.get("command")),
+            "parse_time": _rounded(entry.get("parse")),
+            "bytes_received": entry.get("bytes_received", 0),
+        }
+        if include_session:
+            fields["connect_time"] = _rounded(self.session.get("connect"))
+            fields["prompt_time"] = _rounded(self.session.get("prompt"))
+        return fields
+
+
+def _rounded(value):
+    return round(value, 6) if value is not None else None
+
+
+@contextmanager
+def phase(name, command=None):
+    """
+    Times the block into the active timer, if there is one.
+    """
+    timer = _active_timer.get()
+    if timer is None:
+        yield
+        return
+    with timer.phase(name, command):
+        yield
+
+
+def phase_summary(queryset):
+    """
+    Aggregates a history queryset's phase timings per device type.
+
+    Returns one dict per device type, slowest average command time first.
+    """
+    rows = (
+        queryset.values("device__device_type")
+        .annotate(
+            operations=Count("id"),
+            sessions=Count("connect_time"),
+            avg_connect=Avg("connect_time"),
+            avg_prompt=Avg("prompt_time"),
+            avg_command=Avg("command_time"),
+            max_command=Max("command_time"),
+            avg_parse=Avg("parse_time"),
+            total_bytes=Sum("bytes_received"),
+            avg_bytes=Avg("bytes_received"),
+        )
+        .order_by("-avg_command")
+    )
+    summary = []
+    for row in rows:
+        row["device_type"] = row.pop("device__device_type")
+        summary.append(row)
+    return summary
@@ -20,6 +20,32 @@ urlpatterns = [
     ),  # DRF browsable API authentication
     path("devices/", views.device_list, name="device_list"),
     path("devices/<int:device_id>/", views.device_detail, name="device_detail"),
+    path(
+        "devices/<int:device_id>/configs/",
+        views.device_configs,
+        name="device_configs",
+    ),
+    path(
+        "devices/<int:device_id>/configs/diff/",
+        views.config_diff,
+        name="config_diff",
+    ),
+    path(
+        "devices/<int:device_id>/configs/<int:version>/",
+        views.config_version,
+        name="config_version",
+    ),
+    path(
+        "history/<int:history_id>/output/",
+        views.history_output,
+        name="history_output",
+    ),
     path("groups/", views.group_list, name="group_list"),
     path("templates/", views.template_list, name="template_list"),
+    path("metrics", views.metrics, name="metrics"),
+    path("performance/", views.performance, name="performance"),
+    path("jobs/", views.job_list, name="job_list"),
+    path("jobs/<int:job_id>/", views.job_detail, name="job_detail"),
+    path("jobs/<int:job_id>/status/", views.job_status, name="job_status"),
+    path("jobs/<int:job_id>/retry/", views.job_retry, name="job_retry"),
 ]
@@ -1,20 +1,65 @@
+from datetime import timedelta
+
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseNotModified,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.utils.http import content_disposition_header
+from django.views.decorators.http import require_POST
 
 # Create serializers for the API
 from rest_framework import permissions, serializers, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 
-from netmiko_tools.models import CommandHistory
-from nornir_tools.models import NornirCommandHistory
-
-from .models import CommandTemplate, DeviceGroup, NetworkDevice
+from .archive import diff_versions, version_text
+from .blobs import iter_blob_output
+from .circuit import device_circuit, reset_circuit
+from .jobs import job_summary, retry_job
+from .metrics import metrics_options, render_metrics
+from .models import (
+    CommandTemplate,
+    ConfigVersion,
+    DeviceCircuit,
+    DeviceGroup,
+    HistoryRecord,
+    Job,
+    NetworkDevice,
+    OutputBlob,
+)
+from .pagination import HistoryCursorPagination
+from .reachability import device_reachability, online_devices, with_reachability
+from .timing import phase_summary
+
+
+class DeviceCircuitSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DeviceCircuit
+        fields = [
+            "state",
+            "consecutive_failures",
+            "opened_at",
+            "retry_at",
+            "last_failure_at",
+            "last_error",
+        ]
 
 
 class NetworkDeviceSerializer(serializers.ModelSerializer):
+    circuit = serializers.SerializerMethodField()
+    reachability = serializers.SerializerMethodField()
+
     class Meta:
         model = NetworkDevice
         fields = [
@@ -24,8 +69,13 @@ class NetworkDeviceSerializer(serializers.ModelSerializer):
             "device_type",
             "username",
             "port",
+            "site",
             "is_active",
             "description",
+            "connect_timeout",
+            "read_timeout",
+            "circuit",
+            "reachability",
             "created_at",
             "updated_at",
         ]
@@ -35,6 +85,15 @@ class NetworkDeviceSerializer(serializers.ModelSerializer):
             "enable_password": {"write_only": True},
         }
 
+    def get_circuit(self, obj):
+        return DeviceCircuitSerializer(device_circuit(obj)).data
+
+    def get_reachability(self, obj):
+        # Annotated by NetworkDeviceViewSet.get_queryset(); looked up otherwise.
+        if hasattr(obj, "reachability_status"):
+            return obj.reachability_status
+        return device_reachability(obj)["status"]
+
 
 class DeviceGroupSerializer(serializers.ModelSerializer):
     devices_count = serializers.SerializerMethodField()
@@ -71,6 +130,71 @@ class CommandTemplateSerializer(serializers.ModelSerializer):
         read_only_fields = ["created_at", "updated_at"]
 
 
+class ConfigVersionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ConfigVersion
+        fields = [
+            "id",
+            "version",
+            "kind",
+            "digest",
+            "size",
+            "line_count",
+            "lines_added",
+            "lines_removed",
+            "captured_at",
+            "last_seen_at",
+        ]
+
+
+class CommandHistorySerializer(serializers.Serializer):
+    """
+    History row with an output preview; the full output is at ``output_url``.
+    """
+
+    id = serializers.IntegerField()
+    engine = serializers.CharField()
+    command = serializers.CharField()
+    status = serializers.CharField()
+    executed_at = serializers.DateTimeField()
+    preview = serializers.CharField(source="blob.preview")
+    size = serializers.IntegerField(source="blob.size")
+    line_count = serializers.IntegerField(source="blob.line_count")
+    output_url = serializers.SerializerMethodField()
+
+    def get_output_url(self, obj):
+        url = reverse("core:history_output", args=[obj.pk])
+        return self.context["request"].build_absolute_uri(url)
+
+
+# Full outputs are streamed to the client in pieces of this size.
+OUTPUT_CHUNK_SIZE = 64 * 1024
+
+
+def _diff_pair(device, request_params):
+    """
+    Returns the ``(from, to)`` versions named by ``?from=&to=``.
+
+    ``to`` defaults to the latest version and ``from`` to the one before it.
+    """
+    versions = device.config_versions.defer("data")
+    try:
+        to_number = int(request_params.get("to") or 0)
+        from_number = int(request_params.get("from") or 0)
+    except ValueError:
+        raise Http404("Invalid version number")
+    if to_number:
+        to_version = get_object_or_404(versions, version=to_number)
+    else:
+        to_version = versions.order_by("-version").first()
+        if to_version is None:
+            raise Http404("No archived configuration")
+    from_version = get_object_or_404(
+        versions, version=from_number or max(to_version.version - 1, 1)
+    )
+    return from_version, to_version
+
+
 # Authentication views
 @login_required
 def index(request):
@@ -78,20 +202,14 @@ def index(request):
     groups = DeviceGroup.objects.all()
     templates = CommandTemplate.objects.all()
 
-    # Get recent command history
-    netmiko_history = CommandHistory.objects.all().order_by("-executed_at")[:5]
-    nornir_history = NornirCommandHistory.objects.all().order_by("-executed_at")[:5]
-
-    # Combine and sort the history
-    command_history = sorted(
-        list(netmiko_history) + list(nornir_history),
-        key=lambda x: x.executed_at,
-        reverse=True,
+    # Get recent command history across engines
+    command_history = HistoryRecord.objects.select_related("device").order_by(
+        "-executed_at"
     )[:10]
 
     context = {
         "device_count": devices.count(),
-        "online_count": devices.filter(is_active=True).count(),
+        "online_count": online_devices().count(),
         "group_count": groups.count(),
         "template_count": templates.count(),
         "command_history": command_history,
@@ -120,15 +238,31 @@ def logout_view(request):
 
 # Create viewsets for the API
 class NetworkDeviceViewSet(viewsets.ModelViewSet):
-    queryset = NetworkDevice.objects.all()
+    queryset = NetworkDevice.objects.select_related("circuit")
     serializer_class = NetworkDeviceSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_queryset(self):
+        return with_reachability(super().get_queryset())
+
     @action(detail=True, methods=["get"])
     def status(self, request, pk=None):
+        """
+        Latest reachability probe of the device (see ``core.reachability``).
+        """
         device = self.get_object()
-        # In a real implementation, this would check device connectivity
-        return Response({"status": "online" if device.is_active else "offline"})
+        return Response(device_reachability(device))
+
+    @action(detail=True, methods=["get", "delete"])
+    def circuit(self, request, pk=None):
+        """
+        Circuit breaker state of the device; DELETE closes the circuit.
+        """
+        device = self.get_object()
+        if request.method == "DELETE":
+            reset_circuit(device.pk)
+            device = self.get_object()
+        return Response(DeviceCircuitSerializer(device_circuit(device)).data)
 
     @action(detail=True, methods=["get"])
     def groups(self, request, pk=None):
@@ -137,6 +271,63 @@ class NetworkDeviceViewSet(viewsets.ModelViewSet):
         serializer = DeviceGroupSerializer(groups, many=True)
         return Response(serializer.data)
 
+    @action(detail=True, methods=["get"])
+    def history(self, request, pk=None):
+        """
+        Command history, newest first, keyset-paginated with ``?cursor=``.
+
+        ``?engine=netmiko|nornir`` and ``?status=`` filter it.
+        """
+        device = self.get_object()
+        queryset = (
+            HistoryRecord.objects.filter(device=device)
+            .select_related("blob")
+            .defer("blob__data")
+        )
+        engine = request.query_params.get("engine")
+        if engine:
+            if engine not in dict(HistoryRecord.ENGINE_CHOICES):
+                raise NotFound("Unknown engine")
+            queryset = queryset.filter(engine=engine)
+        status = request.query_params.get("status")
+        if status:
+            queryset = queryset.filter(status=status)
+        paginator = HistoryCursorPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = CommandHistorySerializer(
+            page, many=True, context={"request": request}
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=["get"])
+    def configs(self, request, pk=None):
+        device = self.get_object()
+        versions = device.config_versions.defer("data")
+        serializer = ConfigVersionSerializer(versions, many=True)
+        return Response(serializer.data)
+
+    @action(detail=True, methods=["get"], url_path=r"configs/(?P<version>\d+)")
+    def config_version(self, request, pk=None, version=None):
+        device = self.get_object()
+        config = get_object_or_404(device.config_versions, version=version)
+        data = ConfigVersionSerializer(config).data
+        data["config"] = version_text(config)
+        return Response(data)
+
+    @action(detail=True, methods=["get"], url_path="configs/diff")
+    def config_diff(self, request, pk=None):
+        from_version, to_version = _diff_pair(self.get_object(), request.GET)
+        diff = diff_versions(from_version, to_version)
+        return Response(
+            {
+                "from": from_version.version,
+                "to": to_version.version,
+                "lines_added": diff.lines_added,
+                "lines_removed": diff.lines_removed,
+                "diff": diff.diff,
+            }
+        )
+
 
 class DeviceGroupViewSet(viewsets.ModelViewSet):
     queryset = DeviceGroup.objects.all()
@@ -166,10 +357,10 @@ class CommandTemplateViewSet(viewsets.ModelViewSet):
 def device_list(request):
     # Filter devices based on status parameter
     status = request.GET.get("status")
-    devices = NetworkDevice.objects.all()
+    devices = with_reachability(NetworkDevice.objects.select_related("circuit"))
 
     if status == "active":
-        devices = devices.filter(is_active=True)
+        devices = online_devices(devices)
 
     return render(
         request,
@@ -194,20 +385,8 @@ def template_list(request):
 def device_detail(request, device_id):
     device = get_object_or_404(NetworkDevice, pk=device_id)
 
-    # Get command history for this device
-    netmiko_history = CommandHistory.objects.filter(device=device).order_by(
-        "-executed_at"
-    )[:5]
-    nornir_history = NornirCommandHistory.objects.filter(device=device).order_by(
-        "-executed_at"
-    )[:5]
-
-    # Combine and sort the history
-    command_history = sorted(
-        list(netmiko_history) + list(nornir_history),
-        key=lambda x: x.executed_at,
-        reverse=True,
-    )[:10]
+    # Get command history for this device across engines
+    command_history = device.command_history.order_by("-executed_at")[:10]
 
     return render(
         request,
@@ -217,3 +396,219 @@ def device_detail(request, device_id):
             "command_history": command_history,
         },
     )
+
+
+@login_required
+def device_configs(request, device_id):
+    device = get_object_or_404(NetworkDevice, pk=device_id)
+    versions = device.config_versions.defer("data")
+    return render(
+        request, "core/config_list.html", {"device": device, "versions": versions}
+    )
+
+
+@login_required
+def config_version(request, device_id, version):
+    device = get_object_or_404(NetworkDevice, pk=device_id)
+    config = get_object_or_404(device.config_versions, version=version)
+    return render(
+        request,
+        "core/config_version.html",
+        {"device": device, "config": config, "text": version_text(config)},
+    )
+
+
+@login_required
+def config_diff(request, device_id):
+    """
+    Unified diff between two archived versions, ``?from=<version>&to=<version>``.
+    """
+    device = get_object_or_404(NetworkDevice, pk=device_id)
+    from_version, to_version = _diff_pair(device, request.GET)
+    diff = diff_versions(from_version, to_version)
+    return render(
+        request,
+        "core/config_diff.html",
+        {
+            "device": device,
+            "from_version": from_version,
+            "to_version": to_version,
+            "diff": diff,
+            "lines": diff.diff.splitlines(),
+        },
+    )
+
+
+def _byte_range(header, size):
+    """
+    Parses a single-range ``Range: bytes=`` header into inclusive offsets.
+
+    Returns None when there is no usable header (the whole body is served)
+    and raises ``ValueError`` when the range lies outside the body.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes=") :].strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            start = max(size - int(last), 0)
+            end = size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        raise ValueError(f"Unsatisfiable range {header!r}")
+    return start, min(end, size - 1)
+
+
+def _slice_chunks(chunks, start, end):
+    """
+    Yields bytes ``start`` to ``end`` (inclusive) of a stream of chunks.
+    """
+    offset = 0
+    for chunk in chunks:
+        if offset + len(chunk) > start:
+            yield chunk[max(start - offset, 0) : end + 1 - offset]
+        offset += len(chunk)
+        if offset > end:
+            return
+
+
+@login_required
+def history_output(request, history_id):
+    """
+    Full output of one history row as plain text.
+
+    Honours single-range ``Range`` requests so multi-megabyte outputs can be
+    fetched in parts; ``?download=1`` serves the output as an attachment. The
+    output is decompressed and sent chunk by chunk, never as a whole.
+    """
+    history = get_object_or_404(
+        HistoryRecord.objects.select_related("device"), pk=history_id
+    )
+    blob = OutputBlob.objects.only("digest", "size").get(pk=history.blob_id)
+    # Blobs are content-addressed, so the digest is a strong validator.
+    etag = f'"{blob.digest}"'
+    if etag in request.headers.get("If-None-Match", ""):
+        return HttpResponseNotModified(headers={"ETag": etag})
+
+    content_type = "text/plain; charset=utf-8"
+    try:
+        byte_range = _byte_range(request.headers.get("Range"), blob.size)
+    except ValueError:
+        return HttpResponse(
+            status=416, headers={"Content-Range": f"bytes */{blob.size}"}
+        )
+    chunks = iter_blob_output(blob.pk, OUTPUT_CHUNK_SIZE)
+    if byte_range is None:
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response["Content-Length"] = blob.size
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _slice_chunks(chunks, start, end), status=206, content_type=content_type
+        )
+        response["Content-Length"] = end - start + 1
+        response["Content-Range"] = f"bytes {start}-{end}/{blob.size}"
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    if request.GET.get("download"):
+        response["Content-Disposition"] = content_disposition_header(
+            True, f"{history.device.name}-{history.engine}-{history.pk}.txt"
+        )
+    return response
+
+
+@login_required
+def job_list(request):
+    jobs = Job.objects.select_related("created_by")[:50]
+    return render(request, "core/job_list.html", {"jobs": jobs})
+
+
+@login_required
+def job_detail(request, job_id):
+    job = get_object_or_404(Job, pk=job_id)
+    return render(request, "core/job_detail.html", {"job": job})
+
+
+@login_required
+@require_POST
+def job_retry(request, job_id):
+    """
+    Queues a finished job again for its devices that failed or were skipped.
+    """
+    job = get_object_or_404(Job, pk=job_id)
+    if not job.is_finished:
+        messages.error(request, f"Job #{job.pk} has not finished yet.")
+        return redirect("core:job_detail", job_id=job.pk)
+    retry = retry_job(job, user=request.user)
+    if retry is None:
+        messages.info(request, f"Every device of job #{job.pk} succeeded.")
+        return redirect("core:job_detail", job_id=job.pk)
+    return redirect("core:job_detail", job_id=retry.pk)
+
+
+@login_required
+def job_status(request, job_id):
+    """
+    JSON poll endpoint for a job; ``?after=<result id>`` returns only newer results.
+    """
+    job = get_object_or_404(Job, pk=job_id)
+    try:
+        after = int(request.GET.get("after", 0))
+    except ValueError:
+        after = 0
+    return JsonResponse(job_summary(job, after=after))
+
+
+@login_required
+def performance(request):
+    """
+    Per-device-type averages of the recorded phase timings.
+
+    ``?days=<n>`` limits the summary to recent history (default 7, 0 for all).
+    """
+    try:
+        days = max(int(request.GET.get("days", 7)), 0)
+    except ValueError:
+        days = 7
+    history = HistoryRecord.objects.all()
+    if days:
+        history = history.filter(executed_at__gte=timezone.now() - timedelta(days=days))
+    return render(
+        request,
+        "core/performance.html",
+        {
+            "days": days,
+            "summaries": [
+                (label, phase_summary(history.filter(engine=engine)))
+                for engine, label in HistoryRecord.ENGINE_CHOICES
+            ],
+        },
+    )
+
+
+def metrics(request):
+    """
+    Prometheus scrape endpoint.
+
+    Scrapers send ``Authorization: Bearer <METRICS["TOKEN"]>``; logged-in
+    users can browse it. ``METRICS["ALLOW_ANONYMOUS"]`` opens it to everyone.
+    """
+    options = metrics_options()
+    if not options["ENABLED"]:
+        raise Http404("Metrics are disabled.")
+    token = options["TOKEN"]
+    supplied = request.headers.get("Authorization", "")
+    allowed = (
+        options["ALLOW_ANONYMOUS"]
+        or request.user.is_authenticated
+        or (token and constant_time_compare(supplied, f"Bearer {token}"))
+    )
+    if not allowed:
+        return HttpResponse("Unauthorized\n", status=401)
+    return HttpResponse(
+        render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
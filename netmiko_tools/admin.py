@@ -11,5 +11,6 @@ class CommandHistoryAdmin(admin.ModelAdmin):
 
     list_display = ("device", "command", "status", "executed_at")
     list_filter = ("status", "device", "executed_at")
-    search_fields = ("command", "output", "device__name")
+    search_fields = ("command", "device__name")
+    readonly_fields = ("output",)
     ordering = ("-executed_at",)
@@ -8,3 +8,7 @@ class NetmikoToolsConfig(AppConfig):
 
     default_auto_field = "django.db.models.BigAutoField"
     name = "netmiko_tools"
+
+    def ready(self):
+        # Register the background job runners and connection pool signals.
+        from . import jobs, signals  # noqa: F401
@@ -0,0 +1,319 @@
+"""
+Asyncio execution backend for very large show-command fan-outs.
+
+The threaded backend costs a thread stack and a paramiko transport per open
+session, which limits a process to a few hundred concurrent devices. This
+backend drives every session from one event loop with asyncssh, so thousands
+of devices can be in flight at once, bounded by ``ASYNC_ENGINE["MAX_SESSIONS"]``.
+
+Commands are sent over SSH exec channels on one connection per device, so
+this backend suits platforms that accept exec requests (IOS, NX-OS, EOS,
+Junos). It runs at the login privilege level and only supports show
+commands; configuration changes always use the threaded Netmiko backend.
+
+asyncssh is an optional dependency, listed in ``requirements-async.txt``;
+``async_engine_available()`` reports whether it is installed.
+"""
+
+import asyncio
+import queue
+import threading
+
+from django.conf import settings
+from netmiko.utilities import get_structured_data
+
+from core.circuit import CircuitOpen, check_circuit, record_connection
+from core.concurrency import get_concurrency_controller
+from core.metrics import SESSIONS_OPENED, record_device_operation
+from core.retry import DeadlineExceeded
+from core.timeouts import connect_timeout, read_timeout
+from core.timing import OperationTimer
+
+try:
+    import asyncssh
+except ImportError:  # pragma: no cover - optional dependency
+    asyncssh = None
+
+_DONE = object()
+
+
+class AsyncEngineUnavailable(RuntimeError):
+    """
+    Raised when the asyncio backend is selected but asyncssh is not installed.
+    """
+
+
+def async_engine_available():
+    return asyncssh is not None
+
+
+def engine_options():
+    """
+    Returns the configured session cap and timeouts for the asyncio backend.
+    """
+    options = getattr(settings, "ASYNC_ENGINE", {})
+    return {
+        "MAX_SESSIONS": options.get("MAX_SESSIONS", 1000),
+        "CONNECT_TIMEOUT": options.get("CONNECT_TIMEOUT", 30),
+        "COMMAND_TIMEOUT": options.get("COMMAND_TIMEOUT", 60),
+    }
+
+
+def _format_output(output, device, command, use_textfsm, timer):
+    if not use_textfsm:
+        return output
+    # Imported lazily to avoid a circular import with views.
+    from .views import format_command_output
+
+    with timer.phase("parse", command):
+        structured = get_structured_data(
+            output, platform=device.device_type, command=command
+        )
+    return format_command_output(structured, use_textfsm)
+
+
+async def _connect(device, connect_timeout):
+    if asyncssh is None:
+        raise AsyncEngineUnavailable(
+            "The asyncio backend requires asyncssh "
+            "(pip install -r requirements-async.txt)."
+        )
+    connection = await asyncio.wait_for(
+        asyncssh.connect(
+            device.ip_address,
+            port=device.port,
+            username=device.username,
+            password=device.password,
+            known_hosts=None,
+        ),
+        timeout=connect_timeout,
+    )
+    SESSIONS_OPENED.labels("asyncio", device.device_type).inc()
+    return connection
+
+
+async def execute_command_on_device_async(device, command, use_textfsm=True):
+    """
+    Executes a single command on a network device over asyncssh.
+
+    Returns ``(device, output, status)`` like ``execute_command_on_device``.
+    """
+    device, outputs, status = await execute_commands_on_device_async(
+        device, [command], use_textfsm
+    )
+    return device, outputs[command]["output"], status
+
+
+async def execute_commands_on_device_async(device, commands, use_textfsm=True):
+    """
+    Executes several show commands over one asyncssh connection to a device.
+
+    Returns ``(device, outputs, status)`` exactly like
+    ``execute_commands_on_device``, including per-command ``timings``. The
+    ``connect`` phase covers the whole login; there is no separate prompt
+    detection over exec channels.
+    """
+    result, _ = await _execute_commands(device, commands, use_textfsm)
+    return result
+
+
+async def _execute_commands(device, commands, use_textfsm, timeouts=None):
+    """
+    Returns the ``execute_commands_on_device_async`` result and the error
+    raised while connecting, if any, for the device's circuit breaker.
+
+    ``timeouts`` holds the learned ``(connect, {command: read})`` timeouts of
+    the device (see ``device_timeouts``); the engine options fill the gaps.
+    """
+    options = engine_options()
+    connect_timeout, read_timeouts = timeouts or (None, {})
+    outputs = {}
+    timer = OperationTimer()
+    status = "failed"
+    failure = None
+    connect_error = None
+    try:
+        with timer.phase("connect"):
+            try:
+                conn = await _connect(
+                    device, connect_timeout or options["CONNECT_TIMEOUT"]
+                )
+            except Exception as e:
+                connect_error = e
+                raise
+        async with conn:
+            for command in commands:
+                with timer.phase("command", command):
+                    result = await conn.run(
+                        command,
+                        check=False,
+                        timeout=read_timeouts.get(command)
+                        or options["COMMAND_TIMEOUT"],
+                    )
+                output = result.stdout or ""
+                timer.add_output(command, output)
+                if result.exit_status not in (0, None):
+                    outputs[command] = {
+                        "status": "failed",
+                        "output": output + (result.stderr or ""),
+                    }
+                    continue
+                outputs[command] = {
+                    "status": "success",
+                    "output": _format_output(
+                        output, device, command, use_textfsm, timer
+                    ),
+                }
+        if all(result["status"] == "success" for result in outputs.values()):
+            status = "success"
+    except asyncio.TimeoutError as e:
+        failure = e
+        error = "Timeout occurred. Check device connectivity."
+    except Exception as e:
+        failure = e
+        if asyncssh is not None and isinstance(e, asyncssh.PermissionDenied):
+            error = "Authentication failure. Check username and password."
+        else:
+            error = str(e) or e.__class__.__name__
+    record_device_operation(
+        "asyncio", device.device_type, status, timer.elapsed(), failure
+    )
+    for index, command in enumerate(commands):
+        if command not in outputs:
+            outputs[command] = {"status": "failed", "output": error}
+        outputs[command]["timings"] = timer.history_fields(
+            command, include_session=index == 0
+        )
+    return (device, outputs, status), connect_error
+
+
+def device_timeouts(device, commands):
+    """
+    Returns the device's learned or overridden ``(connect, {command: read})``
+    timeouts. Looked up before the loop starts, as they come from the database.
+    """
+    return (
+        connect_timeout(device.pk, device.connect_timeout),
+        {
+            command: read_timeout(device.pk, command, device.read_timeout)
+            for command in commands
+        },
+    )
+
+
+async def _run_all(
+    devices,
+    commands,
+    use_textfsm,
+    max_sessions,
+    emit,
+    timeouts,
+    retry=None,
+    controller=None,
+    job_limiter=None,
+):
+    semaphore = asyncio.Semaphore(max_sessions)
+
+    async def run_device(device):
+        async with controller.async_slot(
+            device.pk, device.device_type, device.site, job_limiter
+        ) as lease, semaphore:
+            if retry is not None and retry.expired():
+                skipped = {"status": "skipped", "output": str(DeadlineExceeded())}
+                outputs = {command: dict(skipped) for command in commands}
+                emit(((device, outputs, "skipped"), None))
+                return
+            result = await _execute_commands(
+                device, commands, use_textfsm, timeouts.get(device.pk)
+            )
+            if result[0][2] == "failed":
+                lease.mark_failed()
+            emit(result)
+
+    await asyncio.gather(*(run_device(device) for device in devices))
+
+
+def run_show_commands_async(
+    devices,
+    commands,
+    use_textfsm=True,
+    max_sessions=None,
+    retry=None,
+    concurrency=None,
+    controller=None,
+):
+    """
+    Executes show commands on devices from a single event loop.
+
+    Drop-in replacement for ``run_show_commands``: yields
+    ``(device, outputs, status)`` tuples as each device completes. The loop
+    runs on a helper thread so synchronous callers (views, job runners) can
+    consume and persist results while other sessions are still open.
+    Devices whose circuit breaker is open are reported as skipped first.
+    Devices still queued when the deadline of ``retry`` passes are skipped;
+    failed sessions are not retried by this backend.
+
+    Each session holds an ``async_slot()`` of ``controller`` (the process-wide
+    one by default), so a device is never opened by this backend and a
+    threaded run at once and the per-device-type, per-site and ``concurrency``
+    limits apply as in ``run_limited_concurrently``.
+    """
+    if asyncssh is None:
+        raise AsyncEngineUnavailable(
+            "The asyncio backend requires asyncssh "
+            "(pip install -r requirements-async.txt)."
+        )
+    circuits = {}
+    runnable = []
+    for device in devices:
+        try:
+            circuits[device.pk] = check_circuit(device.pk)
+        except CircuitOpen as e:
+            skipped = {"status": "skipped", "output": str(e)}
+            yield device, {command: dict(skipped) for command in commands}, "skipped"
+        else:
+            runnable.append(device)
+    devices = runnable
+    if not devices:
+        return
+    timeouts = {device.pk: device_timeouts(device, commands) for device in devices}
+    max_sessions = max_sessions or engine_options()["MAX_SESSIONS"]
+    controller = controller or get_concurrency_controller()
+    job_limiter = controller.job_limiter(concurrency)
+    results = queue.Queue()
+    outcome = {}
+
+    def run():
+        try:
+            asyncio.run(
+                _run_all(
+                    devices,
+                    commands,
+                    use_textfsm,
+                    max_sessions,
+                    results.put,
+                    timeouts,
+                    retry,
+                    controller,
+                    job_limiter,
+                )
+            )
+        except BaseException as e:
+            outcome["error"] = e
+        finally:
+            results.put(_DONE)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    while True:
+        item = results.get()
+        if item is _DONE:
+            break
+        result, connect_error = item
+        device, _, status = result
+        if status != "skipped":
+            record_connection(device.pk, circuits[device.pk], connect_error)
+        yield result
+    thread.join()
+    if "error" in outcome:
+        raise outcome["error"]
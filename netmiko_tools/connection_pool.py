@@ -0,0 +1,321 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+import netmiko
+from django.conf import settings
+
+from core.circuit import ConnectionAttempts
+from core.metrics import SESSIONS_OPENED
+from core.timeouts import connect_timeout
+from core.timing import phase
+
+logger = logging.getLogger(__name__)
+
+
+class PoolExhausted(Exception):
+    """
+    Raised when no session to a device becomes available before the acquire timeout.
+    """
+
+
+class PooledSession:
+    """
+    A live Netmiko connection together with its pool bookkeeping.
+    """
+
+    def __init__(self, key, connection):
+        self.key = key
+        self.connection = connection
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+def connection_params(device):
+    """
+    Returns the Netmiko ConnectHandler arguments for a network device.
+    """
+    return {
+        "device_type": device.device_type,
+        "ip": device.ip_address,
+        "username": device.username,
+        "password": device.password,
+        "port": device.port,
+        "secret": device.enable_password,
+    }
+
+
+def session_params(device):
+    """
+    Returns ``connection_params`` plus the device's connect timeout, learned
+    from past runs unless overridden (see ``core.timeouts``). Timeouts are not
+    part of the pool key, so a new estimate does not orphan pooled sessions.
+    """
+    params = connection_params(device)
+    conn_timeout = connect_timeout(device.pk, device.connect_timeout)
+    if conn_timeout is not None:
+        params["conn_timeout"] = conn_timeout
+    return params
+
+
+def open_connection(**params):
+    """
+    Opens a Netmiko session like ``ConnectHandler``, timing the SSH login and
+    the prompt detection as separate phases of the active operation timer.
+    """
+    connection = netmiko.ConnectHandler(auto_connect=False, **params)
+    # The same steps as BaseConnection._open(), split so each can be timed.
+    with phase("connect"):
+        connection._modify_connection_params()
+        connection.establish_connection()
+    with phase("prompt"):
+        connection._try_session_preparation()
+    SESSIONS_OPENED.labels("netmiko", params["device_type"]).inc()
+    return connection
+
+
+class ConnectionPool:
+    """
+    Process-wide pool of persistent Netmiko sessions keyed by device.
+
+    Sessions are keyed by the device id plus a hash of everything used to open
+    them, so editing a device's address or credentials never hands out a stale
+    session. Idle sessions are health-checked before reuse and closed once they
+    have been idle for longer than ``idle_timeout`` seconds.
+    """
+
+    def __init__(
+        self,
+        idle_timeout=300,
+        max_sessions_per_device=2,
+        acquire_timeout=30,
+        connect=open_connection,
+    ):
+        self.idle_timeout = idle_timeout
+        self.max_sessions_per_device = max_sessions_per_device
+        self.acquire_timeout = acquire_timeout
+        self._connect = connect
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._idle = defaultdict(list)
+        self._in_use = defaultdict(int)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key_for(device):
+        """
+        Returns the pool key for a device: its id and a hash of its credentials.
+        """
+        params = connection_params(device)
+        digest = hashlib.sha256(
+            "\0".join(str(params[name]) for name in sorted(params)).encode()
+        ).hexdigest()
+        return device.pk, digest
+
+    @contextmanager
+    def connection(self, device):
+        """
+        Lends a live session to the caller and returns it to the pool afterwards.
+
+        Any exception raised while the session is borrowed evicts it, since the
+        channel may be left in an unknown state.
+        """
+        session = self.acquire(device)
+        try:
+            yield session.connection
+        except BaseException:
+            self.discard(session)
+            raise
+        else:
+            self.release(session)
+
+    def acquire(self, device):
+        """
+        Returns a healthy session for the device, opening one on a pool miss.
+        """
+        key = self.key_for(device)
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            session = self._reserve(key, device, deadline)
+            if session is None:
+                break
+            # Health checks talk to the device, so they run outside the pool lock.
+            if self._is_healthy(session):
+                with self._lock:
+                    self.hits += 1
+                session.last_used = time.monotonic()
+                return session
+            self.discard(session)
+
+        try:
+            connection = self._connect(**session_params(device))
+        except BaseException:
+            with self._available:
+                self._in_use[key] -= 1
+                self._available.notify()
+            raise
+        return PooledSession(key, connection)
+
+    def _reserve(self, key, device, deadline):
+        """
+        Claims an idle session for the key, or a slot to open a new one (None).
+        """
+        with self._available:
+            self._reap_idle()
+            while True:
+                if self._idle[key]:
+                    self._in_use[key] += 1
+                    return self._idle[key].pop()
+                if self._in_use[key] < self.max_sessions_per_device:
+                    self._in_use[key] += 1
+                    self.misses += 1
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolExhausted(
+                        f"No session to {device.name} became available within "
+                        f"{self.acquire_timeout}s."
+                    )
+                self._available.wait(remaining)
+
+    def release(self, session):
+        """
+        Returns a borrowed session to the idle list.
+        """
+        session.last_used = time.monotonic()
+        with self._available:
+            self._in_use[session.key] -= 1
+            self._idle[session.key].append(session)
+            self._available.notify()
+
+    def discard(self, session):
+        """
+        Closes a borrowed session instead of returning it to the pool.
+        """
+        with self._available:
+            self._in_use[session.key] -= 1
+            self._close(session)
+            self._available.notify()
+
+    def evict_device(self, device):
+        """
+        Closes every idle session for a device; called when the device is saved
+        or deleted (see ``signals``).
+        """
+        with self._available:
+            for key in [key for key in self._idle if key[0] == device.pk]:
+                for session in self._idle.pop(key):
+                    self._close(session)
+
+    def close_all(self):
+        """
+        Closes every idle session in the pool.
+        """
+        with self._available:
+            for sessions in self._idle.values():
+                for session in sessions:
+                    self._close(session)
+            self._idle.clear()
+
+    def stats(self):
+        """
+        Returns pool counters and current session counts.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "idle_sessions": sum(len(s) for s in self._idle.values()),
+                "in_use_sessions": sum(self._in_use.values()),
+            }
+
+    def _is_healthy(self, session):
+        try:
+            return session.connection.is_alive()
+        except Exception:
+            return False
+
+    def _reap_idle(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        for key in list(self._idle):
+            fresh = []
+            for session in self._idle[key]:
+                if session.last_used < cutoff:
+                    self._close(session)
+                else:
+                    fresh.append(session)
+            if fresh:
+                self._idle[key] = fresh
+            else:
+                del self._idle[key]
+
+    def _close(self, session):
+        # Callers hold the pool lock; disconnect errors are irrelevant here.
+        self.evictions += 1
+        try:
+            session.connection.disconnect()
+        except Exception as e:
+            logger.debug("Error closing pooled session %s: %s", session.key, e)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_connection_pool():
+    """
+    Returns the process-wide connection pool, creating it from settings on first use.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                options = getattr(settings, "NETMIKO_CONNECTION_POOL", {})
+                _pool = ConnectionPool(
+                    idle_timeout=options.get("IDLE_TIMEOUT", 300),
+                    max_sessions_per_device=options.get("MAX_SESSIONS_PER_DEVICE", 2),
+                    acquire_timeout=options.get("ACQUIRE_TIMEOUT", 30),
+                )
+    return _pool
+
+
+@contextmanager
+def device_connection(device, attempts=None):
+    """
+    Yields a Netmiko connection to the device, pooled unless disabled in settings.
+
+    Raises ``CircuitOpen`` without connecting while the device's circuit
+    breaker is open; connection failures count towards opening it (see
+    ``core.circuit``). Callers retrying the connection pass one
+    ``ConnectionAttempts`` for the whole operation and call its ``finish()``,
+    so the retries count as a single failure.
+    """
+    owned = attempts is None
+    if owned:
+        attempts = ConnectionAttempts(device.pk)
+    options = getattr(settings, "NETMIKO_CONNECTION_POOL", {})
+    connected = False
+    try:
+        if options.get("ENABLED", True):
+            context = get_connection_pool().connection(device)
+        else:
+            context = open_connection(**session_params(device))
+        with context as net_connect:
+            connected = True
+            attempts.succeeded()
+            yield net_connect
+    except Exception as e:
+        if not connected and not isinstance(e, PoolExhausted):
+            attempts.failed(e)
+        raise
+    finally:
+        if owned:
+            attempts.finish()
@@ -3,6 +3,7 @@ from django.forms import RadioSelect, Textarea
 
 from core.models import DeviceGroup
 
+from .async_engine import async_engine_available
 from .models import NetworkDevice
 
 
@@ -38,6 +39,12 @@ class NetmikoCommandForm(forms.Form):
     command = forms.CharField(
         label="Command", max_length=200, required=False
     )  # Make command not required
+    show_commands = forms.CharField(
+        label="Additional Commands",
+        widget=Textarea(attrs={"rows": 3, "cols": 40}),
+        required=False,
+        help_text="One show command per line, run over the same session",
+    )
     preset_command = forms.ChoiceField(
         label="Preset Command",
         choices=[
@@ -61,3 +68,45 @@ class NetmikoCommandForm(forms.Form):
         required=False,
     )
     use_textfsm = forms.BooleanField(label="Use TextFSM", required=False, initial=True)
+    force_refresh = forms.BooleanField(
+        label="Force Refresh",
+        required=False,
+        help_text="Run show commands on the devices even if a recent result is cached",
+    )
+    run_in_background = forms.BooleanField(
+        label="Run in Background",
+        required=False,
+        help_text="Queue the run as a job and follow its progress on the job page",
+    )
+    deadline = forms.IntegerField(
+        label="Job Deadline (seconds)",
+        required=False,
+        min_value=1,
+        help_text="Skip devices a background job has not started within this time",
+    )
+    backend = forms.ChoiceField(
+        label="Execution Backend",
+        choices=[
+            ("threaded", "Threaded (Netmiko)"),
+            ("asyncio", "Asyncio (asyncssh, show commands only)"),
+        ],
+        initial="threaded",
+        required=False,
+        help_text="Asyncio drives every session from one event loop for large runs",
+    )
+
+    def clean_backend(self):
+        return self.cleaned_data.get("backend") or "threaded"
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get("backend") == "asyncio":
+            if cleaned_data.get("execution_type") != "show_cmd":
+                self.add_error(
+                    "backend", "The asyncio backend only runs show commands."
+                )
+            elif not async_engine_available():
+                self.add_error(
+                    "backend", "The asyncio backend requires asyncssh to be installed."
+                )
+        return cleaned_data
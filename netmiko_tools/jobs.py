@@ -0,0 +1,59 @@
+from core.history import HistoryWriter
+from core.jobs import register_runner
+from core.retry import job_retry_policy
+
+from .models import CommandHistory
+from .views import add_show_history, run_config_commands, run_show_commands
+
+
+@register_runner("netmiko", "show")
+def run_show_job(job, record_result):
+    """
+    Runs a queued Netmiko show commands job, one session per device.
+    """
+    use_textfsm = job.options.get("use_textfsm", True)
+    retry = job_retry_policy(job)
+    with HistoryWriter(CommandHistory) as history:
+        for device, outputs, status in run_show_commands(
+            job.devices.all(),
+            job.commands,
+            use_textfsm,
+            concurrency=job.options.get("concurrency"),
+            backend=job.options.get("backend", "threaded"),
+            force_refresh=job.options.get("force_refresh", False),
+            retry=retry,
+        ):
+            add_show_history(history, device, outputs)
+            for command, result in outputs.items():
+                record_result(
+                    device,
+                    command,
+                    result["status"],
+                    result["output"],
+                    cached=result.get("cached", False),
+                )
+
+
+@register_runner("netmiko", "config")
+def run_config_job(job, record_result):
+    """
+    Runs a queued Netmiko configuration job.
+    """
+    command = "\n".join(job.commands)
+    retry = job_retry_policy(job)
+    with HistoryWriter(CommandHistory) as history:
+        for device, output, status, timings in run_config_commands(
+            job.devices.all(),
+            job.commands,
+            concurrency=job.options.get("concurrency"),
+            retry=retry,
+        ):
+            history.add(
+                device=device,
+                command=command,
+                command_type="config",
+                output=output,
+                status=status,
+                **timings,
+            )
+            record_result(device, command, status, output)
@@ -0,0 +1,122 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.concurrency import ConcurrencyController, concurrency_options
+from core.models import NetworkDevice
+from core.simulator import FakeDeviceServer
+from netmiko_tools import views
+from netmiko_tools.async_engine import async_engine_available, engine_options
+from netmiko_tools.connection_pool import get_connection_pool
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the threaded and asyncio show-command backends against a local "
+        "simulated SSH device."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--devices", type=int, default=100)
+        parser.add_argument(
+            "--commands",
+            nargs="+",
+            default=["show version"],
+            help="Show commands sent to every simulated device.",
+        )
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.05,
+            help="Seconds the simulator waits before answering each command.",
+        )
+        parser.add_argument("--output-size", type=int, default=2048)
+        parser.add_argument("--failure-rate", type=float, default=0.0)
+        parser.add_argument(
+            "--backends",
+            nargs="+",
+            choices=["threaded", "asyncio"],
+            default=["threaded", "asyncio"],
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            help="Fixed session limit for both backends instead of the settings.",
+        )
+        parser.add_argument("--json", help="Also write the results to this file.")
+
+    def handle(self, *args, **options):
+        if options["devices"] < 1:
+            raise CommandError("--devices must be at least 1.")
+
+        results = []
+        with FakeDeviceServer(
+            latency=options["latency"],
+            output_size=options["output_size"],
+            failure_rate=options["failure_rate"],
+        ) as server:
+            # Unsaved devices: the benchmark never touches the device table.
+            devices = [
+                NetworkDevice(
+                    pk=index,
+                    name=f"sim-{index}",
+                    ip_address="127.0.0.1",
+                    port=server.port,
+                    device_type="cisco_ios",
+                    username=server.username,
+                    password=server.password,
+                )
+                for index in range(1, options["devices"] + 1)
+            ]
+            for backend in options["backends"]:
+                if backend == "asyncio" and not async_engine_available():
+                    self.stderr.write("Skipping asyncio: asyncssh is not installed.")
+                    continue
+                results.append(self.run_backend(backend, devices, options))
+
+        for result in results:
+            self.stdout.write(
+                "{backend:>8}: {devices} devices in {elapsed:.2f}s "
+                "({devices_per_second:.1f} devices/s, {failed} failed)".format(
+                    **result
+                )
+            )
+        if options["json"]:
+            with open(options["json"], "w") as f:
+                json.dump(results, f, indent=2)
+
+    def run_backend(self, backend, devices, options):
+        started = time.perf_counter()
+        if backend == "threaded":
+            overrides = {}
+            if options["concurrency"]:
+                overrides = {"GLOBAL_LIMIT": options["concurrency"], "ADAPTIVE": False}
+            # A private controller keeps earlier runs from skewing the limit.
+            run = views.run_show_commands(
+                devices,
+                options["commands"],
+                False,
+                controller=ConcurrencyController(concurrency_options(overrides)),
+            )
+        else:
+            run = views.run_show_commands_async(
+                devices,
+                options["commands"],
+                False,
+                max_sessions=options["concurrency"] or engine_options()["MAX_SESSIONS"],
+                controller=ConcurrencyController(concurrency_options()),
+            )
+        failed = sum(1 for _, _, status in run if status != "success")
+        elapsed = time.perf_counter() - started
+        get_connection_pool().close_all()
+
+        return {
+            "backend": backend,
+            "devices": len(devices),
+            "commands": len(options["commands"]),
+            "latency": options["latency"],
+            "elapsed": round(elapsed, 3),
+            "devices_per_second": round(len(devices) / elapsed, 2),
+            "failed": failed,
+        }
@@ -0,0 +1,49 @@
+from django.db import migrations
+
+import core.fields
+
+BATCH_SIZE = 500
+
+
+def copy_output(source, target):
+    def copy(apps, schema_editor):
+        History = apps.get_model("netmiko_tools", "CommandHistory")
+        batch = []
+        for row in History.objects.only("pk", source).iterator(chunk_size=BATCH_SIZE):
+            setattr(row, target, getattr(row, source))
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                History.objects.bulk_update(batch, [target])
+                batch = []
+        if batch:
+            History.objects.bulk_update(batch, [target])
+
+    return copy
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("netmiko_tools", "0002_history_phase_timings"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="commandhistory",
+            name="output_compressed",
+            field=core.fields.CompressedTextField(blank=True),
+        ),
+        migrations.RunPython(
+            copy_output("output", "output_compressed"),
+            copy_output("output_compressed", "output"),
+        ),
+        migrations.RemoveField(
+            model_name="commandhistory",
+            name="output",
+        ),
+        migrations.RenameField(
+            model_name="commandhistory",
+            old_name="output_compressed",
+            new_name="output",
+        ),
+    ]
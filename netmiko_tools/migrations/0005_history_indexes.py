@@ -0,0 +1,22 @@
+# Generated by Django 5.2 on 2026-10-17 08:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_config_archive'),
+        ('netmiko_tools', '0004_history_output_blobs'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='commandhistory',
+            index=models.Index(fields=['device', 'executed_at'], name='netmiko_hist_device_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='commandhistory',
+            index=models.Index(fields=['status', 'executed_at'], name='netmiko_hist_status_time_idx'),
+        ),
+    ]
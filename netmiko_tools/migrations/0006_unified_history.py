@@ -0,0 +1,67 @@
+from django.db import migrations
+
+BATCH_SIZE = 500
+ENGINE = "netmiko"
+
+
+def _copy_rows(rows, target, fields, **extra):
+    batch = []
+    for row in rows.order_by("executed_at", "pk").iterator(chunk_size=BATCH_SIZE):
+        batch.append(target(**{name: getattr(row, name) for name in fields}, **extra))
+        if len(batch) >= BATCH_SIZE:
+            target.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        target.objects.bulk_create(batch)
+
+
+def _history_fields(model):
+    return [
+        field.attname for field in model._meta.concrete_fields if not field.primary_key
+    ]
+
+
+def move_to_unified_history(apps, schema_editor):
+    History = apps.get_model("netmiko_tools", "CommandHistory")
+    HistoryRecord = apps.get_model("core", "HistoryRecord")
+    # Blob references move with the rows, so refcounts stay as they are.
+    _copy_rows(
+        History.objects.all(),
+        HistoryRecord,
+        _history_fields(History),
+        engine=ENGINE,
+    )
+
+
+def move_from_unified_history(apps, schema_editor):
+    History = apps.get_model("netmiko_tools", "CommandHistory")
+    HistoryRecord = apps.get_model("core", "HistoryRecord")
+    rows = HistoryRecord.objects.filter(engine=ENGINE)
+    _copy_rows(rows, History, _history_fields(History))
+    rows.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0008_historyrecord"),
+        ("netmiko_tools", "0005_history_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(move_to_unified_history, move_from_unified_history),
+        migrations.DeleteModel(
+            name="CommandHistory",
+        ),
+        migrations.CreateModel(
+            name="CommandHistory",
+            fields=[],
+            options={
+                "verbose_name_plural": "Command histories",
+                "proxy": True,
+                "indexes": [],
+                "constraints": [],
+            },
+            bases=("core.historyrecord",),
+        ),
+    ]
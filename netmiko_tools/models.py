@@ -1,28 +1,21 @@
-from django.db import models
-from django.utils import timezone
+from core.models import (  # noqa: F401  NetworkDevice is imported from here
+    EngineHistoryManager,
+    HistoryRecord,
+    NetworkDevice,
+)
 
-from core.models import NetworkDevice  # Import NetworkDevice from core app
 
-
-class CommandHistory(models.Model):
+class CommandHistory(HistoryRecord):
     """
     Model representing a command execution history.
+
+    Netmiko rows of the unified ``core.HistoryRecord`` table.
     """
 
-    device = models.ForeignKey(
-        NetworkDevice, on_delete=models.CASCADE, related_name="command_history"
-    )
-    command = models.TextField()
-    output = models.TextField(blank=True)
-    status = models.CharField(max_length=20, default="success")
-    executed_at = models.DateTimeField(default=timezone.now)
+    ENGINE = "netmiko"
 
-    def __str__(self):
-        """
-        Returns a string representation of the command history.
-        """
-        return f"{self.device.name} - {self.command[:50]}"
+    objects = EngineHistoryManager()
 
     class Meta:
-        ordering = ["-executed_at"]
+        proxy = True
         verbose_name_plural = "Command histories"
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import NetworkDevice
+
+from .connection_pool import get_connection_pool
+
+
+@receiver(post_save, sender=NetworkDevice)
+@receiver(post_delete, sender=NetworkDevice)
+def evict_device_sessions(sender, instance, **kwargs):
+    """Close the idle pooled sessions of an edited or deleted device."""
+    get_connection_pool().evict_device(instance)
@@ -1,3 +1,93 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
+
+from core.tests import make_device
+
+from .connection_pool import ConnectionPool, PoolExhausted
+
+
+class FakeConnection:
+    def __init__(self, **params):
+        self.params = params
+        self.alive = True
+        self.disconnected = False
+
+    def is_alive(self):
+        return self.alive
+
+    def disconnect(self):
+        self.disconnected = True
+
+
+class ConnectionPoolTests(TestCase):
+    def setUp(self):
+        self.device = make_device()
+        self.pool = ConnectionPool(
+            max_sessions_per_device=1, acquire_timeout=0.05, connect=FakeConnection
+        )
+
+    def borrow(self):
+        with self.pool.connection(self.device) as connection:
+            return connection
+
+    def test_sessions_are_reused(self):
+        first = self.borrow()
+        self.assertIs(self.borrow(), first)
+        stats = self.pool.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual(stats["idle_sessions"], 1)
+
+    def test_dead_sessions_are_replaced(self):
+        first = self.borrow()
+        first.alive = False
+        second = self.borrow()
+        self.assertIsNot(second, first)
+        self.assertTrue(first.disconnected)
+
+    def test_errors_discard_the_session(self):
+        with self.assertRaises(OSError):
+            with self.pool.connection(self.device) as connection:
+                raise OSError("socket closed")
+        self.assertTrue(connection.disconnected)
+        self.assertEqual(self.pool.stats()["idle_sessions"], 0)
+        self.assertEqual(self.pool.stats()["in_use_sessions"], 0)
+
+    def test_per_device_limit(self):
+        with self.pool.connection(self.device):
+            with self.assertRaises(PoolExhausted):
+                self.pool.acquire(self.device)
+
+    def test_new_credentials_open_a_new_session(self):
+        first = self.borrow()
+        self.device.password = "rotated"
+        second = self.borrow()
+        self.assertIsNot(second, first)
+        self.assertEqual(second.params["password"], "rotated")
+
+    def test_saving_or_deleting_a_device_closes_its_idle_sessions(self):
+        other = make_device("r2")
+        with mock.patch("netmiko_tools.connection_pool._pool", self.pool):
+            first = self.borrow()
+            with self.pool.connection(other) as untouched:
+                pass
+            self.device.description = "moved to rack 4"
+            self.device.save()
+            self.assertTrue(first.disconnected)
+            self.assertFalse(untouched.disconnected)
+
+            second = self.borrow()
+            self.device.delete()
+            self.assertTrue(second.disconnected)
+
 
-# Create your tests here.
+class PoolStatsViewTests(TestCase):
+    def test_login_required(self):
+        url = reverse("netmiko_tools:pool_stats")
+        self.assertEqual(self.client.get(url, secure=True).status_code, 302)
+        self.client.force_login(get_user_model().objects.create_user("operator"))
+        response = self.client.get(url, secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("hits", response.json())
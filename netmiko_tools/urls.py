@@ -6,8 +6,10 @@ app_name = "netmiko_tools"
 
 urlpatterns = [
     path("", views.home, name="home"),
+    path("stream/", views.stream, name="stream"),
     path("devices/", views.devices, name="devices"),
     path(
         "devices/<int:device_id>/history/", views.device_history, name="device_history"
     ),
+    path("pool/stats/", views.pool_stats, name="pool_stats"),
 ]
@@ -1,12 +1,32 @@
 import io
+import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
 from pprint import pprint
 
-import netmiko
 from django.contrib import messages
-from django.shortcuts import get_object_or_404, render
+from django.contrib.auth.decorators import login_required
+from django.db import connection
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import require_POST
 from netmiko.exceptions import NetmikoAuthenticationException, NetmikoTimeoutException
+from netmiko.utilities import get_structured_data
 
+from core.circuit import CircuitOpen, ConnectionAttempts
+from core.concurrency import get_concurrency_controller
+from core.history import HistoryWriter
+from core.jobs import submit_job
+from core.metrics import record_device_operation
+from core.pagination import history_page
+from core.result_cache import get_result_cache, invalidate_device
+from core.retry import DeadlineExceeded, RetryPolicy
+from core.streaming import device_result_event, event_stream_response, sse_event
+from core.timeouts import read_timeout
+from core.timing import OperationTimer
+
+from .async_engine import run_show_commands_async
+from .connection_pool import device_connection, get_connection_pool
 from .forms import NetmikoCommandForm  # Corrected import
 from .models import CommandHistory, NetworkDevice
 
@@ -51,71 +71,451 @@ def prepare_execution_details(cleaned_data):
         command_to_execute = command or preset_command
         return command_to_execute, execution_type, use_textfsm, config_commands_raw
     elif execution_type == "config_cmd":
-        return config_commands_raw, execution_type, use_textfsm, command
+        return command, execution_type, use_textfsm, config_commands_raw
     else:
         return None, None, None, None
 
 
-def execute_command_on_device(device, command, use_textfsm=True):
+def job_deadline(cleaned_data):
+    """
+    Returns the job options holding the form's deadline, if one was given.
+    """
+    if cleaned_data.get("deadline"):
+        return {"deadline": cleaned_data["deadline"]}
+    return {}
+
+
+def collect_show_commands(command, show_commands_raw=""):
+    """
+    Returns the show commands to run: the single/preset command followed by any
+    additional commands (one per line), without blanks or duplicates.
+    """
+    commands = [command or ""] + (show_commands_raw or "").splitlines()
+    return list(dict.fromkeys(cmd.strip() for cmd in commands if cmd.strip()))
+
+
+def format_command_output(output, use_textfsm):
+    """
+    Renders TextFSM structured output as text; raw output is returned unchanged.
+    """
+    if use_textfsm:
+        with io.StringIO() as buf:
+            pprint(output, buf)
+            return buf.getvalue()
+    return output
+
+
+def execute_command_on_device(device, command, use_textfsm=True, retry=None):
     """
     Executes a single command on a network device using Netmiko.
     """
+    device, outputs, status = execute_commands_on_device(
+        device, [command], use_textfsm, retry
+    )
+    return device, outputs[command]["output"], status
+
+
+def send_show_command(net_connect, device, command, use_textfsm, timer):
+    """
+    Sends one show command, timing the exchange and the TextFSM parsing apart.
+
+    The read timeout is learned from the command's past runs on the device
+    unless the device overrides it (see ``core.timeouts``).
+    """
+    kwargs = {}
+    seconds = read_timeout(device.pk, command, device.read_timeout)
+    if seconds is not None:
+        kwargs["read_timeout"] = seconds
+    with timer.phase("command", command):
+        output = net_connect.send_command(command, **kwargs)
+    timer.add_output(command, output)
+    if use_textfsm:
+        with timer.phase("parse", command):
+            output = get_structured_data(
+                output, platform=device.device_type, command=command
+            )
+    return format_command_output(output, use_textfsm)
+
+
+def execute_commands_on_device(device, commands, use_textfsm=True, retry=None):
+    """
+    Executes several show commands sequentially over one session to a device.
+
+    Returns ``(device, outputs, status)`` where ``outputs`` maps each command to
+    a ``{"status": ..., "output": ..., "timings": ...}`` dict; ``timings`` holds
+    the ``OperationTimings`` values for its history row. Commands not reached
+    because the session failed are reported with the session error.
+
+    Transient failures open a new session for the commands not completed yet,
+    as ``retry`` (a ``core.retry.RetryPolicy``, the settings by default)
+    allows. Commands not started before its deadline are reported as skipped.
+    """
+    retry = retry or RetryPolicy()
+    outputs = {}
+    timer = OperationTimer()
+    failure = None
+    attempt = 1
     try:
-        with netmiko.ConnectHandler(
-            device_type=device.device_type,
-            ip=device.ip_address,
-            username=device.username,
-            password=device.password,
-            port=device.port,
-            secret=device.enable_password,
-        ) as net_connect:
-            output = net_connect.send_command(command, use_textfsm=use_textfsm)
-            if use_textfsm:
-                with io.StringIO() as buf:
-                    pprint(output, buf)
-                    output = buf.getvalue()
-            status = "success"
-            return device, output, status
-    except NetmikoTimeoutException:
-        return device, "Timeout occurred. Check device connectivity.", "failed"
-    except NetmikoAuthenticationException:
-        return device, "Authentication failure. Check username and password.", "failed"
+        retry.check_deadline()
+        # Checked once per device, so retries count as one circuit failure.
+        attempts = ConnectionAttempts(device.pk)
+        try:
+            while True:
+                try:
+                    retry.check_deadline()
+                    with timer, device_connection(device, attempts) as net_connect:
+                        for command in commands:
+                            if command in outputs:
+                                continue
+                            retry.check_deadline()
+                            outputs[command] = {
+                                "status": "success",
+                                "output": send_show_command(
+                                    net_connect, device, command, use_textfsm, timer
+                                ),
+                            }
+                    break
+                except Exception as e:
+                    if not retry.backoff(attempt, e):
+                        raise
+                    attempt += 1
+        finally:
+            attempts.finish()
+        status = "success"
+    except (CircuitOpen, DeadlineExceeded) as e:
+        error = str(e)
+        status = "skipped"
+    except NetmikoTimeoutException as e:
+        failure = e
+        error = "Timeout occurred. Check device connectivity."
+        status = "failed"
+    except NetmikoAuthenticationException as e:
+        failure = e
+        error = "Authentication failure. Check username and password."
+        status = "failed"
     except Exception as e:
-        # Log the exception if logging is configured
-        # logger.error(f"Error executing command on {device.name}: {e}")
-        return device, str(e), "failed"
+        failure = e
+        error = str(e)
+        status = "failed"
+    if status != "skipped":
+        record_device_operation(
+            "netmiko", device.device_type, status, timer.elapsed(), failure
+        )
+    for index, command in enumerate(commands):
+        if command not in outputs:
+            outputs[command] = {"status": status, "output": error}
+        outputs[command]["timings"] = timer.history_fields(
+            command, include_session=index == 0
+        )
+    return device, outputs, status
 
 
-def execute_config_commands_on_device(device, config_commands):
+def add_show_history(history, device, outputs):
+    """
+    Queues one history row per show command of a device's result.
+
+    Results served from the cache or shared from another run's execution are
+    left out: the run that executed the command recorded them.
+    """
+    for command, result in outputs.items():
+        if result.get("cached"):
+            continue
+        history.add(
+            device=device,
+            command=command,
+            output=result["output"],
+            status=result["status"],
+            **result.get("timings", {}),
+        )
+
+
+def combine_command_outputs(outputs):
+    """
+    Joins a per-command result map into one text block for display.
+    """
+    if len(outputs) == 1:
+        return next(iter(outputs.values()))["output"]
+    return "\n".join(
+        f"### {command}\n{result['output']}" for command, result in outputs.items()
+    )
+
+
+def execute_config_commands_on_device(device, config_commands, retry=None):
     """
     Executes configuration commands on a network device using Netmiko.
+
+    Returns ``(device, output, status, timings)``; ``timings`` holds the
+    ``OperationTimings`` values for the history row.
+
+    Only failures to open the session are retried (see ``retry``); once
+    commands were sent, sending them again could apply them twice.
     """
+    retry = retry or RetryPolicy()
+    timer = OperationTimer()
+    failure = None
+    attempt = 1
     try:
-        with netmiko.ConnectHandler(
-            device_type=device.device_type,
-            ip=device.ip_address,
-            username=device.username,
-            password=device.password,
-            port=device.port,
-            secret=device.enable_password,
-        ) as net_connect:
-            net_connect.enable()
-            output = net_connect.send_config_set(config_commands)
-            output += net_connect.save_config()
-            status = "success"
-            return device, output, status
+        retry.check_deadline()
+        attempts = ConnectionAttempts(device.pk)
+        try:
+            while True:
+                connected = False
+                try:
+                    retry.check_deadline()
+                    with timer, device_connection(device, attempts) as net_connect:
+                        connected = True
+                        with timer.phase("command"):
+                            net_connect.enable()
+                            output = net_connect.send_config_set(config_commands)
+                            output += net_connect.save_config()
+                        timer.add_output(None, output)
+                    break
+                except Exception as e:
+                    if connected or not retry.backoff(attempt, e):
+                        raise
+                    attempt += 1
+        finally:
+            attempts.finish()
+        status = "success"
+    except (CircuitOpen, DeadlineExceeded) as e:
+        return device, str(e), "skipped", {}
+    except NetmikoTimeoutException as e:
+        failure = e
+        output = "Timeout occurred. Check device connectivity."
+        status = "failed"
+    except NetmikoAuthenticationException as e:
+        failure = e
+        output = "Authentication failure. Check username and password."
+        status = "failed"
     except Exception as e:
         # Log the exception if logging is configured
         # logger.error(f"Error executing config commands on {device.name}: {e}")
-        return device, str(e), "failed"
-    except NetmikoTimeoutException:
-        return device, "Timeout occurred. Check device connectivity.", "failed"
-    except NetmikoAuthenticationException:
-        return device, "Authentication failure. Check username and password.", "failed"
-    except Exception as e:
-        # Log the exception if logging is configured
-        # logger.error(f"Error executing config commands on {device.name}: {e}")
-        return device, str(e), "failed"
+        failure = e
+        output = str(e)
+        status = "failed"
+    record_device_operation(
+        "netmiko", device.device_type, status, timer.elapsed(), failure
+    )
+    # Even a failed push may have changed part of the configuration.
+    invalidate_device(device.pk)
+    return device, output, status, timer.history_fields()
+
+
+def run_limited(controller, job_limiter, func, device, *args):
+    """
+    Runs ``func(device, *args)`` inside a concurrency slot for the device.
+
+    ``func`` returns a ``(device, output, status, ...)`` tuple; a "failed"
+    status counts as a failure for the adaptive limit, a "skipped" one (open
+    circuit, nothing was sent) does not. Runs on a pool thread, whose database
+    connection is closed afterwards.
+    """
+    try:
+        with controller.slot(
+            device.pk, device.device_type, device.site, job_limiter
+        ) as lease:
+            result = func(device, *args)
+            if result[2] == "failed":
+                lease.mark_failed()
+            return result
+    finally:
+        connection.close()
+
+
+def run_limited_concurrently(devices, func, *args, concurrency=None, controller=None):
+    """
+    Runs ``func`` on every device under the concurrency controller.
+
+    ``concurrency`` optionally tightens the limits for this run, using the
+    same keys as ``settings.COMMAND_CONCURRENCY``. ``controller`` defaults to
+    the process-wide one. Yields each result as its device completes.
+    """
+    devices = list(devices)
+    if not devices:
+        return
+    controller = controller or get_concurrency_controller()
+    job_limiter = controller.job_limiter(concurrency)
+    max_workers = controller.max_workers(job_limiter, len(devices))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(run_limited, controller, job_limiter, func, device, *args)
+            for device in devices
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def execute_commands_to_run(device, lookups, use_textfsm=True, retry=None):
+    """
+    Runs the commands a device's cache lookup left to this caller.
+    """
+    return execute_commands_on_device(
+        device, lookups[device.pk].commands_to_run, use_textfsm, retry
+    )
+
+
+def run_show_commands_async_grouped(
+    devices, lookups, use_textfsm=True, retry=None, concurrency=None, controller=None
+):
+    """
+    Runs each device's remaining commands with the asyncio backend, one loop
+    per distinct command list.
+    """
+    groups = {}
+    for device in devices:
+        groups.setdefault(tuple(lookups[device.pk].commands_to_run), []).append(device)
+    for commands, group in groups.items():
+        yield from run_show_commands_async(
+            group,
+            list(commands),
+            use_textfsm,
+            retry=retry,
+            concurrency=concurrency,
+            controller=controller,
+        )
+
+
+def run_cached_show_commands(
+    devices, commands, use_textfsm, execute, force_refresh=False, cache=None
+):
+    """
+    Serves show commands from the result cache, running only what it lacks.
+
+    ``execute(devices, lookups)`` runs the remaining commands of ``devices``
+    and yields ``(device, outputs, status)`` tuples. Devices answered entirely
+    from the cache come first; devices waiting on another caller's run come
+    last, once every command this run claimed is resolved, so two overlapping
+    runs never wait on each other. A shared run that does not complete within
+    the command's wait timeout (see ``ResultCache.wait_timeout``) is run again
+    here. Commands served from the cache are marked ``"cached": True``.
+    """
+    cache = cache or get_result_cache()
+    lookups = {}
+
+    def result(device):
+        outputs = lookups[device.pk].outputs(commands)
+        statuses = {output["status"] for output in outputs.values()}
+        status = "success"
+        if "failed" in statuses:
+            status = "failed"
+        elif "skipped" in statuses:
+            status = "skipped"
+        return device, outputs, status
+
+    try:
+        for device in devices:
+            lookups[device.pk] = cache.lookup(
+                device.pk, commands, use_textfsm, force_refresh
+            )
+        to_run = [device for device in devices if lookups[device.pk].commands_to_run]
+        waiting = []
+        for device in devices:
+            if lookups[device.pk].commands_to_run:
+                continue
+            if lookups[device.pk].pending:
+                waiting.append(device)
+            else:
+                yield result(device)
+        if to_run:
+            for device, outputs, status in execute(to_run, lookups):
+                lookups[device.pk].resolve(outputs)
+                if lookups[device.pk].pending:
+                    # Waiting while holding unresolved claims could deadlock
+                    # with a run that waits on them in turn.
+                    waiting.append(device)
+                else:
+                    yield result(device)
+        started = time.monotonic()
+        late = []
+        for device in waiting:
+            timeout = partial(cache.wait_timeout, device)
+            if lookups[device.pk].wait(timeout, started):
+                late.append(device)
+            else:
+                yield result(device)
+        if late:
+            for device, outputs, status in execute(late, lookups):
+                lookups[device.pk].resolve(outputs)
+                yield result(device)
+    finally:
+        for lookup in lookups.values():
+            lookup.abandon()
+
+
+def run_show_commands(
+    devices,
+    commands,
+    use_textfsm=True,
+    concurrency=None,
+    backend="threaded",
+    controller=None,
+    force_refresh=False,
+    retry=None,
+):
+    """
+    Executes a list of show commands on devices concurrently, one session each.
+
+    Yields ``(device, outputs, status)`` tuples as each device completes; see
+    ``execute_commands_on_device``. ``backend="asyncio"`` runs every session
+    from one event loop instead of a thread each (see ``async_engine``).
+    Recent results come from the show command cache (``core.result_cache``)
+    unless ``force_refresh`` is set. ``retry`` is the ``core.retry.RetryPolicy``
+    of the run, e.g. one with a job's deadline.
+    """
+    cache = get_result_cache()
+    if not cache.enabled:
+        if backend == "asyncio":
+            return run_show_commands_async(
+                devices,
+                commands,
+                use_textfsm,
+                retry=retry,
+                concurrency=concurrency,
+                controller=controller,
+            )
+        return run_limited_concurrently(
+            devices,
+            execute_commands_on_device,
+            commands,
+            use_textfsm,
+            retry,
+            concurrency=concurrency,
+            controller=controller,
+        )
+
+    def execute(devices, lookups):
+        if backend == "asyncio":
+            return run_show_commands_async_grouped(
+                devices, lookups, use_textfsm, retry, concurrency, controller
+            )
+        return run_limited_concurrently(
+            devices,
+            execute_commands_to_run,
+            lookups,
+            use_textfsm,
+            retry,
+            concurrency=concurrency,
+            controller=controller,
+        )
+
+    return run_cached_show_commands(
+        list(devices), commands, use_textfsm, execute, force_refresh, cache
+    )
+
+
+def run_config_commands(devices, config_commands, concurrency=None, retry=None):
+    """
+    Executes configuration commands on devices concurrently.
+
+    Yields ``(device, output, status, timings)`` tuples as each device completes.
+    """
+    return run_limited_concurrently(
+        devices,
+        execute_config_commands_on_device,
+        config_commands,
+        retry,
+        concurrency=concurrency,
+    )
 
 
 def home(request):
@@ -153,55 +553,75 @@ def home(request):
                     ) = prepare_execution_details(cleaned_data)
 
                     if execution_type == "show_cmd":
-                        if not command_to_execute:
+                        show_commands = collect_show_commands(
+                            command_to_execute, cleaned_data.get("show_commands")
+                        )
+                        if not show_commands:
                             messages.error(
                                 request,
                                 "Please enter a command or select a preset command for Show Commands mode.",
                             )
+                        elif cleaned_data.get("run_in_background"):
+                            job = submit_job(
+                                "netmiko",
+                                "show",
+                                devices,
+                                show_commands,
+                                {
+                                    "use_textfsm": use_textfsm,
+                                    "backend": cleaned_data["backend"],
+                                    "force_refresh": cleaned_data["force_refresh"],
+                                    **job_deadline(cleaned_data),
+                                },
+                                user=request.user,
+                            )
+                            return redirect("core:job_detail", job_id=job.pk)
                         else:
-                            with ThreadPoolExecutor(max_workers=10) as executor:
-                                future_to_device = {
-                                    executor.submit(
-                                        execute_command_on_device,
-                                        device,
-                                        command_to_execute,
-                                        use_textfsm,
-                                    ): device
-                                    for device in devices
-                                }
-
-                                for future in as_completed(future_to_device):
-                                    device, output, status = future.result()
+                            with HistoryWriter(CommandHistory) as history:
+                                for device, outputs, status in run_show_commands(
+                                    devices,
+                                    show_commands,
+                                    use_textfsm,
+                                    backend=cleaned_data["backend"],
+                                    force_refresh=cleaned_data["force_refresh"],
+                                ):
                                     results.append(
                                         {
                                             "device": device,
                                             "status": status,
-                                            "output": output,
+                                            "output": combine_command_outputs(outputs),
+                                            "outputs": outputs,
+                                            "cached": all(
+                                                result.get("cached")
+                                                for result in outputs.values()
+                                            ),
                                         }
                                     )
-                                    # Save history inside the loop for show_cmd
-                                    CommandHistory.objects.create(
-                                        device=device,
-                                        command=command_to_execute,
-                                        output=output,
-                                        status=status,
-                                    )
+                                    # Queue one history row per command for show_cmd
+                                    add_show_history(history, device, outputs)
 
                     elif execution_type == "config_cmd":
-                        if config_commands_raw:  # Check if config commands are provided
+                        if config_commands_raw and cleaned_data.get(
+                            "run_in_background"
+                        ):
+                            job = submit_job(
+                                "netmiko",
+                                "config",
+                                devices,
+                                config_commands_raw.splitlines(),
+                                job_deadline(cleaned_data),
+                                user=request.user,
+                            )
+                            return redirect("core:job_detail", job_id=job.pk)
+                        elif config_commands_raw:  # Check if config commands are provided
                             config_commands = config_commands_raw.splitlines()
-                            with ThreadPoolExecutor(max_workers=10) as executor:
-                                future_to_device = {
-                                    executor.submit(
-                                        execute_config_commands_on_device,
-                                        device,
-                                        config_commands,
-                                    ): device
-                                    for device in devices
-                                }
-
-                                for future in as_completed(future_to_device):
-                                    device, output, status = future.result()
+                            with HistoryWriter(CommandHistory) as history:
+                                for (
+                                    device,
+                                    output,
+                                    status,
+                                    timings,
+                                ) in run_config_commands(devices, config_commands):
                                     results.append(
                                         {
                                             "device": device,
@@ -209,12 +629,14 @@ def home(request):
                                             "output": output,
                                         }
                                     )
-                                    # Save history inside the loop for config_cmd
-                                    CommandHistory.objects.create(
+                                    # Queue history inside the loop for config_cmd
+                                    history.add(
                                         device=device,
                                         command=config_commands_raw,  # Save the multi-line string
+                                        command_type="config",
                                         output=output,
                                         status=status,
+                                        **timings,
                                     )
                         else:
                             messages.error(
@@ -228,6 +650,11 @@ def home(request):
                                 request,
                                 f"Operation successful on {result['device'].name}",
                             )
+                        elif result["status"] == "skipped":
+                            messages.warning(
+                                request,
+                                f"Skipped {result['device'].name}: {result['output']}",
+                            )
                         else:
                             messages.error(
                                 request,
@@ -248,6 +675,107 @@ def home(request):
     )
 
 
+@require_POST
+def stream(request):
+    """
+    Streams each device's result as a Server-Sent Event the moment it completes.
+
+    Accepts the same POST data as the home view.
+    """
+    form = NetmikoCommandForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse(
+            {"error": "Invalid form data.", "errors": form.errors}, status=400
+        )
+    cleaned_data = form.cleaned_data
+
+    devices = get_unique_devices(
+        cleaned_data.get("multiple_devices", []), cleaned_data.get("device_groups", [])
+    )
+    if not devices:
+        return JsonResponse(
+            {"error": "Please select at least one device or device group."}, status=400
+        )
+
+    (
+        command_to_execute,
+        execution_type,
+        use_textfsm,
+        config_commands_raw,
+    ) = prepare_execution_details(cleaned_data)
+
+    command_type = "show"
+    if execution_type == "show_cmd":
+        commands = collect_show_commands(
+            command_to_execute, cleaned_data.get("show_commands")
+        )
+        if not commands:
+            return JsonResponse(
+                {"error": "Please enter a command or select a preset command."},
+                status=400,
+            )
+        results = (
+            (
+                device,
+                command,
+                result["status"],
+                result["output"],
+                result.get("timings", {}),
+                result.get("cached", False),
+            )
+            for device, outputs, status in run_show_commands(
+                devices,
+                commands,
+                use_textfsm,
+                backend=cleaned_data["backend"],
+                force_refresh=cleaned_data["force_refresh"],
+            )
+            for command, result in outputs.items()
+        )
+    else:
+        if not config_commands_raw:
+            return JsonResponse(
+                {"error": "Please enter configuration commands."}, status=400
+            )
+        commands = [config_commands_raw]
+        command_type = "config"
+        results = (
+            (device, config_commands_raw, status, output, timings, False)
+            for device, output, status, timings in run_config_commands(
+                devices, config_commands_raw.splitlines()
+            )
+        )
+
+    def events():
+        yield sse_event(
+            "start",
+            {
+                "device_count": len(devices),
+                "result_count": len(devices) * len(commands),
+                "command": "\n".join(commands),
+            },
+        )
+        try:
+            with HistoryWriter(CommandHistory) as history:
+                for device, command, status, output, timings, cached in results:
+                    # Cached results were recorded by the run that executed them.
+                    if not cached:
+                        history.add(
+                            device=device,
+                            command=command,
+                            command_type=command_type,
+                            output=output,
+                            status=status,
+                            **timings,
+                        )
+                    yield device_result_event(device, command, status, output)
+        except Exception as e:
+            yield sse_event("error", {"error": str(e)})
+        yield sse_event("done", {})
+
+    return event_stream_response(events())
+
+
 def devices(request):
     """
     Displays a list of network devices.
@@ -265,11 +793,22 @@ def device_history(request, device_id):
     Displays the command history for a specific network device.
     """
     device = get_object_or_404(NetworkDevice, pk=device_id)
-    command_history = CommandHistory.objects.filter(device=device).order_by(
-        "-executed_at"
+    command_history = history_page(
+        request,
+        CommandHistory.objects.filter(device=device)
+        .select_related("blob")
+        .defer("blob__data"),
     )
     return render(
         request,
         "netmiko_tools/device_history.html",
         {"device": device, "command_history": command_history},
     )
+
+
+@login_required
+def pool_stats(request):
+    """
+    Returns the connection pool hit/miss/eviction counters as JSON.
+    """
+    return JsonResponse(get_connection_pool().stats())
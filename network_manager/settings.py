@@ -74,6 +74,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "core.middleware.MetricsMiddleware",
 ]
 
 ROOT_URLCONF = "network_manager.urls"
@@ -160,6 +161,206 @@ SECURE_CONTENT_TYPE_NOSNIFF = True
 X_FRAME_OPTIONS = "DENY"
 
 
+# Netmiko connection pool
+# Persistent SSH sessions are reused across requests handled by the same process.
+NETMIKO_CONNECTION_POOL = {
+    "ENABLED": os.environ.get("NETMIKO_POOL_ENABLED", "True") == "True",
+    "IDLE_TIMEOUT": 300,  # seconds an unused session is kept open
+    "MAX_SESSIONS_PER_DEVICE": 2,
+    "ACQUIRE_TIMEOUT": 30,  # seconds to wait for a busy device's session
+}
+
+
+# Command history writer
+# History rows are buffered and inserted with bulk_create in one transaction
+# once BATCH_SIZE rows are pending or FLUSH_INTERVAL seconds have passed.
+HISTORY_WRITER = {
+    "BATCH_SIZE": 100,
+    "FLUSH_INTERVAL": 2.0,
+}
+
+# Command concurrency
+# Device sessions are limited globally, per device type and per site. With
+# ADAPTIVE the global limit starts at GLOBAL_LIMIT and moves between MIN_LIMIT
+# and MAX_LIMIT: +1 after a healthy window, times DECREASE_FACTOR when the
+# error rate exceeds MAX_ERROR_RATE or latency exceeds LATENCY_TOLERANCE times
+# the observed baseline. Only one session per device is open at a time; set
+# DEVICE_LOCKS to "database" when several job workers run side by side.
+COMMAND_CONCURRENCY = {
+    "GLOBAL_LIMIT": int(os.getenv("COMMAND_CONCURRENCY_LIMIT", "10")),
+    "MIN_LIMIT": 1,
+    "MAX_LIMIT": int(os.getenv("COMMAND_CONCURRENCY_MAX", "50")),
+    "PER_DEVICE_TYPE": {},  # e.g. {"mikrotik_routeros": 5}
+    "PER_SITE": {},  # e.g. {"branch-01": 2}
+    "ADAPTIVE": True,
+    "LATENCY_TOLERANCE": 2.0,
+    "MAX_ERROR_RATE": 0.2,
+    "DECREASE_FACTOR": 0.5,
+    "DEVICE_LOCKS": os.getenv("COMMAND_DEVICE_LOCKS", "local"),
+    "LOCK_TIMEOUT": 600,
+}
+
+# Asyncio execution backend (optional, requires asyncssh)
+# Show commands run from one event loop with at most MAX_SESSIONS devices in
+# flight; select it per run with the "Execution Backend" field.
+ASYNC_ENGINE = {
+    "MAX_SESSIONS": int(os.getenv("ASYNC_ENGINE_MAX_SESSIONS", "1000")),
+    "CONNECT_TIMEOUT": 30,
+    "COMMAND_TIMEOUT": 60,
+}
+
+# Command history output compression
+# Outputs of THRESHOLD bytes or more are stored zlib-compressed at LEVEL;
+# smaller ones stay inline. None disables compression for new rows.
+HISTORY_COMPRESSION = {
+    "THRESHOLD": 1024,
+    "LEVEL": 6,
+}
+
+# Prometheus metrics served at /metrics
+# Set METRICS_MULTIPROCESS_DIR to a local directory shared by the web server
+# and the run_jobs workers so the endpoint reports every process. Scrapers
+# send "Authorization: Bearer <METRICS_TOKEN>"; logged-in users may browse it.
+# METRICS_ALLOW_ANONYMOUS=true serves it without authentication.
+METRICS = {
+    "ENABLED": os.getenv("METRICS_ENABLED", "true").lower() == "true",
+    "MULTIPROCESS_DIR": os.getenv("METRICS_MULTIPROCESS_DIR") or None,
+    "FLUSH_INTERVAL": 5.0,
+    "TOKEN": os.getenv("METRICS_TOKEN") or None,
+    "ALLOW_ANONYMOUS": os.getenv("METRICS_ALLOW_ANONYMOUS", "false").lower()
+    == "true",
+}
+
+# Configuration archive filled by running-config backups
+# Every SNAPSHOT_INTERVAL-th version is stored in full, the others as deltas
+# against the previous version unless the delta exceeds MAX_DELTA_RATIO of
+# the full text. TEXT_CACHE_SIZE rebuilt versions are cached per process.
+CONFIG_ARCHIVE = {
+    "SNAPSHOT_INTERVAL": 20,
+    "MAX_DELTA_RATIO": 0.5,
+    "TEXT_CACHE_SIZE": 64,
+}
+
+# Command history retention, applied by "manage.py prune_history"
+# Each row follows the first policy it matches (on engine, command_type,
+# status or command) and is removed after "days", or never when None. Removed
+# rows are added to daily rollups and, with HISTORY_ARCHIVE_DIR set, exported
+# as gzipped NDJSON first.
+HISTORY_RETENTION = {
+    "POLICIES": [
+        {"command_type": "backup", "days": None},
+        {"status": "failed", "days": 90},
+        {"command_type": "config", "days": 365},
+        {"command_type": "show", "days": 30},
+    ],
+    "AUDIT_LOG_DAYS": 365,
+    "BATCH_SIZE": 500,
+    "BATCH_PAUSE": 0.05,
+    "ARCHIVE_DIR": os.getenv("HISTORY_ARCHIVE_DIR") or None,
+}
+
+# Show command result cache
+# Successful show results are reused for DEFAULT_TTL seconds, or for the TTL of
+# the longest matching command prefix in TTLS (0 disables caching). Identical
+# requests running at the same time share one execution; a request waits for
+# the shared run up to the command's read timeout (WAIT_TIMEOUT seconds when
+# set), then runs the command itself. Configuration pushes invalidate the
+# device's entries.
+SHOW_COMMAND_CACHE = {
+    "ENABLED": os.getenv("SHOW_COMMAND_CACHE_ENABLED", "true").lower() == "true",
+    "DEFAULT_TTL": int(os.getenv("SHOW_COMMAND_CACHE_TTL", "30")),
+    "TTLS": {
+        "show clock": 0,
+        "show logging": 0,
+        "show running-config": 60,
+        "show startup-config": 60,
+        "show inventory": 3600,
+        "show version": 3600,
+    },
+    "MAX_ENTRIES": 10000,
+    "WAIT_TIMEOUT": None,
+}
+
+# Per-device circuit breaker
+# After FAILURE_THRESHOLD consecutive connection failures a device is skipped
+# for COOL_OFF seconds, then one run probes it; every failed probe doubles the
+# wait up to MAX_COOL_OFF. A probe not reported within PROBE_TIMEOUT seconds
+# lets the next run probe instead.
+CIRCUIT_BREAKER = {
+    "ENABLED": os.getenv("CIRCUIT_BREAKER_ENABLED", "true").lower() == "true",
+    "FAILURE_THRESHOLD": 3,
+    "COOL_OFF": 60,
+    "MAX_COOL_OFF": 900,
+    "PROBE_TIMEOUT": 120,
+}
+
+# Device reachability poller ("manage.py poll_reachability")
+# Every INTERVAL seconds (+/- JITTER as a fraction) each active device gets a
+# TCP connect probe to its SSH port, CONCURRENCY at a time. Statuses older
+# than STALE_AFTER seconds are shown as unknown.
+REACHABILITY = {
+    "INTERVAL": int(os.getenv("REACHABILITY_INTERVAL", "60")),
+    "JITTER": 0.1,
+    "TIMEOUT": 3.0,
+    "CONCURRENCY": 500,
+    "STALE_AFTER": 300,
+}
+
+# Timeouts learned from past runs
+# Connect and per-command read timeouts are MULTIPLIER times the larger of the
+# EWMA (weight ALPHA) and p95 of the last WINDOW successful runs, plus MARGIN
+# seconds, clamped to the ranges (which start at Netmiko's 10s defaults). Each
+# run failed since the latest success multiplies the timeout by
+# FAILURE_BACKOFF. Below MIN_SAMPLES runs the driver defaults apply; a
+# device's own timeout fields override both.
+LEARNED_TIMEOUTS = {
+    "ENABLED": os.getenv("LEARNED_TIMEOUTS_ENABLED", "true").lower() == "true",
+    "WINDOW": 50,
+    "MIN_SAMPLES": 5,
+    "ALPHA": 0.3,
+    "MULTIPLIER": 3.0,
+    "MARGIN": 2.0,
+    "CONNECT_RANGE": (10, 60),
+    "READ_RANGE": (10, 600),
+    "FAILURE_BACKOFF": 2.0,
+}
+
+# Background job workers ("manage.py run_jobs")
+# A worker records a heartbeat on its running job every HEARTBEAT_INTERVAL
+# seconds. Running jobs without one for STALE_AFTER seconds (their worker was
+# killed or lost the database) are marked failed, so they can be retried.
+JOB_WORKER = {
+    "HEARTBEAT_INTERVAL": 30,
+    "STALE_AFTER": int(os.getenv("JOB_STALE_AFTER", "300")),
+}
+
+# Retries of transient device failures and job deadlines
+# Failures matching RETRY_ON (and not NO_RETRY_ON) are retried up to
+# MAX_ATTEMPTS times per device, waiting a random time up to BACKOFF doubled
+# per attempt, capped at MAX_BACKOFF seconds. Configuration pushes only retry
+# failures to connect. Background jobs skip devices not started within
+# JOB_DEADLINE seconds (None for no deadline); a job's options["deadline"]
+# and options["retry"] override these values.
+RETRY_POLICY = {
+    "MAX_ATTEMPTS": int(os.getenv("RETRY_MAX_ATTEMPTS", "3")),
+    "BACKOFF": 1.0,
+    "MAX_BACKOFF": 30.0,
+    "RETRY_ON": [
+        "netmiko.exceptions.NetmikoTimeoutException",
+        "netmiko.exceptions.ReadTimeout",
+        "paramiko.ssh_exception.SSHException",
+        "builtins.ConnectionError",
+        "builtins.TimeoutError",
+        "builtins.EOFError",
+    ],
+    "NO_RETRY_ON": [
+        "paramiko.ssh_exception.AuthenticationException",
+        "core.circuit.CircuitOpen",
+    ],
+    "JOB_DEADLINE": None,
+}
+
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class NornirToolsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "nornir_tools"
+
+    def ready(self):
+        # Register the background job runners and inventory cache signals.
+        from . import jobs, signals  # noqa: F401
@@ -1,5 +1,6 @@
 from django import forms
 
+from core.models import DeviceGroup
 from netmiko_tools.models import NetworkDevice
 
 
@@ -8,6 +9,14 @@ class NornirCommandForm(forms.Form):
         queryset=NetworkDevice.objects.filter(is_active=True),
         label="Select Devices",
         widget=forms.SelectMultiple(attrs={"class": "form-select"}),
+        required=False,
+    )
+
+    device_groups = forms.ModelMultipleChoiceField(
+        queryset=DeviceGroup.objects.all(),
+        label="Select Device Groups",
+        widget=forms.SelectMultiple(attrs={"class": "form-select"}),
+        required=False,
     )
 
     command_type = forms.ChoiceField(
@@ -38,3 +47,35 @@ class NornirCommandForm(forms.Form):
         initial=True,
         help_text="Execute commands on multiple devices in parallel",
     )
+
+    run_in_background = forms.BooleanField(
+        required=False,
+        help_text="Queue the run as a job and follow its progress on the job page",
+    )
+
+    deadline = forms.IntegerField(
+        required=False,
+        min_value=1,
+        widget=forms.NumberInput(attrs={"class": "form-control"}),
+        help_text="Skip devices a background job has not started within this time",
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not cleaned_data.get("devices") and not cleaned_data.get("device_groups"):
+            raise forms.ValidationError("Select at least one device or device group.")
+        return cleaned_data
+
+    def target_devices(self):
+        """
+        Returns the selected devices plus the active members of the selected groups.
+        """
+        devices = list(self.cleaned_data["devices"])
+        groups = self.cleaned_data["device_groups"]
+        if groups:
+            seen = {device.pk for device in devices}
+            members = NetworkDevice.objects.filter(
+                is_active=True, groups__in=groups
+            ).distinct()
+            devices.extend(device for device in members if device.pk not in seen)
+        return devices
@@ -0,0 +1,326 @@
+"""Nornir inventory built directly from the Django ORM.
+
+``DjangoInventory`` replaces the old YAML round-trip (query every device, dump
+hosts/groups to a temp dir, re-parse with ``SimpleInventory``) with an
+in-process cache of device and group rows. The cache is invalidated per device
+by model signals (see ``signals.py``) and, for edits made by other processes,
+by a cheap change check, so a Nornir run only re-reads the devices that
+actually changed.
+
+The change check compares the row count, the sum of primary keys and the
+latest ``updated_at`` of the devices and groups, and the count and key sum of
+the group membership table. Primary keys only grow, so a delete combined with
+an add changes the key sum even when the count stays the same, and membership
+changes are seen although they do not touch ``DeviceGroup.updated_at``.
+"""
+
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from django.db.models import Count, Max, Sum
+from nornir.core.inventory import (
+    ConnectionOptions,
+    Defaults,
+    Group,
+    Groups,
+    Host,
+    Hosts,
+    Inventory,
+    ParentGroups,
+)
+from nornir.core.plugins.inventory import InventoryPluginRegister
+
+from core.models import DeviceGroup, NetworkDevice
+
+
+class HostSpec(NamedTuple):
+    """Connection details of an active device, as cached between runs."""
+
+    id: int
+    name: str
+    hostname: str
+    port: int
+    username: str
+    password: str
+    platform: str
+    secret: str
+    site: str
+    connect_timeout: Optional[int]
+    read_timeout: Optional[int]
+
+    @classmethod
+    def from_device(cls, device: NetworkDevice) -> "HostSpec":
+        return cls(
+            id=device.pk,
+            name=device.name,
+            hostname=device.ip_address,
+            port=device.port,
+            username=device.username,
+            password=device.password,
+            platform=device.device_type,
+            secret=device.enable_password or "",
+            site=device.site,
+            connect_timeout=device.connect_timeout,
+            read_timeout=device.read_timeout,
+        )
+
+
+class InventoryCache:
+    """Process-wide cache of active devices and group memberships."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._hosts: Optional[Dict[int, HostSpec]] = None
+        self._ids_by_name: Dict[str, int] = {}
+        self._device_state: Optional[dict] = None
+        self._stale_ids: Set[int] = set()
+        self._groups: Optional[Dict[str, Set[int]]] = None
+        self._group_state: Optional[dict] = None
+        self.full_loads = 0
+        self.partial_loads = 0
+
+    def invalidate_device(self, device_id: int) -> None:
+        """Mark a single device for reloading on the next inventory build."""
+        with self._lock:
+            self._stale_ids.add(device_id)
+
+    def invalidate_groups(self) -> None:
+        """Mark group definitions and memberships for reloading."""
+        with self._lock:
+            self._groups = None
+
+    def clear(self) -> None:
+        """Drop everything; the next build reloads from the database."""
+        with self._lock:
+            self._hosts = None
+            self._groups = None
+            self._stale_ids.clear()
+
+    def snapshot(self):
+        """Return ``(hosts, groups)`` after refreshing whatever changed."""
+        with self._lock:
+            self._refresh_hosts()
+            self._refresh_groups()
+            return dict(self._hosts), {
+                name: set(members) for name, members in self._groups.items()
+            }
+
+    def select(
+        self, selection: "HostSelection"
+    ) -> Tuple[Dict[int, HostSpec], Dict[str, Set[int]]]:
+        """Return ``(hosts, groups)`` limited to the selected hosts.
+
+        The cache is filled on first use and refreshed like ``snapshot()``;
+        the selection is then applied in memory with set lookups, so later
+        runs only query the devices that changed.
+        """
+        with self._lock:
+            self._refresh_hosts()
+            self._refresh_groups()
+            return selection.filter(self._hosts, self._groups, self._ids_by_name)
+
+    def _refresh_hosts(self) -> None:
+        state = NetworkDevice.objects.aggregate(
+            count=Count("id"), ids=Sum("id"), latest=Max("updated_at")
+        )
+        if (
+            self._hosts is None
+            or state["count"] != self._device_state["count"]
+            or state["ids"] != self._device_state["ids"]
+        ):
+            # First load, or devices were added or deleted.
+            self._hosts = {
+                device.pk: HostSpec.from_device(device)
+                for device in NetworkDevice.objects.filter(is_active=True)
+            }
+            self._ids_by_name = {spec.name: pk for pk, spec in self._hosts.items()}
+            self._stale_ids.clear()
+            self._device_state = state
+            self.full_loads += 1
+            return
+
+        changed = NetworkDevice.objects.filter(pk__in=self._stale_ids)
+        previous_latest = self._device_state["latest"]
+        if previous_latest and state["latest"] != previous_latest:
+            # Picks up edits saved by other processes, which fire no local signal.
+            changed = changed | NetworkDevice.objects.filter(
+                updated_at__gt=previous_latest
+            )
+        if self._stale_ids or state != self._device_state:
+            self._apply_changes(changed, self._stale_ids)
+            self.partial_loads += 1
+        self._stale_ids = set()
+        self._device_state = state
+
+    def _apply_changes(self, devices: Iterable[NetworkDevice], ids: Set[int]) -> None:
+        seen = set()
+        for device in devices:
+            seen.add(device.pk)
+            self._drop(device.pk)
+            if device.is_active:
+                spec = HostSpec.from_device(device)
+                self._hosts[device.pk] = spec
+                self._ids_by_name[spec.name] = device.pk
+        # Stale ids that no longer exist were deleted.
+        for device_id in ids - seen:
+            self._drop(device_id)
+
+    def _drop(self, device_id: int) -> None:
+        spec = self._hosts.pop(device_id, None)
+        if spec is not None and self._ids_by_name.get(spec.name) == device_id:
+            del self._ids_by_name[spec.name]
+
+    def _refresh_groups(self) -> None:
+        state = DeviceGroup.objects.aggregate(
+            count=Count("id"), ids=Sum("id"), latest=Max("updated_at")
+        )
+        state.update(
+            DeviceGroup.devices.through.objects.aggregate(
+                memberships=Count("id"), membership_ids=Sum("id")
+            )
+        )
+        if self._groups is not None and state == self._group_state:
+            return
+        groups: Dict[str, Set[int]] = {
+            name: set() for name in DeviceGroup.objects.values_list("name", flat=True)
+        }
+        memberships = DeviceGroup.devices.through.objects.values_list(
+            "devicegroup__name", "networkdevice_id"
+        )
+        for group_name, device_id in memberships:
+            groups[group_name].add(device_id)
+        self._groups = groups
+        self._group_state = state
+
+
+class HostSelection(NamedTuple):
+    """Hosts to load: any of ``names``, ``ids`` or ``groups``, by ``device_types``.
+
+    Empty criteria are ignored; with no criteria at all every active device is
+    selected.
+    """
+
+    names: frozenset = frozenset()
+    ids: frozenset = frozenset()
+    groups: frozenset = frozenset()
+    device_types: frozenset = frozenset()
+
+    @classmethod
+    def build(cls, names=None, ids=None, groups=None, device_types=None):
+        return cls(
+            frozenset(names or ()),
+            frozenset(ids or ()),
+            frozenset(groups or ()),
+            frozenset(device_types or ()),
+        )
+
+    @property
+    def is_scoped(self) -> bool:
+        return any(self)
+
+    def filter(
+        self,
+        hosts: Dict[int, HostSpec],
+        groups: Dict[str, Set[int]],
+        ids_by_name: Dict[str, int],
+    ) -> Tuple[Dict[int, HostSpec], Dict[str, Set[int]]]:
+        """Apply the selection to cached hosts using set and dict lookups only."""
+        if self.names or self.ids or self.groups:
+            wanted = set(self.ids)
+            wanted.update(
+                ids_by_name[name] for name in self.names if name in ids_by_name
+            )
+            for group_name in self.groups:
+                wanted |= groups.get(group_name, set())
+            selected = {
+                device_id: hosts[device_id]
+                for device_id in wanted
+                if device_id in hosts
+            }
+        else:
+            selected = dict(hosts)
+        if self.device_types:
+            selected = {
+                device_id: spec
+                for device_id, spec in selected.items()
+                if spec.platform in self.device_types
+            }
+        selected_ids = set(selected)
+        selected_groups = {
+            name: members & selected_ids for name, members in groups.items()
+        }
+        return selected, {
+            name: members for name, members in selected_groups.items() if members
+        }
+
+
+inventory_cache = InventoryCache()
+
+
+class DjangoInventory:
+    """Nornir inventory plugin reading hosts and groups from the database."""
+
+    def __init__(
+        self,
+        session_log: Optional[str] = None,
+        names: Optional[List[str]] = None,
+        ids: Optional[List[int]] = None,
+        groups: Optional[List[str]] = None,
+        device_types: Optional[List[str]] = None,
+    ) -> None:
+        """
+        Args:
+            session_log: Optional Netmiko session log path applied to every host
+            names: Only load devices with these names
+            ids: Only load devices with these primary keys
+            groups: Only load members of these device groups
+            device_types: Restrict the loaded devices to these device types
+        """
+        self.session_log = session_log
+        self.selection = HostSelection.build(names, ids, groups, device_types)
+
+    def load(self) -> Inventory:
+        if self.selection.is_scoped:
+            host_specs, group_members = inventory_cache.select(self.selection)
+        else:
+            host_specs, group_members = inventory_cache.snapshot()
+        defaults = Defaults()
+
+        groups = Groups()
+        for group_name in group_members:
+            groups[group_name] = Group(name=group_name, defaults=defaults)
+
+        memberships: Dict[int, List[str]] = {}
+        for group_name, members in group_members.items():
+            for device_id in members:
+                memberships.setdefault(device_id, []).append(group_name)
+
+        hosts = Hosts()
+        for spec in host_specs.values():
+            extras = {"secret": spec.secret}
+            if self.session_log:
+                extras["session_log"] = self.session_log
+            hosts[spec.name] = Host(
+                name=spec.name,
+                hostname=spec.hostname,
+                port=spec.port,
+                username=spec.username,
+                password=spec.password,
+                platform=spec.platform,
+                groups=ParentGroups(
+                    groups[name] for name in sorted(memberships.get(spec.id, []))
+                ),
+                data={
+                    "device_id": spec.id,
+                    "site": spec.site,
+                    "connect_timeout": spec.connect_timeout,
+                    "read_timeout": spec.read_timeout,
+                },
+                connection_options={"netmiko": ConnectionOptions(extras=extras)},
+                defaults=defaults,
+            )
+
+        return Inventory(hosts=hosts, groups=groups, defaults=defaults)
+
+
+InventoryPluginRegister.register("DjangoInventory", DjangoInventory)
@@ -0,0 +1,50 @@
+from core.jobs import register_runner
+from core.retry import job_retry_policy
+
+from .utils import backup_config, run_commands, run_config_commands
+
+
+def _device_names(job):
+    return list(job.devices.values_list("name", flat=True))
+
+
+@register_runner("nornir", "show")
+def run_show_job(job, record_result):
+    """Run a queued Nornir show commands job."""
+    run_commands(
+        _device_names(job),
+        job.commands,
+        job.options.get("parallel", True),
+        on_result=record_result,
+        concurrency=job.options.get("concurrency"),
+        retry=job_retry_policy(job),
+    )
+
+
+@register_runner("nornir", "config")
+def run_config_job(job, record_result):
+    """Run a queued Nornir configuration job."""
+    result = run_config_commands(
+        _device_names(job),
+        job.commands,
+        job.options.get("parallel", True),
+        on_result=record_result,
+        concurrency=job.options.get("concurrency"),
+        retry=job_retry_policy(job),
+    )
+    if result["status"] == "error":
+        raise RuntimeError(result["error"])
+
+
+@register_runner("nornir", "backup")
+def run_backup_job(job, record_result):
+    """Run a queued Nornir configuration backup job."""
+    result = backup_config(
+        _device_names(job),
+        job.options.get("parallel", True),
+        on_result=record_result,
+        concurrency=job.options.get("concurrency"),
+        retry=job_retry_policy(job),
+    )
+    if result["status"] == "error":
+        raise RuntimeError(result["error"])
@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-17 08:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nornir_tools', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='nornircommandhistory',
+            name='bytes_received',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='nornircommandhistory',
+            name='command_time',
+            field=models.FloatField(blank=True, help_text='Seconds to send the command and read output', null=True),
+        ),
+        migrations.AddField(
+            model_name='nornircommandhistory',
+            name='connect_time',
+            field=models.FloatField(blank=True, help_text='Seconds to connect, handshake and log in', null=True),
+        ),
+        migrations.AddField(
+            model_name='nornircommandhistory',
+            name='parse_time',
+            field=models.FloatField(blank=True, help_text='Seconds spent parsing output with TextFSM', null=True),
+        ),
+        migrations.AddField(
+            model_name='nornircommandhistory',
+            name='prompt_time',
+            field=models.FloatField(blank=True, help_text='Seconds for prompt detection and setup', null=True),
+        ),
+    ]
@@ -0,0 +1,94 @@
+import hashlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+BATCH_SIZE = 500
+
+
+def move_output_to_blobs(apps, schema_editor):
+    History = apps.get_model("nornir_tools", "NornirCommandHistory")
+    OutputBlob = apps.get_model("core", "OutputBlob")
+    batch = []
+    for row in History.objects.only("pk", "output").order_by("pk").iterator(
+        chunk_size=BATCH_SIZE
+    ):
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            _attach_blobs(History, OutputBlob, batch)
+            batch = []
+    if batch:
+        _attach_blobs(History, OutputBlob, batch)
+
+
+def _attach_blobs(History, OutputBlob, rows):
+    digests = {row.pk: hashlib.sha256(row.output.encode()).hexdigest() for row in rows}
+    texts = {digests[row.pk]: row.output for row in rows}
+    existing = set(
+        OutputBlob.objects.filter(digest__in=texts).values_list("digest", flat=True)
+    )
+    OutputBlob.objects.bulk_create(
+        OutputBlob(digest=digest, data=text, size=len(text.encode()))
+        for digest, text in texts.items()
+        if digest not in existing
+    )
+    blob_ids = dict(
+        OutputBlob.objects.filter(digest__in=texts).values_list("digest", "id")
+    )
+    for row in rows:
+        row.blob_id = blob_ids[digests[row.pk]]
+        OutputBlob.objects.filter(pk=row.blob_id).update(refcount=F("refcount") + 1)
+    History.objects.bulk_update(rows, ["blob"])
+
+
+def restore_output(apps, schema_editor):
+    History = apps.get_model("nornir_tools", "NornirCommandHistory")
+    batch = []
+    for row in History.objects.select_related("blob").order_by("pk").iterator(
+        chunk_size=BATCH_SIZE
+    ):
+        row.output = row.blob.data
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            History.objects.bulk_update(batch, ["output"])
+            batch = []
+    if batch:
+        History.objects.bulk_update(batch, ["output"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0005_outputblob"),
+        ("nornir_tools", "0003_compress_history_output"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="nornircommandhistory",
+            name="blob",
+            field=models.ForeignKey(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="%(app_label)s_%(class)s_set",
+                to="core.outputblob",
+            ),
+        ),
+        migrations.RunPython(move_output_to_blobs, restore_output),
+        migrations.RemoveField(
+            model_name="nornircommandhistory",
+            name="output",
+        ),
+        migrations.AlterField(
+            model_name="nornircommandhistory",
+            name="blob",
+            field=models.ForeignKey(
+                editable=False,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="%(app_label)s_%(class)s_set",
+                to="core.outputblob",
+            ),
+        ),
+    ]
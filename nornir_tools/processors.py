@@ -0,0 +1,71 @@
+import queue
+import threading
+from typing import Iterator, Tuple
+
+from nornir.core import Nornir
+from nornir.core.inventory import Host
+from nornir.core.task import AggregatedResult, MultiResult, Task
+
+_DONE = object()
+
+
+class QueueProcessor:
+    """Nornir processor that hands each host's result to a queue as it completes."""
+
+    def __init__(self, results: queue.Queue) -> None:
+        self.results = results
+
+    def task_started(self, task: Task) -> None:
+        pass
+
+    def task_completed(self, task: Task, result: AggregatedResult) -> None:
+        pass
+
+    def task_instance_started(self, task: Task, host: Host) -> None:
+        pass
+
+    def task_instance_completed(
+        self, task: Task, host: Host, result: MultiResult
+    ) -> None:
+        self.results.put((host.name, result))
+
+    def subtask_instance_started(self, task: Task, host: Host) -> None:
+        pass
+
+    def subtask_instance_completed(
+        self, task: Task, host: Host, result: MultiResult
+    ) -> None:
+        pass
+
+
+def iter_task_results(nr: Nornir, **kwargs) -> Iterator[Tuple[str, MultiResult]]:
+    """Run a Nornir task and yield ``(host_name, result)`` as each host completes.
+
+    The task runs on a helper thread so the caller can consume (and persist)
+    results from its own thread while slower hosts are still executing.
+
+    Args:
+        nr: Nornir object, already filtered to the target hosts
+        **kwargs: Arguments passed through to ``nr.run``
+    """
+    results: queue.Queue = queue.Queue()
+    outcome = {}
+
+    def run() -> None:
+        try:
+            nr.with_processors([QueueProcessor(results)]).run(**kwargs)
+        except BaseException as e:
+            outcome["error"] = e
+        finally:
+            results.put(_DONE)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    while True:
+        item = results.get()
+        if item is _DONE:
+            break
+        yield item
+    thread.join()
+    if "error" in outcome:
+        raise outcome["error"]
@@ -0,0 +1,67 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from django.db import connection
+from nornir.core.inventory import Host
+from nornir.core.plugins.runners import RunnersPluginRegister
+from nornir.core.task import AggregatedResult, MultiResult, Task
+
+from core.circuit import CircuitOpen
+from core.concurrency import get_concurrency_controller
+from core.retry import DeadlineExceeded
+
+
+class AdaptiveRunner:
+    """Nornir runner that schedules hosts through the concurrency controller.
+
+    Unlike the threaded runner's fixed ``num_workers``, the number of hosts
+    running at once follows the controller's adaptive global limit, the
+    per-device-type and per-site limits and the per-device mutex.
+    """
+
+    def __init__(self, concurrency: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Args:
+            concurrency: Optional per-run limits, using the same keys as
+                ``settings.COMMAND_CONCURRENCY``
+        """
+        self.concurrency = concurrency
+
+    def run(self, task: Task, hosts: List[Host]) -> AggregatedResult:
+        result = AggregatedResult(task.name)
+        if not hosts:
+            return result
+        controller = get_concurrency_controller()
+        job_limiter = controller.job_limiter(self.concurrency)
+
+        def run_host(host: Host) -> MultiResult:
+            try:
+                with controller.slot(
+                    host.data.get("device_id", host.name),
+                    host.platform,
+                    host.data.get("site", ""),
+                    job_limiter,
+                ) as lease:
+                    host_result = task.copy().start(host)
+                    # Hosts skipped by an open circuit or the job's deadline
+                    # never reached the device.
+                    if host_result.failed and not isinstance(
+                        host_result.exception, (CircuitOpen, DeadlineExceeded)
+                    ):
+                        lease.mark_failed()
+                    return host_result
+            finally:
+                # Tasks query the database from this pool thread.
+                connection.close()
+
+        max_workers = controller.max_workers(job_limiter, len(hosts))
+        with ThreadPoolExecutor(max_workers) as pool:
+            futures = [pool.submit(run_host, host) for host in hosts]
+
+        for future in futures:
+            worker_result = future.result()
+            result[worker_result.host.name] = worker_result
+        return result
+
+
+RunnersPluginRegister.register("adaptive", AdaptiveRunner)
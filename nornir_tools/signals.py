@@ -0,0 +1,21 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import DeviceGroup, NetworkDevice
+
+from .inventory import inventory_cache
+
+
+@receiver(post_save, sender=NetworkDevice)
+@receiver(post_delete, sender=NetworkDevice)
+def invalidate_device(sender, instance, **kwargs):
+    """Reload only the changed device on the next Nornir run."""
+    inventory_cache.invalidate_device(instance.pk)
+
+
+@receiver(post_save, sender=DeviceGroup)
+@receiver(post_delete, sender=DeviceGroup)
+@receiver(m2m_changed, sender=DeviceGroup.devices.through)
+def invalidate_groups(sender, **kwargs):
+    """Reload group definitions and memberships on the next Nornir run."""
+    inventory_cache.invalidate_groups()
@@ -0,0 +1,176 @@
+from typing import Any, Callable, Dict, List, Optional
+
+from nornir.core.task import Result, Task
+from nornir_netmiko.tasks import netmiko_send_command
+
+from core.circuit import ConnectionAttempts
+from core.metrics import SESSIONS_OPENED
+from core.retry import RetryPolicy
+from core.timeouts import connect_timeout, read_timeout
+from core.timing import OperationTimer
+
+
+def _open_connection(
+    task: Task, timer: OperationTimer, attempts: ConnectionAttempts
+) -> None:
+    """Open (or reuse) the host's Netmiko connection, timing it as ``connect``.
+
+    The Nornir Netmiko plugin logs in and prepares the session in one call, so
+    the ``connect`` phase includes prompt detection here. The outcome is
+    reported to ``attempts``, the circuit breaker accounting of the task,
+    which raised ``CircuitOpen`` instead of connecting while the device's
+    circuit is open. The connect timeout is learned from past runs unless
+    the device overrides it.
+    """
+    if "netmiko" in task.host.connections:
+        return
+    device_id = task.host.data.get("device_id")
+    if device_id is not None:
+        seconds = connect_timeout(device_id, task.host.data.get("connect_timeout"))
+        if seconds is not None:
+            options = task.host.connection_options.get("netmiko")
+            if options is not None and options.extras is not None:
+                options.extras["conn_timeout"] = seconds
+    try:
+        with timer.phase("connect"):
+            task.host.get_connection("netmiko", task.nornir.config)
+    except Exception as e:
+        attempts.failed(e)
+        raise
+    attempts.succeeded()
+    SESSIONS_OPENED.labels("nornir", task.host.platform).inc()
+
+
+def _read_timeout_kwargs(task: Task, command: str) -> Dict[str, float]:
+    """Return the learned or overridden ``read_timeout`` for ``command``."""
+    device_id = task.host.data.get("device_id")
+    if device_id is None:
+        return {}
+    seconds = read_timeout(device_id, command, task.host.data.get("read_timeout"))
+    return {} if seconds is None else {"read_timeout": seconds}
+
+
+def _drop_connection(task: Task) -> None:
+    """Close the host's Netmiko connection so the next attempt reconnects."""
+    if "netmiko" in task.host.connections:
+        try:
+            task.host.close_connection("netmiko")
+        except Exception:
+            pass
+
+
+def netmiko_send_commands(
+    task: Task,
+    commands: List[str],
+    retry: Optional[RetryPolicy] = None,
+    **kwargs: Any,
+) -> Result:
+    """Run a list of show commands sequentially over one Netmiko session.
+
+    The connection opened for the first command is reused by the rest, so each
+    host pays for one connection setup regardless of how many commands run.
+    A transient failure reconnects and resumes at the failed command, as
+    ``retry`` allows; any other failure stops the run. Raises ``CircuitOpen``
+    or ``DeadlineExceeded`` instead of connecting to a skipped host.
+
+    Args:
+        task: Nornir task
+        commands: Show commands to run in order
+        retry: Retry policy and deadline; the settings' policy if None
+        **kwargs: Extra arguments passed to ``netmiko_send_command``
+
+    Returns:
+        Result whose ``result`` maps each completed command to its output and
+        whose ``timer`` holds the per-phase timings
+    """
+    retry = retry or RetryPolicy()
+    timer = OperationTimer()
+    outputs = {}
+    retry.check_deadline()
+    attempts = ConnectionAttempts(task.host.data.get("device_id"))
+    attempt = 1
+    try:
+        while True:
+            try:
+                retry.check_deadline()
+                _open_connection(task, timer, attempts)
+                for command in commands:
+                    if command in outputs:
+                        continue
+                    retry.check_deadline()
+                    with timer.phase("command", command):
+                        sub_result = netmiko_send_command(
+                            task,
+                            command_string=command,
+                            **{**_read_timeout_kwargs(task, command), **kwargs},
+                        )
+                    timer.add_output(command, sub_result.result)
+                    outputs[command] = sub_result.result
+                return Result(host=task.host, result=outputs, timer=timer)
+            except Exception as e:
+                if not retry.backoff(attempt, e):
+                    return Result(
+                        host=task.host,
+                        result=outputs,
+                        failed=True,
+                        exception=e,
+                        timer=timer,
+                    )
+                _drop_connection(task)
+                attempt += 1
+    finally:
+        attempts.finish()
+
+
+def netmiko_timed(
+    task: Task,
+    wrapped: Callable[..., Result],
+    retry: Optional[RetryPolicy] = None,
+    retry_command: bool = False,
+    **kwargs: Any,
+) -> Result:
+    """Run a single-command Netmiko task and attach its per-phase timings.
+
+    Failures to connect are retried as ``retry`` allows. Failures of the
+    command itself only with ``retry_command``, for commands that are safe to
+    send twice (a configuration change is not).
+
+    Args:
+        task: Nornir task
+        wrapped: Task function to run, e.g. ``netmiko_send_config``
+        retry: Retry policy and deadline; the settings' policy if None
+        retry_command: Also retry transient failures of the command
+        **kwargs: Arguments passed to ``wrapped``
+
+    Returns:
+        The wrapped task's result with a ``timer`` attribute
+    """
+    retry = retry or RetryPolicy()
+    timer = OperationTimer()
+    if "command_string" in kwargs:
+        kwargs = {**_read_timeout_kwargs(task, kwargs["command_string"]), **kwargs}
+    retry.check_deadline()
+    attempts = ConnectionAttempts(task.host.data.get("device_id"))
+    attempt = 1
+    try:
+        while True:
+            connected = False
+            try:
+                retry.check_deadline()
+                _open_connection(task, timer, attempts)
+                connected = True
+                with timer.phase("command"):
+                    result = wrapped(task, **kwargs)
+                break
+            except Exception as e:
+                if (connected and not retry_command) or not retry.backoff(
+                    attempt, e
+                ):
+                    raise
+                _drop_connection(task)
+                attempt += 1
+    finally:
+        attempts.finish()
+    timer.add_output(None, result.result)
+    result.timer = timer
+    return result
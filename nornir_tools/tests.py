@@ -0,0 +1,100 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import DeviceGroup, NetworkDevice
+from core.tests import make_device
+
+from .inventory import DjangoInventory, HostSelection, InventoryCache, inventory_cache
+
+
+class InventoryCacheTests(TestCase):
+    """
+    A cache of its own receives no model signals, like the cache of another
+    process, so these tests exercise the database change check.
+    """
+
+    def setUp(self):
+        self.r1 = make_device("r1")
+        self.r2 = make_device("r2", device_type="juniper_junos")
+        self.core = DeviceGroup.objects.create(name="core")
+        self.core.devices.add(self.r1)
+        self.cache = InventoryCache()
+
+    def select(self, **criteria):
+        hosts, groups = self.cache.select(HostSelection.build(**criteria))
+        return {spec.name for spec in hosts.values()}, groups
+
+    def test_first_scoped_load_fills_the_cache(self):
+        names, groups = self.select(names=["r1"])
+        self.assertEqual(names, {"r1"})
+        self.assertEqual(groups, {"core": {self.r1.pk}})
+        self.assertEqual(self.cache.full_loads, 1)
+
+        with self.assertNumQueries(3):
+            self.assertEqual(self.select(groups=["core"])[0], {"r1"})
+        self.assertEqual((self.cache.full_loads, self.cache.partial_loads), (1, 0))
+
+    def test_selection_criteria(self):
+        self.assertEqual(self.select(ids=[self.r2.pk])[0], {"r2"})
+        self.assertEqual(self.select(device_types=["juniper_junos"])[0], {"r2"})
+        self.assertEqual(self.select(names=["r1", "missing"])[0], {"r1"})
+        self.assertEqual(self.select()[0], {"r1", "r2"})
+
+    def test_edits_from_other_processes_are_seen(self):
+        self.select()
+        NetworkDevice.objects.filter(pk=self.r2.pk).update(
+            ip_address="198.51.100.2", updated_at=timezone.now() + timedelta(seconds=1)
+        )
+        hosts, _ = self.cache.select(HostSelection.build(names=["r2"]))
+        self.assertEqual(hosts[self.r2.pk].hostname, "198.51.100.2")
+        self.assertEqual(self.cache.full_loads, 1)
+
+    def test_delete_and_add_with_the_same_count_is_seen(self):
+        self.select()
+        NetworkDevice.objects.filter(pk=self.r2.pk).delete()
+        make_device("r3", ip_address="192.0.2.30")
+        self.assertEqual(self.select()[0], {"r1", "r3"})
+
+    def test_membership_changes_are_seen(self):
+        self.select()
+        self.core.devices.add(self.r2)
+        self.assertEqual(self.select(groups=["core"])[0], {"r1", "r2"})
+        self.core.devices.remove(self.r1)
+        self.assertEqual(self.select(groups=["core"])[0], {"r2"})
+
+    def test_inactive_devices_are_left_out(self):
+        self.select()
+        NetworkDevice.objects.filter(pk=self.r1.pk).update(
+            is_active=False, updated_at=timezone.now() + timedelta(seconds=1)
+        )
+        names, groups = self.select()
+        self.assertEqual(names, {"r2"})
+        self.assertEqual(groups, {})
+
+
+class DjangoInventoryTests(TestCase):
+    def setUp(self):
+        inventory_cache.clear()
+        self.addCleanup(inventory_cache.clear)
+        self.r1 = make_device("r1", site="dc1")
+        make_device("r2")
+        DeviceGroup.objects.create(name="core").devices.add(self.r1)
+
+    def test_builds_nornir_hosts_and_groups(self):
+        inventory = DjangoInventory(groups=["core"]).load()
+        self.assertEqual(list(inventory.hosts), ["r1"])
+        host = inventory.hosts["r1"]
+        self.assertEqual(host.hostname, self.r1.ip_address)
+        self.assertEqual(host.platform, "cisco_ios")
+        self.assertEqual(host.data["device_id"], self.r1.pk)
+        self.assertEqual(host.data["site"], "dc1")
+        self.assertEqual([group.name for group in host.groups], ["core"])
+
+    def test_saved_devices_are_reloaded(self):
+        DjangoInventory().load()
+        self.r1.ip_address = "198.51.100.1"
+        self.r1.save()
+        inventory = DjangoInventory(names=["r1"]).load()
+        self.assertEqual(inventory.hosts["r1"].hostname, "198.51.100.1")
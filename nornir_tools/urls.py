@@ -6,6 +6,7 @@ app_name = "nornir_tools"
 
 urlpatterns = [
     path("", views.nornir_home, name="nornir_home"),
+    path("stream/", views.nornir_stream, name="nornir_stream"),
     path("devices/", views.devices, name="devices"),  # Add devices list view
     path(
         "device_history/<int:device_id>/",
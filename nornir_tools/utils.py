@@ -1,84 +1,62 @@
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 from nornir import InitNornir
+from nornir.core import Nornir
 from nornir_netmiko.tasks import netmiko_send_command, netmiko_send_config
 
+from core.archive import archive_config
+from core.circuit import CircuitOpen
+from core.history import HistoryWriter
+from core.metrics import record_device_operation
+from core.result_cache import invalidate_device
+from core.retry import DeadlineExceeded, RetryPolicy
+
+from . import inventory  # noqa: F401  Registers the DjangoInventory plugin
+from . import runners  # noqa: F401  Registers the adaptive runner plugin
 from .models import NornirCommandHistory
+from .processors import iter_task_results
+from .tasks import netmiko_send_commands, netmiko_timed
 from netmiko_tools.models import NetworkDevice
 
 
-def create_nornir_inventory() -> Dict[str, Any]:
-    """Create Nornir inventory from NetworkDevice model."""
-    inventory = {
-        "hosts": {},
-        "groups": {
-            "global": {
-                "platform": "cisco_ios",  # default platform
-                "connection_options": {
-                    "netmiko": {
-                        "extras": {
-                            "session_log": "nornir_session.log",
-                        }
-                    }
-                },
-            }
-        },
-    }
-
-    for device in NetworkDevice.objects.filter(is_active=True):
-        inventory["hosts"][device.name] = {
-            "hostname": device.ip_address,
-            "username": device.username,
-            "password": device.password,
-            "platform": device.device_type,
-            "port": device.port,
-            "connection_options": {
-                "netmiko": {
-                    "extras": {
-                        "secret": (
-                            device.enable_password if device.enable_password else ""
-                        )
-                    }
-                }
-            },
-        }
-
-    return inventory
+def init_nornir(
+    num_workers: Optional[int] = None,
+    names: Optional[List[str]] = None,
+    ids: Optional[List[int]] = None,
+    groups: Optional[List[str]] = None,
+    device_types: Optional[List[str]] = None,
+    concurrency: Optional[Dict[str, Any]] = None,
+) -> Nornir:
+    """Initialize Nornir with inventory from database.
 
+    Hosts and groups come from the cached ``DjangoInventory`` plugin, so only
+    devices changed since the previous run are read from the database. When a
+    selection is given, only the matching hosts are put in the inventory
+    instead of loading everything and filtering afterwards.
 
-def init_nornir(num_workers: int = 10) -> InitNornir:
-    """Initialize Nornir with inventory from database.
+    Without ``num_workers`` hosts are scheduled by the adaptive runner, which
+    follows the limits in ``settings.COMMAND_CONCURRENCY``.
 
     Args:
-        num_workers: Number of worker threads for parallel execution
+        num_workers: Fixed number of worker threads; use the adaptive runner if None
+        names: Only include devices with these names
+        ids: Only include devices with these primary keys
+        groups: Only include members of these device groups
+        device_types: Restrict the inventory to these device types
+        concurrency: Optional per-run overrides for the adaptive runner limits
     """
-    import tempfile
-
-    import yaml
-
-    # Create temporary directory for inventory files
-    tmp_dir = tempfile.mkdtemp()
-    inventory = create_nornir_inventory()
-
-    # Write inventory files
-    hosts_file = f"{tmp_dir}/hosts.yaml"
-    groups_file = f"{tmp_dir}/groups.yaml"
-    defaults_file = f"{tmp_dir}/defaults.yaml"
-
-    with open(hosts_file, "w") as f:
-        yaml.safe_dump(inventory["hosts"], f)
-    with open(groups_file, "w") as f:
-        yaml.safe_dump(inventory["groups"], f)
-    with open(defaults_file, "w") as f:
-        yaml.safe_dump({}, f)
-
+    if num_workers is None:
+        runner = {"plugin": "adaptive", "options": {"concurrency": concurrency}}
+    else:
+        runner = {"plugin": "threaded", "options": {"num_workers": num_workers}}
     nr = InitNornir(
         inventory={
-            "plugin": "SimpleInventory",
+            "plugin": "DjangoInventory",
             "options": {
-                "host_file": hosts_file,
-                "group_file": groups_file,
-                "defaults_file": defaults_file,
+                "names": names,
+                "ids": ids,
+                "groups": groups,
+                "device_types": device_types,
             },
         },
         logging={
@@ -87,71 +65,232 @@ def init_nornir(num_workers: int = 10) -> InitNornir:
             "to_console": True,
             "log_file": "nornir.log",
         },
-        runner={"plugin": "threaded", "options": {"num_workers": num_workers}},
+        runner=runner,
     )
     return nr
 
 
+def _show_task(
+    commands: List[str], retry: Optional[RetryPolicy] = None
+) -> Dict[str, Any]:
+    """Return ``nr.run`` arguments for running show commands over one session."""
+    return {
+        "task": netmiko_send_commands,
+        "commands": commands,
+        "retry": retry,
+        "enable": True,
+        "use_textfsm": False,  # Disable TextFSM to get raw output
+        "use_timing": True,  # Use timing mode for more reliable output
+    }
+
+
+def _config_task(
+    config_commands: List[str], retry: Optional[RetryPolicy] = None
+) -> Dict[str, Any]:
+    """Return ``nr.run`` arguments for a configuration change."""
+    return {
+        "task": netmiko_timed,
+        "wrapped": netmiko_send_config,
+        "retry": retry,
+        "config_commands": config_commands,
+        "enable": True,
+    }
+
+
+def _backup_task(retry: Optional[RetryPolicy] = None) -> Dict[str, Any]:
+    """Return ``nr.run`` arguments for a running-config backup."""
+    return {
+        "task": netmiko_timed,
+        "wrapped": netmiko_send_command,
+        "retry": retry,
+        "retry_command": True,
+        "command_string": "show running-config",
+        "enable": True,
+    }
+
+
+def _resolve_devices(devices: List[str]) -> Dict[str, NetworkDevice]:
+    """Load the selected devices in a single query, keyed by name."""
+    return NetworkDevice.objects.in_bulk(list(devices), field_name="name")
+
+
+def _skipped(host_data) -> bool:
+    """Whether the host was skipped by an open circuit or the job's deadline."""
+    return isinstance(host_data.exception, (CircuitOpen, DeadlineExceeded))
+
+
+def _failure_status(host_data) -> str:
+    """Return "skipped" for a skipped host, "failed" otherwise."""
+    return "skipped" if _skipped(host_data) else "failed"
+
+
+def _host_outcomes(host_data, command: str) -> Iterator[Tuple[str, str, Any]]:
+    """Yield ``(command, status, output)`` for a host's single-command result."""
+    if host_data.failed:
+        yield command, _failure_status(host_data), str(host_data.exception)
+    else:
+        yield command, "success", host_data[0].result
+
+
+def _multi_command_outcomes(
+    host_data, commands: List[str]
+) -> Iterator[Tuple[str, str, Any]]:
+    """Yield ``(command, status, output)`` per command of a multi-command result."""
+    outputs = host_data[0].result if isinstance(host_data[0].result, dict) else {}
+    error = str(host_data.exception)
+    status = _failure_status(host_data)
+    for command in commands:
+        if command in outputs:
+            yield command, "success", outputs[command]
+        else:
+            yield command, status, error
+
+
+def _iter_and_record(
+    nr,
+    devices_by_name: Dict[str, NetworkDevice],
+    history: HistoryWriter,
+    command: str,
+    empty_output: str = "",
+    commands: Optional[List[str]] = None,
+    command_type: str = "show",
+    archive: bool = False,
+    **kwargs,
+) -> Iterator[Tuple[NetworkDevice, str, str, Any]]:
+    """Run a task and queue each host's history as soon as the host completes.
+
+    Yields ``(device, command, status, output)`` for every host, or for every
+    host and command when ``commands`` is given.
+
+    Args:
+        nr: Nornir object filtered to the target hosts
+        devices_by_name: Target devices keyed by name, see ``_resolve_devices``
+        history: Writer that batches the history rows
+        command: Command text recorded in the history
+        empty_output: History output to store for successful empty results
+        commands: Commands run by a ``netmiko_send_commands`` task; each gets
+            its own history row
+        command_type: History command type, "show", "config" or "backup"
+        archive: Add successful outputs to the configuration archive
+        **kwargs: Arguments passed through to ``nr.run``
+    """
+    if commands is not None:
+        kwargs["commands"] = commands
+    for host, host_data in iter_task_results(nr, **kwargs):
+        device = devices_by_name[host]
+        if commands is None:
+            outcomes = _host_outcomes(host_data, command)
+        else:
+            outcomes = _multi_command_outcomes(host_data, commands)
+        timer = getattr(host_data[0], "timer", None)
+        skipped = _skipped(host_data)
+        if not skipped:
+            record_device_operation(
+                "nornir",
+                device.device_type,
+                "failed" if host_data.failed else "success",
+                timer.elapsed() if timer is not None else 0.0,
+                host_data.exception,
+            )
+        if command_type == "config" and not skipped:
+            invalidate_device(device.pk)
+        for index, (host_command, status, output) in enumerate(outcomes):
+            timings = {}
+            if timer is not None:
+                timings = timer.history_fields(
+                    host_command if commands is not None else None,
+                    include_session=index == 0,
+                )
+            history.add(
+                device=device,
+                command=host_command,
+                command_type=command_type,
+                output=output or empty_output,
+                status=status,
+                **timings,
+            )
+            if archive and status == "success" and output:
+                archive_config(device, output)
+            yield device, host_command, status, output
+
+
+def _collect(events: Iterator[Tuple], on_result: Optional[Callable] = None) -> Dict:
+    """Summarise per-host events into the result dict returned by the runners.
+
+    Args:
+        events: Iterator of ``(device, command, status, output)`` tuples
+        on_result: Optional callback invoked with each event as it arrives
+    """
+    outputs = {}
+    failures = {}
+    for device, command, status, output in events:
+        if status == "success":
+            outputs[device.name] = output
+        else:
+            failures[device.name] = output
+        if on_result is not None:
+            on_result(device, command, status, output)
+
+    if failures:
+        return {"status": "failed", "failures": failures, "outputs": outputs}
+    return {"status": "success", "outputs": outputs}
+
+
 def run_commands(
-    devices: List[str], commands: List[str], parallel: bool = True
+    devices: List[str],
+    commands: List[str],
+    parallel: bool = True,
+    on_result: Optional[Callable] = None,
+    concurrency: Optional[Dict[str, Any]] = None,
+    retry: Optional[RetryPolicy] = None,
 ) -> Dict:
     """
-    Run show commands on selected devices.
+    Run show commands on selected devices, one session per device.
+
+    Each device runs the whole command list sequentially over a single
+    connection, so the fleet is traversed once regardless of command count.
 
     Args:
         devices: List of device names
         commands: List of commands to run
         parallel: Whether to run commands in parallel
+        on_result: Optional callback invoked as each host completes a command
+        concurrency: Optional per-run concurrency limit overrides
+        retry: Retry policy and deadline; the settings' policy if None
     """
     # Initialize Nornir with appropriate number of workers
-    nr = init_nornir(num_workers=10 if parallel else 1)
-    nr = nr.filter(filter_func=lambda h: h.name in devices)
+    nr = init_nornir(
+        num_workers=None if parallel else 1, names=devices, concurrency=concurrency
+    )
 
-    results = {}
-    for command in commands:
-        try:
-            result = nr.run(
-                task=netmiko_send_command,
-                command_string=command,
-                enable=True,
-                use_textfsm=False,  # Disable TextFSM to get raw output
-                use_timing=True,  # Use timing mode for more reliable output
-            )
-            # Check if there were any failures
-            failed_hosts = [
-                host for host, host_data in result.items() if host_data.failed
-            ]
-            if failed_hosts:
-                failures = {host: str(result[host].exception) for host in failed_hosts}
-                results[command] = {"status": "failed", "failures": failures}
-
-                # Save failed command history
-                for host, error in failures.items():
-                    device = NetworkDevice.objects.get(name=host)
-                    NornirCommandHistory.objects.create(
-                        device=device, command=command, output=error, status="failed"
-                    )
-            else:
-                # Extract the actual command output from successful results
-                outputs = {
-                    host: host_data[0].result for host, host_data in result.items()
-                }
-                results[command] = {"status": "success", "outputs": outputs}
-
-                # Save successful command history
-                for host, output in outputs.items():
-                    device = NetworkDevice.objects.get(name=host)
-                    NornirCommandHistory.objects.create(
-                        device=device, command=command, output=output, status="success"
-                    )
-        except Exception as e:
-            results[command] = {"status": "error", "error": str(e)}
-
-    return results
+    devices_by_name = _resolve_devices(devices)
+
+    events = {command: [] for command in commands}
+    try:
+        with HistoryWriter(NornirCommandHistory) as history:
+            for event in _iter_and_record(
+                nr,
+                devices_by_name,
+                history,
+                "\n".join(commands),
+                **_show_task(commands, retry),
+            ):
+                events[event[1]].append(event)
+                if on_result is not None:
+                    on_result(*event)
+    except Exception as e:
+        return {command: {"status": "error", "error": str(e)} for command in commands}
+
+    return {command: _collect(iter(events[command])) for command in commands}
 
 
 def run_config_commands(
-    devices: List[str], config_commands: List[str], parallel: bool = True
+    devices: List[str],
+    config_commands: List[str],
+    parallel: bool = True,
+    on_result: Optional[Callable] = None,
+    concurrency: Optional[Dict[str, Any]] = None,
+    retry: Optional[RetryPolicy] = None,
 ) -> Dict:
     """
     Run configuration commands on selected devices.
@@ -160,102 +299,130 @@ def run_config_commands(
         devices: List of device names
         config_commands: List of configuration commands
         parallel: Whether to run commands in parallel
+        on_result: Optional callback invoked as each host completes
+        concurrency: Optional per-run concurrency limit overrides
+        retry: Retry policy and deadline; the settings' policy if None
     """
     # Initialize Nornir with appropriate number of workers
-    nr = init_nornir(num_workers=10 if parallel else 1)
-    nr = nr.filter(filter_func=lambda h: h.name in devices)
-
-    try:
-        result = nr.run(
-            task=netmiko_send_config, config_commands=config_commands, enable=True
-        )
-
-        # Check if there were any failures
-        failed_hosts = [host for host, host_data in result.items() if host_data.failed]
-
-        results = {}
-        if failed_hosts:
-            failures = {host: str(result[host].exception) for host in failed_hosts}
-            results = {"status": "failed", "failures": failures}
-
-            # Save failed command history
-            for host, error in failures.items():
-                device = NetworkDevice.objects.get(name=host)
-                NornirCommandHistory.objects.create(
-                    device=device,
-                    command="\n".join(config_commands),
-                    output=error,
-                    status="failed",
-                )
-        else:
-            # Extract the actual command output from successful results
-            outputs = {host: host_data[0].result for host, host_data in result.items()}
-            results = {"status": "success", "outputs": outputs}
-
-            # Save successful command history for each device
-            for host, output in outputs.items():
-                device = NetworkDevice.objects.get(name=host)
-                NornirCommandHistory.objects.create(
-                    device=device,
-                    command="\n".join(config_commands),
-                    output=output or "Configuration applied successfully",
-                    status="success",
-                )
+    nr = init_nornir(
+        num_workers=None if parallel else 1, names=devices, concurrency=concurrency
+    )
 
-        return results
+    devices_by_name = _resolve_devices(devices)
 
+    try:
+        with HistoryWriter(NornirCommandHistory) as history:
+            return _collect(
+                _iter_and_record(
+                    nr,
+                    devices_by_name,
+                    history,
+                    "\n".join(config_commands),
+                    empty_output="Configuration applied successfully",
+                    command_type="config",
+                    **_config_task(config_commands, retry),
+                ),
+                on_result,
+            )
     except Exception as e:
         return {"status": "error", "error": str(e)}
 
 
-def backup_config(devices: List[str], parallel: bool = True) -> Dict:
+def backup_config(
+    devices: List[str],
+    parallel: bool = True,
+    on_result: Optional[Callable] = None,
+    concurrency: Optional[Dict[str, Any]] = None,
+    retry: Optional[RetryPolicy] = None,
+) -> Dict:
     """Backup running configuration of selected devices.
 
     Args:
         devices: List of device names
         parallel: Whether to run commands in parallel
+        on_result: Optional callback invoked as each host completes
+        concurrency: Optional per-run concurrency limit overrides
+        retry: Retry policy and deadline; the settings' policy if None
     """
-    nr = init_nornir(num_workers=10 if parallel else 1)
-    nr = nr.filter(filter_func=lambda h: h.name in devices)
-
-    try:
-        result = nr.run(
-            task=netmiko_send_command, command_string="show running-config", enable=True
-        )
-
-        # Check if there were any failures
-        failed_hosts = [host for host, host_data in result.items() if host_data.failed]
-
-        results = {}
-        if failed_hosts:
-            failures = {host: str(result[host].exception) for host in failed_hosts}
-            results = {"status": "failed", "failures": failures}
-
-            # Save failed command history
-            for host, error in failures.items():
-                device = NetworkDevice.objects.get(name=host)
-                NornirCommandHistory.objects.create(
-                    device=device,
-                    command="show running-config",
-                    output=error,
-                    status="failed",
-                )
-        else:
-            # Extract the actual command output from successful results
-            outputs = {host: host_data[0].result for host, host_data in result.items()}
-            results = {"status": "success", "outputs": outputs}
-
-            # Save successful command history for each device
-            for host, output in outputs.items():
-                device = NetworkDevice.objects.get(name=host)
-                NornirCommandHistory.objects.create(
-                    device=device,
-                    command="show running-config",
-                    output=output,
-                    status="success",
-                )
+    nr = init_nornir(
+        num_workers=None if parallel else 1, names=devices, concurrency=concurrency
+    )
 
-        return results
+    devices_by_name = _resolve_devices(devices)
 
+    try:
+        with HistoryWriter(NornirCommandHistory) as history:
+            return _collect(
+                _iter_and_record(
+                    nr,
+                    devices_by_name,
+                    history,
+                    "show running-config",
+                    command_type="backup",
+                    archive=True,
+                    **_backup_task(retry),
+                ),
+                on_result,
+            )
     except Exception as e:
         return {"status": "error", "error": str(e)}
+
+
+def stream_results(
+    command_type: str,
+    devices: List[str],
+    commands: List[str],
+    parallel: bool = True,
+    concurrency: Optional[Dict[str, Any]] = None,
+    retry: Optional[RetryPolicy] = None,
+) -> Iterator[Tuple[NetworkDevice, str, str, Any]]:
+    """Run a show, config or backup operation, yielding hosts as they complete.
+
+    Args:
+        command_type: One of "show", "config" or "backup"
+        devices: List of device names
+        commands: Show or configuration commands (ignored for backups)
+        parallel: Whether to run commands in parallel
+        concurrency: Optional per-run concurrency limit overrides
+        retry: Retry policy and deadline; the settings' policy if None
+
+    Yields:
+        ``(device, command, status, output)`` tuples; history is saved as they arrive
+    """
+    nr = init_nornir(
+        num_workers=None if parallel else 1, names=devices, concurrency=concurrency
+    )
+
+    if command_type not in ("show", "config", "backup"):
+        raise ValueError(f"Unsupported command type: {command_type}")
+    devices_by_name = _resolve_devices(devices)
+
+    with HistoryWriter(NornirCommandHistory) as history:
+        if command_type == "show":
+            yield from _iter_and_record(
+                nr,
+                devices_by_name,
+                history,
+                "\n".join(commands),
+                **_show_task(commands, retry),
+            )
+        elif command_type == "config":
+            yield from _iter_and_record(
+                nr,
+                devices_by_name,
+                history,
+                "\n".join(commands),
+                empty_output="Configuration applied successfully",
+                command_type="config",
+                **_config_task(commands, retry),
+            )
+        else:
+            yield from _iter_and_record(
+                nr,
+                devices_by_name,
+                history,
+                "show running-config",
+                command_type="backup",
+                archive=True,
+                **_backup_task(retry),
+            )
@@ -1,10 +1,16 @@
 from django.contrib import messages
-from django.shortcuts import render, get_object_or_404
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import require_POST
+
+from core.jobs import submit_job
+from core.pagination import history_page
+from core.streaming import device_result_event, event_stream_response, sse_event
 
 from .forms import NornirCommandForm
 from .models import NornirCommandHistory
 from core.models import NetworkDevice
-from .utils import backup_config, run_commands, run_config_commands
+from .utils import backup_config, run_commands, run_config_commands, stream_results
 
 
 def nornir_home(request):
@@ -14,7 +20,8 @@ def nornir_home(request):
     if request.method == "POST":
         form = NornirCommandForm(request.POST)
         if form.is_valid():
-            devices = [device.name for device in form.cleaned_data["devices"]]
+            target_devices = form.target_devices()
+            devices = [device.name for device in target_devices]
             command_type = form.cleaned_data["command_type"]
             commands = [
                 cmd.strip()
@@ -23,6 +30,20 @@ def nornir_home(request):
             ]
             parallel = form.cleaned_data["parallel_execution"]
 
+            if form.cleaned_data["run_in_background"] and command_type != "validate":
+                options = {"parallel": parallel}
+                if form.cleaned_data["deadline"]:
+                    options["deadline"] = form.cleaned_data["deadline"]
+                job = submit_job(
+                    "nornir",
+                    command_type,
+                    target_devices,
+                    commands,
+                    options,
+                    user=request.user,
+                )
+                return redirect("core:job_detail", job_id=job.pk)
+
             try:
                 if command_type == "show":
                     results = run_commands(devices, commands, parallel)
@@ -55,6 +76,47 @@ def nornir_home(request):
     )
 
 
+@require_POST
+def nornir_stream(request):
+    """Stream each host's result as a Server-Sent Event as soon as it completes."""
+    form = NornirCommandForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse(
+            {"error": "Invalid form data.", "errors": form.errors}, status=400
+        )
+
+    devices = [device.name for device in form.target_devices()]
+    command_type = form.cleaned_data["command_type"]
+    commands = [
+        cmd.strip() for cmd in form.cleaned_data["command"].split("\n") if cmd.strip()
+    ]
+    if command_type == "validate":
+        return JsonResponse({"error": "Validation is not supported yet."}, status=400)
+    if command_type != "backup" and not commands:
+        return JsonResponse({"error": "Please enter at least one command."}, status=400)
+
+    def events():
+        per_device = len(commands) if command_type == "show" else 1
+        yield sse_event(
+            "start",
+            {
+                "device_count": len(devices),
+                "result_count": len(devices) * per_device,
+                "command": "\n".join(commands),
+            },
+        )
+        try:
+            for device, command, status, output in stream_results(
+                command_type, devices, commands, form.cleaned_data["parallel_execution"]
+            ):
+                yield device_result_event(device, command, status, output)
+        except Exception as e:
+            yield sse_event("error", {"error": str(e)})
+        yield sse_event("done", {})
+
+    return event_stream_response(events())
+
+
 def devices(request):
     devices = NetworkDevice.objects.all()
     return render(
@@ -66,8 +128,11 @@ def devices(request):
 
 def nornir_device_history(request, device_id):
     device = get_object_or_404(NetworkDevice, pk=device_id)
-    command_history = NornirCommandHistory.objects.filter(device=device).order_by(
-        "-executed_at"
+    command_history = history_page(
+        request,
+        NornirCommandHistory.objects.filter(device=device)
+        .select_related("blob")
+        .defer("blob__data"),
     )
     return render(
         request,
@@ -0,0 +1,38 @@
+// Replaces a history row's output preview with the full output when its
+// "Show full output" link is clicked. Only the first MAX_BYTES are fetched
+// (with a Range request); the download link serves the rest.
+const HISTORY_OUTPUT_MAX_BYTES = 1024 * 1024;
+
+document.addEventListener('click', function(event) {
+    const link = event.target.closest('.load-output');
+    if (!link) {
+        return;
+    }
+    event.preventDefault();
+    const pre = document.getElementById(link.dataset.target);
+    link.textContent = 'Loading...';
+    fetch(link.dataset.url, {
+        headers: {'Range': 'bytes=0-' + (HISTORY_OUTPUT_MAX_BYTES - 1)},
+        credentials: 'same-origin',
+    })
+        .then(function(response) {
+            if (!response.ok) {
+                throw new Error('HTTP ' + response.status);
+            }
+            return response.text().then(function(text) {
+                return {text: text, partial: response.status === 206};
+            });
+        })
+        .then(function(result) {
+            pre.textContent = result.text;
+            pre.style.maxHeight = '600px';
+            if (result.partial) {
+                link.replaceWith('First ' + (HISTORY_OUTPUT_MAX_BYTES / 1024 / 1024) + ' MB shown');
+            } else {
+                link.remove();
+            }
+        })
+        .catch(function(error) {
+            link.textContent = 'Failed to load output (' + error.message + ')';
+        });
+});
@@ -0,0 +1,102 @@
+// Streams per-device results from a text/event-stream POST endpoint and renders
+// each one into an accordion as soon as it arrives.
+function streamResults(form, url, container) {
+    container.innerHTML = '';
+    const heading = document.createElement('h4');
+    heading.className = 'mb-3';
+    heading.textContent = 'Results';
+    const progress = document.createElement('p');
+    progress.className = 'text-muted';
+    const accordion = document.createElement('div');
+    accordion.className = 'accordion';
+    container.append(heading, progress, accordion);
+
+    let expected = 0;
+    let received = 0;
+
+    function showError(message) {
+        const alert = document.createElement('div');
+        alert.className = 'alert alert-danger';
+        alert.textContent = message;
+        container.insertBefore(alert, accordion);
+    }
+
+    function addResult(result) {
+        received += 1;
+        progress.textContent = received + ' of ' + expected + ' results received';
+        const item = document.createElement('div');
+        item.className = 'accordion-item';
+        const header = document.createElement('h2');
+        header.className = 'accordion-header';
+        const button = document.createElement('button');
+        button.className = 'accordion-button text-white ' + (result.status === 'success' ? 'bg-success' : 'bg-danger');
+        button.type = 'button';
+        button.setAttribute('data-bs-toggle', 'collapse');
+        button.setAttribute('data-bs-target', '#stream-result-' + received);
+        button.textContent = result.device + ' (' + result.ip_address + ') — ' + result.command.split('\n')[0];
+        const badge = document.createElement('span');
+        badge.className = 'badge bg-light text-dark ms-2';
+        badge.textContent = result.status;
+        button.appendChild(badge);
+        header.appendChild(button);
+        const body = document.createElement('div');
+        body.id = 'stream-result-' + received;
+        body.className = 'accordion-collapse collapse show';
+        const pre = document.createElement('pre');
+        pre.className = 'accordion-body bg-light mb-0';
+        pre.textContent = result.output;
+        body.appendChild(pre);
+        item.append(header, body);
+        accordion.appendChild(item);
+    }
+
+    function handleEvent(block) {
+        let event = 'message';
+        let data = '';
+        block.split('\n').forEach(line => {
+            if (line.startsWith('event: ')) {
+                event = line.slice(7);
+            } else if (line.startsWith('data: ')) {
+                data += line.slice(6);
+            }
+        });
+        const payload = data ? JSON.parse(data) : {};
+        if (event === 'start') {
+            expected = payload.result_count || payload.device_count;
+            progress.textContent = 'Waiting for ' + payload.device_count + ' devices...';
+        } else if (event === 'result') {
+            addResult(payload);
+        } else if (event === 'error') {
+            showError(payload.error);
+        } else if (event === 'done') {
+            progress.textContent = received + ' results received. Run complete.';
+        }
+    }
+
+    return fetch(url, { method: 'POST', body: new FormData(form) }).then(response => {
+        if (!response.ok) {
+            return response.json().then(body => showError(body.error || 'Request failed.'));
+        }
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        function read() {
+            return reader.read().then(({ done, value }) => {
+                if (done) {
+                    return;
+                }
+                buffer += decoder.decode(value, { stream: true });
+                let boundary = buffer.indexOf('\n\n');
+                while (boundary !== -1) {
+                    handleEvent(buffer.slice(0, boundary));
+                    buffer = buffer.slice(boundary + 2);
+                    boundary = buffer.indexOf('\n\n');
+                }
+                return read();
+            });
+        }
+
+        return read();
+    }).catch(error => showError(error.message));
+}